@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from . import auth, calculators, chatbot, content, finance, health
+from . import admin, auth, calculators, chatbot, content, finance, health
 
 api_router = APIRouter()
 
@@ -12,3 +12,4 @@ api_router.include_router(
 api_router.include_router(finance.router, prefix="/finance", tags=["finance"])
 api_router.include_router(content.router, prefix="/content", tags=["content"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
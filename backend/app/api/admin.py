@@ -0,0 +1,51 @@
+import secrets
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, status
+from loguru import logger
+
+from app.core.config import Settings, get_settings, reload_settings
+from app.tasks.expense_rollup import repair_expense_rollups
+
+router = APIRouter()
+
+
+def require_admin(
+    x_admin_key: Optional[str] = Header(None),
+    settings: Settings = Depends(get_settings)
+):
+    """Admin endpoints are hidden unless ``ADMIN_API_KEY`` is configured."""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key")
+
+
+@router.post("/settings/reload", dependencies=[Depends(require_admin)])
+async def reload_config():
+    """Re-read the environment and ``.env`` without restarting."""
+    try:
+        changed = reload_settings()
+    except Exception as e:
+        logger.error(f"Settings reload failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="New configuration is invalid; settings were not changed"
+        )
+    return {
+        "status": "reloaded",
+        "changed": sorted(changed),
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.post("/finance/rollups/repair", dependencies=[Depends(require_admin)], status_code=status.HTTP_202_ACCEPTED)
+async def repair_finance_rollups(background_tasks: BackgroundTasks, user_ids: Optional[List[int]] = None):
+    """Rebuild the monthly expense rollup for ``user_ids`` (everyone by default)."""
+    background_tasks.add_task(repair_expense_rollups, user_ids)
+    return {
+        "status": "scheduled",
+        "users": user_ids or "all",
+        "timestamp": datetime.utcnow()
+    }
@@ -44,10 +44,14 @@ async def login_user(user: UserLogin, db: AsyncSession = Depends(get_db)):
             "password": user.password,
             "full_name": user.email.split('@')[0]  # Use email prefix as name
         }
-        await auth_service.create_user_supabase_and_local(db, user_data)
-    
+        existing_user = await auth_service.create_user_supabase_and_local(db, user_data)
+    else:
+        # Upgrade hashes made with an older bcrypt cost
+        await auth_service.rehash_password_if_needed(db, existing_user, user.password)
+
+    # user_id lets protected endpoints skip the email lookup
     token = auth_service.create_access_token(
-        {"sub": user.email},
+        {"sub": user.email, "user_id": existing_user.id},
         timedelta(minutes=auth_service.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     return {"access_token": token, "token_type": "bearer"}
@@ -1,18 +1,29 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.rate_limit import rate_limit
+from app.schemas.calculators import LoanRequest, SavingsRequest
+from app.services import calculators as calculator_service
 
 router = APIRouter()
 
 
-@router.post("/loan")
-async def loan_calculator():
+async def _calculate(name: str, data, compute):
+    try:
+        return await calculator_service.cached_calculation(name, data.model_dump(), compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/loan", dependencies=[Depends(rate_limit)])
+async def loan_calculator(data: LoanRequest):
     """Calculate loan details."""
-    pass
+    return await _calculate("loan", data, calculator_service.calculate_loan)
 
 
-@router.post("/savings")
-async def savings_calculator():
+@router.post("/savings", dependencies=[Depends(rate_limit)])
+async def savings_calculator(data: SavingsRequest):
     """Calculate savings projection."""
-    pass
+    return await _calculate("savings", data, calculator_service.calculate_savings)
 
 
 @router.post("/tax")
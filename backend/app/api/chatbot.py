@@ -4,12 +4,15 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-import asyncio
 import json
 
 from app.db.session import get_db
 from app.services.auth import get_current_user_id
-from app.services.chatbot import chatbot_service
+from app.services.chatbot import ConversationNotFound, chatbot_service
+from app.services.llm import llm_client_manager
+from app.services.response_cache import response_cache
+from app.services.semantic_search import semantic_search_service
+from app.tasks.analytics import analytics_writer
 from app.schemas.chatbot import (
     ChatRequest, ChatResponse, ConversationCreate, ConversationResponse,
     ConversationHistory, ChatbotFeedback, ChatbotAnalytics, Language
@@ -65,6 +68,11 @@ async def send_message(
             db, chat_request, user_id
         )
         return response
+    except ConversationNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -89,31 +97,25 @@ async def send_message_stream(
     """
     async def generate_stream():
         try:
-            # Process message and get response
-            response = await chatbot_service.process_message(
+            # Forward tokens to the client as soon as OpenAI produces them
+            async for event in chatbot_service.process_message_stream(
                 db, chat_request, user_id
-            )
-            
-            # Stream the response word by word
-            words = response.message.split()
-            for i, word in enumerate(words):
-                yield f"data: {json.dumps({'word': word, 'index': i, 'total': len(words)})}\n\n"
-                await asyncio.sleep(0.1)  # Small delay for streaming effect
-            
-            # Send completion signal
-            yield f"data: {json.dumps({'status': 'complete', 'response': response.dict()})}\n\n"
+            ):
+                yield f"data: {json.dumps(event)}\n\n"
             
+        except ConversationNotFound:
+            yield f"data: {json.dumps({'error': 'Conversation not found', 'status': 'error'})}\n\n"
         except Exception as e:
             error_data = {"error": str(e), "status": "error"}
             yield f"data: {json.dumps(error_data)}\n\n"
     
     return StreamingResponse(
         generate_stream(),
-        media_type="text/plain",
+        media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
-            "Content-Type": "text/event-stream"
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so tokens flush immediately
         }
     )
 
@@ -223,7 +225,11 @@ async def chatbot_health():
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow(),
-            "service": "chatbot"
+            "service": "chatbot",
+            "llm": llm_client_manager.metrics(),
+            "response_cache": response_cache.stats(),
+            "analytics_writer": analytics_writer.stats(),
+            "embeddings": semantic_search_service.batcher.stats()
         }
     except Exception as e:
         raise HTTPException(
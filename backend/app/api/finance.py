@@ -1,6 +1,5 @@
 from app.core.cache import get_expensive_data
-from app.core.rate_limit import rate_limit
-from app.db.models import User
+from app.core.rate_limit import RateLimit, rate_limit
 from app.db.session import get_db
 from app.schemas.finance import (
     BudgetCreate, ExpenseCreate, IncomeSourceCreate, IncomeSourceResponse,
@@ -10,32 +9,71 @@ from app.schemas.finance import (
     ExpenseCreate, BudgetCreate, SavingsGoalCreate
 )
 from app.services import finance as finance_service
+from app.services import finance_summary
+from app.core.cache import cache_import_job, get_cached_import_job
+from app.core.config import get_settings
 from app.tasks.background import process_heavy_calculation
-from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Security
+from app.tasks.expense_import import ImportTooLarge, detect_format, new_job, run_import, spool_body
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from app.services.auth import decode_access_token
+from app.services.auth import decode_access_token, resolve_user_id
+
+settings = get_settings()
 
 router = APIRouter()
 security = HTTPBearer()
 
-async def get_user_id_from_token(credentials: HTTPAuthorizationCredentials = Security(security), db: AsyncSession = Depends(get_db)) -> int:
+# Clients follow X-Next-Cursor through every page, so lists get a larger quota
+list_rate_limit = RateLimit(settings.FINANCE_LIST_RATE_LIMIT)
+
+async def get_user_id_from_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> int:
     token = credentials.credentials
     payload = decode_access_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    # Look up user_id from database using email
-    email = payload["sub"]
-    result = await db.execute(select(User.id).where(User.email == email))
-    user_id = result.scalar()
+    # Embedded in the token, or a cached lookup by email for older tokens
+    user_id = await resolve_user_id(payload)
     
     if not user_id:
         raise HTTPException(status_code=401, detail="User not found")
     
     return user_id
 
+def list_params(
+    limit: Optional[int] = Query(None, ge=1, description="Page size (default FINANCE_PAGE_SIZE)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    date_from: Optional[datetime] = Query(None, description="Inclusive lower bound"),
+    date_to: Optional[datetime] = Query(None, description="Exclusive upper bound"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None
+) -> dict:
+    """Query parameters shared by the list endpoints."""
+    return {
+        'limit': limit,
+        'cursor': cursor,
+        'fields': [f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        'date_from': date_from,
+        'date_to': date_to,
+        'min_amount': min_amount,
+        'max_amount': max_amount,
+    }
+
+
+async def paginate(response: Response, list_func, db: AsyncSession, user_id: int, options: dict):
+    """Run a list query; the next page's cursor goes in ``X-Next-Cursor``."""
+    try:
+        rows, next_cursor = await list_func(db, user_id, **options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
 @router.post("/income-sources", response_model=IncomeSourceResponse, dependencies=[Depends(rate_limit)])
 async def add_income_source(
     data: IncomeSourceCreate,
@@ -45,12 +83,14 @@ async def add_income_source(
     income = await finance_service.create_income_source(db, user_id, data.model_dump())
     return income
 
-@router.get("/income-sources", response_model=list[IncomeSourceResponse], dependencies=[Depends(rate_limit)])
+@router.get("/income-sources", dependencies=[Depends(list_rate_limit)])
 async def list_income_sources(
+    response: Response,
+    options: dict = Depends(list_params),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return await finance_service.list_income_sources(db, user_id)
+    return await paginate(response, finance_service.list_income_sources, db, user_id, options)
 
 # EXPENSES CRUD
 @router.post("/expenses", dependencies=[Depends(rate_limit)])
@@ -59,15 +99,59 @@ async def add_expense(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_user_id_from_token)
 ):
-    expense = await finance_service.create_expense(db, user_id, data.model_dump())
+    try:
+        expense = await finance_service.create_expense(db, user_id, data.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return expense
 
-@router.get("/expenses", dependencies=[Depends(rate_limit)])
+@router.get("/expenses", dependencies=[Depends(list_rate_limit)])
 async def list_expenses(
+    response: Response,
+    category: Optional[str] = None,
+    options: dict = Depends(list_params),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return await finance_service.list_expenses(db, user_id)
+    return await paginate(response, finance_service.list_expenses, db, user_id, {**options, 'category': category})
+
+@router.post("/expenses/import", dependencies=[Depends(rate_limit)])
+async def import_expenses(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    format: Optional[str] = Query(None, description="csv or ndjson (default: from Content-Type)"),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    """Bulk import expenses from a CSV or NDJSON request body.
+
+    Rows need ``amount``, ``category``, ``date`` and optionally
+    ``description``. Small uploads are imported before responding; larger
+    ones return 202 with a job to poll at ``/expenses/import/{job_id}``.
+    """
+    fmt = detect_format(request.headers.get("content-type"), format)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson")
+    try:
+        upload, size = await spool_body(request.stream(), settings.EXPENSE_IMPORT_MAX_BYTES)
+    except ImportTooLarge:
+        raise HTTPException(status_code=413, detail="Import file too large")
+
+    job = new_job(user_id, fmt, size)
+    if size <= settings.EXPENSE_IMPORT_INLINE_MAX_BYTES:
+        return await run_import(job, upload)
+
+    await cache_import_job(job)
+    background_tasks.add_task(run_import, job, upload)
+    response.status_code = 202
+    return job
+
+@router.get("/expenses/import/{job_id}", dependencies=[Depends(rate_limit)])
+async def get_import_job(job_id: str, user_id: int = Depends(get_user_id_from_token)):
+    job = await get_cached_import_job(job_id)
+    if not job or job.get('user_id') != user_id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
 
 @router.put("/expenses/{expense_id}", dependencies=[Depends(rate_limit)])
 async def update_expense(
@@ -76,7 +160,10 @@ async def update_expense(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_user_id_from_token)
 ):
-    updated = await finance_service.update_expense(db, user_id, expense_id, data.model_dump())
+    try:
+        updated = await finance_service.update_expense(db, user_id, expense_id, data.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated:
         raise HTTPException(status_code=404, detail="Expense not found")
     return updated
@@ -102,12 +189,15 @@ async def add_budget(
     budget = await finance_service.create_budget(db, user_id, data.model_dump())
     return budget
 
-@router.get("/budgets", dependencies=[Depends(rate_limit)])
+@router.get("/budgets", dependencies=[Depends(list_rate_limit)])
 async def list_budgets(
+    response: Response,
+    category: Optional[str] = None,
+    options: dict = Depends(list_params),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return await finance_service.list_budgets(db, user_id)
+    return await paginate(response, finance_service.list_budgets, db, user_id, {**options, 'category': category})
 
 @router.put("/budgets/{budget_id}", dependencies=[Depends(rate_limit)])
 async def update_budget(
@@ -142,12 +232,14 @@ async def add_savings_goal(
     goal = await finance_service.create_savings_goal(db, user_id, data.model_dump())
     return goal
 
-@router.get("/savings-goals", dependencies=[Depends(rate_limit)])
+@router.get("/savings-goals", dependencies=[Depends(list_rate_limit)])
 async def list_savings_goals(
+    response: Response,
+    options: dict = Depends(list_params),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return await finance_service.list_savings_goals(db, user_id)
+    return await paginate(response, finance_service.list_savings_goals, db, user_id, options)
 
 @router.put("/savings-goals/{goal_id}", dependencies=[Depends(rate_limit)])
 async def update_savings_goal(
@@ -172,6 +264,51 @@ async def delete_savings_goal(
         raise HTTPException(status_code=404, detail="Savings goal not found")
     return {"message": "Savings goal deleted"}
 
+# SUMMARIES (aggregated in SQL, cached per user until the next write)
+def summary_months(
+    months: int = Query(6, ge=1, description="Months of history, including the current one")
+) -> int:
+    return min(months, settings.FINANCE_SUMMARY_MAX_MONTHS)
+
+@router.get("/summary", dependencies=[Depends(rate_limit)])
+async def get_summary(
+    months: int = Depends(summary_months),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    return await finance_summary.get_summary(db, user_id, months)
+
+@router.get("/summary/spending", dependencies=[Depends(rate_limit)])
+async def get_spending_summary(
+    months: int = Depends(summary_months),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    return await finance_summary.get_summary(db, user_id, months, parts=['spending'])
+
+@router.get("/summary/budgets", dependencies=[Depends(rate_limit)])
+async def get_budget_summary(
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    return await finance_summary.get_summary(db, user_id, parts=['budgets'])
+
+@router.get("/summary/cash-flow", dependencies=[Depends(rate_limit)])
+async def get_cash_flow_summary(
+    months: int = Depends(summary_months),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    return await finance_summary.get_summary(db, user_id, months, parts=['cash_flow'])
+
+@router.get("/summary/savings-goals", dependencies=[Depends(rate_limit)])
+async def get_savings_goal_summary(
+    months: int = Depends(summary_months),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    return await finance_summary.get_summary(db, user_id, months, parts=['savings_goals'])
+
 # Real-time analytics endpoint (scaffold)
 @router.get("/income-sources/stream", dependencies=[Depends(rate_limit)])
 async def stream_income_sources(user_id: int = Depends(get_user_id_from_token)):
@@ -1,10 +1,18 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.admin import require_admin
 from app.db.session import get_db
-from app.db.health import check_database_connection, get_connection_info
+from app.db.health import check_database_connection, get_connection_info, get_pool_status
+from app.core.cache import cache_manager
+from app.core.config import Settings, get_settings
 from app.core.performance import get_performance_summary
+from app.core.rate_limit import rate_limiter
+from app.core.startup import startup_report, warm_up
+from app.services.passwords import password_hasher
 
 router = APIRouter()
 
@@ -28,6 +36,7 @@ async def database_health_check(db: AsyncSession = Depends(get_db)):
     return {
         "status": "healthy" if is_healthy else "unhealthy",
         "database": connection_info,
+        "pool": get_pool_status(),
         "timestamp": datetime.utcnow()
     }
 
@@ -40,5 +49,37 @@ async def performance_health_check():
     return {
         "status": "healthy",
         "performance": performance_summary,
+        "cache": cache_manager.stats(),
+        "password_hashing": password_hasher.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.get("/health/startup")
+async def startup_health_check():
+    """Import-time profile and which lazy services have been initialised."""
+    return {
+        "status": "healthy",
+        "startup": startup_report(),
         "timestamp": datetime.utcnow()
-    } 
\ No newline at end of file
+    }
+
+
+@router.post("/health/warmup", dependencies=[Depends(require_admin)])
+async def warmup(
+    services: Optional[List[str]] = Query(None),
+    settings: Settings = Depends(get_settings)
+):
+    """Initialise lazy services ahead of traffic (all of them by default).
+
+    Loading the embedding model is expensive, so this needs ``X-Admin-Key``
+    as well as ``WARMUP_ENDPOINT_ENABLED``.
+    """
+    if not settings.WARMUP_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {
+        "status": "healthy",
+        "services": await warm_up(services),
+        "timestamp": datetime.utcnow()
+    }
@@ -1,38 +1,171 @@
-import redis.asyncio as redis
-from aiocache import Cache, cached
-from app.core.config import get_settings
+import asyncio
 import json
-import pickle
-from typing import Any, Optional
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiocache import Cache, cached
+from app.core.config import get_settings, on_settings_reload
+from app.core.startup import Lazy
 from loguru import logger
 
 settings = get_settings()
 
-# Redis connection with error handling
-try:
-    redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-    logger.info("Redis connection established")
-except Exception as e:
-    logger.warning(f"Redis connection failed: {e}. Using in-memory fallback.")
-    redis_client = None
+
+def _create_redis_client():
+    """Redis connection with error handling."""
+    try:
+        import redis.asyncio as redis
+        client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        logger.info("Redis connection established")
+        return client
+    except Exception as e:
+        logger.warning(f"Redis connection failed: {e}. Using in-memory fallback.")
+        return None
+
+
+# Global Redis client, created on first cache access
+_redis = Lazy("redis", _create_redis_client)
+
+_MISSING = object()
+
+INVALIDATION_CHANNEL = "kipesa:cache:invalidate"
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with per-entry TTL and size accounting.
+
+    Values are stored deserialised and returned as-is, so callers must treat
+    them as read-only.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+    
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        """Return the cached value or ``default`` (``_MISSING`` unless given)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at, _size = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: str, value: Any, ttl: float, size: int):
+        """Store a value, evicting least recently used entries to stay in bounds."""
+        if size > self.max_bytes:
+            self._remove(key)
+            return
+        self._remove(key)
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self.current_bytes += size
+        self._evict()
+
+    def resize(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def delete(self, key: str):
+        self._remove(key)
+    
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
 
 class CacheManager:
-    """Centralized cache management for the application."""
+    """Centralized cache management for the application.
+    
+    Two tiers: a bounded in-process LRU/TTL cache in front of Redis. Writes
+    and deletes are published on a Redis channel so other processes drop
+    their local copy; local entries are also capped at ``CACHE_LOCAL_TTL``
+    so a missed invalidation can only serve stale data briefly. Without
+    Redis the local tier is the whole cache.
+    """
     
     def __init__(self):
-        self.redis_client = redis_client
+        self._redis_client = _MISSING
         self.default_ttl = 3600  # 1 hour
+        self.local = LocalCache(settings.CACHE_LOCAL_MAX_ENTRIES, settings.CACHE_LOCAL_MAX_BYTES)
+        self.local_ttl = settings.CACHE_LOCAL_TTL
+        self.instance_id = uuid.uuid4().hex
+        self._listener_task: Optional[asyncio.Task] = None
+
+    @property
+    def redis_client(self):
+        """The shared Redis client, connected on first use (``None`` without Redis)."""
+        if self._redis_client is _MISSING:
+            return _redis.get()
+        return self._redis_client
+
+    @redis_client.setter
+    def redis_client(self, client):
+        self._redis_client = client
+
+    def apply_settings(self, settings):
+        """Resize the local tier after a settings reload."""
+        self.local.resize(settings.CACHE_LOCAL_MAX_ENTRIES, settings.CACHE_LOCAL_MAX_BYTES)
+        self.local_ttl = settings.CACHE_LOCAL_TTL
+
+    def _local_ttl(self, ttl: float) -> float:
+        """TTL for the local tier: bounded when Redis is the source of truth."""
+        return min(ttl, self.local_ttl) if self.redis_client else ttl
     
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
+        value = self.local.get(key)
+        if value is not _MISSING:
+            return value
+        
         if not self.redis_client:
-            logger.debug("Redis not available, skipping cache get")
             return None
             
         try:
-            value = await self.redis_client.get(key)
-            if value:
-                return json.loads(value)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                raw, pttl = await pipe.get(key).pttl(key).execute()
+            if raw:
+                value = json.loads(raw)
+                ttl = pttl / 1000 if pttl and pttl > 0 else self.default_ttl
+                self.local.set(key, value, self._local_ttl(ttl), len(raw))
+                return value
             return None
         except Exception as e:
             logger.error(f"Cache get error: {e}")
@@ -40,13 +173,22 @@ class CacheManager:
     
     async def set(self, key: str, value: Any, ttl: int = None) -> bool:
         """Set value in cache."""
-        if not self.redis_client:
-            logger.debug("Redis not available, skipping cache set")
+        ttl = ttl or self.default_ttl
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cache set error: {e}")
             return False
+        
+        # Keep the local copy identical to what Redis holds
+        self.local.set(key, json.loads(payload), self._local_ttl(ttl), len(payload))
+        
+        if not self.redis_client:
+            return True
             
         try:
-            ttl = ttl or self.default_ttl
-            await self.redis_client.setex(key, ttl, json.dumps(value))
+            await self.redis_client.setex(key, ttl, payload)
+            await self._publish_invalidation(key)
             return True
         except Exception as e:
             logger.error(f"Cache set error: {e}")
@@ -54,12 +196,14 @@ class CacheManager:
     
     async def delete(self, key: str) -> bool:
         """Delete value from cache."""
+        self.local.delete(key)
+        
         if not self.redis_client:
-            logger.debug("Redis not available, skipping cache delete")
-            return False
+            return True
             
         try:
             await self.redis_client.delete(key)
+            await self._publish_invalidation(key)
             return True
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
@@ -67,8 +211,10 @@ class CacheManager:
     
     async def exists(self, key: str) -> bool:
         """Check if key exists in cache."""
+        if self.local.get(key) is not _MISSING:
+            return True
+        
         if not self.redis_client:
-            logger.debug("Redis not available, skipping cache exists check")
             return False
             
         try:
@@ -76,9 +222,126 @@ class CacheManager:
         except Exception as e:
             logger.error(f"Cache exists error: {e}")
             return False
+    
+    async def list_replace(self, key: str, items: List[Any], max_len: int, ttl: int = None) -> bool:
+        """Replace a capped list with the last ``max_len`` of ``items``."""
+        ttl = ttl or self.default_ttl
+        items = items[-max_len:]
+        try:
+            payloads = [json.dumps(item) for item in items]
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cache list replace error: {e}")
+            return False
+        
+        if not self.redis_client:
+            self.local.set(key, [json.loads(p) for p in payloads], ttl, sum(map(len, payloads)))
+            return True
+        
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                if payloads:
+                    pipe.rpush(key, *payloads).expire(key, ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache list replace error: {e}")
+            return False
+    
+    async def list_append(self, key: str, items: List[Any], max_len: int, ttl: int = None) -> bool:
+        """Atomically append to an existing capped list, trimming it to ``max_len``.
+
+        Does nothing if the list is not cached, so a partial list is never
+        created; the next reader rebuilds it from the source of truth.
+        """
+        ttl = ttl or self.default_ttl
+        try:
+            payloads = [json.dumps(item) for item in items]
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cache list append error: {e}")
+            return False
+        
+        if not self.redis_client:
+            current = self.local.get(key)
+            if current is _MISSING:
+                return False
+            current = (current + [json.loads(p) for p in payloads])[-max_len:]
+            self.local.set(key, current, ttl, sum(len(json.dumps(item)) for item in current))
+            return True
+        
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                length, _, _ = await pipe.rpushx(key, *payloads).ltrim(key, -max_len, -1).expire(key, ttl).execute()
+            return length > 0
+        except Exception as e:
+            logger.error(f"Cache list append error: {e}")
+            return False
+    
+    async def list_tail(self, key: str, count: int) -> Optional[List[Any]]:
+        """Last ``count`` items of a cached list, or ``None`` if it is not cached."""
+        if not self.redis_client:
+            current = self.local.get(key)
+            return None if current is _MISSING else current[-count:]
+        
+        try:
+            raw = await self.redis_client.lrange(key, -count, -1)
+            return [json.loads(item) for item in raw] if raw else None
+        except Exception as e:
+            logger.error(f"Cache list get error: {e}")
+            return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Local tier statistics."""
+        return {
+            'backend': 'redis+local' if self.redis_client else 'local',
+            'local': self.local.stats()
+        }
+    
+    async def _publish_invalidation(self, key: str):
+        try:
+            await self.redis_client.publish(INVALIDATION_CHANNEL, f"{self.instance_id}:{key}")
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed: {e}")
+    
+    async def _listen_for_invalidations(self):
+        """Drop local entries that other processes have written or deleted."""
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    origin, _, key = message['data'].partition(':')
+                    if origin != self.instance_id:
+                        self.local.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages may have been missed while disconnected
+                logger.warning(f"Cache invalidation listener error: {e}. Clearing local cache.")
+                self.local.clear()
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.aclose()
+    
+    async def start_invalidation_listener(self):
+        """Start the pub/sub invalidation listener (called from the app lifespan)."""
+        if self.redis_client and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen_for_invalidations())
+    
+    async def stop_invalidation_listener(self):
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
 
 # Global cache manager instance
 cache_manager = CacheManager()
+on_settings_reload(lambda settings, changed: cache_manager.apply_settings(settings))
 
 # Cache decorators for specific use cases
 @cached(ttl=3600, cache=Cache.MEMORY)
@@ -96,15 +359,20 @@ async def get_cached_knowledge_base(language: str) -> Optional[dict]:
     key = f"knowledge_base:{language}"
     return await cache_manager.get(key)
 
-async def cache_conversation_history(conversation_id: str, messages: list, ttl: int = 1800):
-    """Cache conversation history."""
-    key = f"conversation:{conversation_id}"
-    return await cache_manager.set(key, messages, ttl)
+async def get_cached_conversation_window(conversation_id: str, count: int) -> Optional[list]:
+    """Get the last ``count`` cached messages of a conversation."""
+    key = f"conversation_window:{conversation_id}"
+    return await cache_manager.list_tail(key, count)
 
-async def get_cached_conversation_history(conversation_id: str) -> Optional[list]:
-    """Get cached conversation history."""
-    key = f"conversation:{conversation_id}"
-    return await cache_manager.get(key)
+async def cache_conversation_window(conversation_id: str, messages: list, max_len: int, ttl: int = 1800):
+    """Cache the most recent messages of a conversation."""
+    key = f"conversation_window:{conversation_id}"
+    return await cache_manager.list_replace(key, messages, max_len, ttl)
+
+async def append_conversation_window(conversation_id: str, messages: list, max_len: int, ttl: int = 1800):
+    """Append new messages to a cached conversation window (no-op if not cached)."""
+    key = f"conversation_window:{conversation_id}"
+    return await cache_manager.list_append(key, messages, max_len, ttl)
 
 async def cache_user_profile(user_id: int, profile: dict, ttl: int = 3600):
     """Cache user profile."""
@@ -115,3 +383,27 @@ async def get_cached_user_profile(user_id: int) -> Optional[dict]:
     """Get cached user profile."""
     key = f"user_profile:{user_id}"
     return await cache_manager.get(key)
+
+async def cache_import_job(job: dict, ttl: int = 86400):
+    """Cache the status of a bulk import job."""
+    key = f"import_job:{job['job_id']}"
+    return await cache_manager.set(key, job, ttl)
+
+async def get_cached_import_job(job_id: str) -> Optional[dict]:
+    """Get the status of a bulk import job."""
+    key = f"import_job:{job_id}"
+    return await cache_manager.get(key)
+
+async def get_finance_cache_version(user_id: int) -> str:
+    """Current version of a user's finance data; part of every summary cache key."""
+    key = f"finance_version:{user_id}"
+    version = await cache_manager.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        await cache_manager.set(key, version, 86400)
+    return version
+
+async def invalidate_finance_cache(user_id: int):
+    """Orphan a user's cached summaries after a write to their finance tables."""
+    key = f"finance_version:{user_id}"
+    return await cache_manager.set(key, uuid.uuid4().hex, 86400)
@@ -1,6 +1,9 @@
 import os
-from typing import List
+import tempfile
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set
 
+from loguru import logger
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
@@ -10,9 +13,26 @@ class Settings(BaseSettings):
     SECRET_KEY: str = ""
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_USER_CACHE_SIZE: int = 10000  # token subject -> user id entries per process
+    AUTH_USER_CACHE_TTL: int = 300  # seconds
+    AUTH_REVOCATION_CHECK_TTL: int = 5  # seconds a "not revoked" answer from Redis is reused
+
+    # Password hashing (bcrypt on a bounded thread pool)
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # each +1 doubles the cost
+    PASSWORD_HASH_WORKERS: int = 0  # 0 = min(4, CPU count)
+    PASSWORD_HASH_MAX_PENDING: int = 32  # running + queued before returning 503
     SUPABASE_URL: str = ""
     SUPABASE_KEY: str = ""
     DATABASE_URL: str = ""
+    
+    # Database connection pool (per process)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_POOL_PRE_PING: bool = True
+    DB_PGBOUNCER: Optional[bool] = None  # None = detect Supabase/PgBouncer from DATABASE_URL
+    DB_USE_NULL_POOL: bool = False  # open a connection per session (e.g. short-lived serverless workers)
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"]
     
     # OpenAI Configuration
@@ -20,15 +40,84 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     OPENAI_MAX_TOKENS: int = 500
     OPENAI_TEMPERATURE: float = 0.7
+    OPENAI_MAX_RETRIES: int = 2
+    
+    # Shared OpenAI HTTP pool and concurrency limits
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    OPENAI_MAX_CONCURRENCY: int = 50  # in-flight LLM calls per process
+    OPENAI_MAX_CONCURRENCY_PER_USER: int = 2
     
     # Chatbot Configuration
     CHATBOT_CACHE_TTL: int = 3600  # 1 hour
     CHATBOT_MAX_HISTORY: int = 10
     CHATBOT_RESPONSE_TIMEOUT: int = 30  # seconds
+    CHATBOT_CONTEXT_TOKEN_BUDGET: int = 3000  # prompt tokens per request (excludes OPENAI_MAX_TOKENS)
+    CHATBOT_KNOWLEDGE_MAX_TOKENS: int = 1200  # share of the budget retrieved knowledge may use
+    CHATBOT_RESPONSE_CACHE_ENABLED: bool = True
+    CHATBOT_RESPONSE_CACHE_SIMILARITY: float = 0.92  # set to 1.0 to disable near-duplicate lookups
+    CHATBOT_RESPONSE_CACHE_SIMILARITY_ENTRIES: int = 512  # remembered questions per bucket
+    
+    # Write-behind analytics
+    ANALYTICS_QUEUE_SIZE: int = 10000
+    ANALYTICS_BATCH_SIZE: int = 100
+    ANALYTICS_FLUSH_INTERVAL_MS: int = 500
+    ANALYTICS_WRITE_RETRIES: int = 3
     
     # Redis Configuration (for caching)
     REDIS_URL: str = ""
     REDIS_DB: int = 0
+    
+    # In-process cache tier in front of Redis
+    CACHE_LOCAL_MAX_ENTRIES: int = 1024
+    CACHE_LOCAL_MAX_BYTES: int = 32 * 1024 * 1024  # 32 MB
+    CACHE_LOCAL_TTL: int = 60  # seconds a Redis-backed entry may be served locally
+
+    # Semantic Search Configuration
+    SEMANTIC_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    SEMANTIC_INDEX_DIR: str = os.path.join(tempfile.gettempdir(), "kipesa_semantic_index")
+    SEMANTIC_SIMILARITY_THRESHOLD: float = 0.3
+    SEMANTIC_QUERY_CACHE_SIZE: int = 1024  # query embeddings kept in memory
+    EMBEDDING_MAX_BATCH_SIZE: int = 32  # texts per model forward pass
+    EMBEDDING_MAX_WAIT_MS: float = 5.0  # how long the first request waits for others to batch with
+    
+    # Knowledge base passages (retrieval and embedding unit)
+    KNOWLEDGE_PASSAGE_WORDS: int = 120
+    KNOWLEDGE_PASSAGE_OVERLAP_WORDS: int = 30
+
+    # Startup: clients are created on first use unless warmed up
+    WARMUP_ON_STARTUP: bool = False  # initialise WARMUP_SERVICES in the lifespan
+    WARMUP_SERVICES: List[str] = ["database_engine", "redis", "llm_client", "tokenizer"]
+    WARMUP_ENDPOINT_ENABLED: bool = False  # POST /health/warmup (also needs ADMIN_API_KEY)
+
+    # Rate limiting (sliding window, shared through Redis when available)
+    RATE_LIMIT_DEFAULT: str = "5/minute"  # per route and client (user, else IP)
+    RATE_LIMIT_ROUTES: Dict[str, str] = {}  # e.g. {"POST /finance/expenses": "30/minute"}
+    RATE_LIMIT_BACKEND: str = "auto"  # auto (Redis if configured) or local
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 100000
+
+    # Finance list endpoints (keyset pagination)
+    FINANCE_PAGE_SIZE: int = 100
+    FINANCE_MAX_PAGE_SIZE: int = 500
+    FINANCE_LIST_RATE_LIMIT: str = "60/minute"  # per list route; RATE_LIMIT_ROUTES still overrides
+    FINANCE_SUMMARY_CACHE_TTL: int = 300  # writes invalidate earlier; this bounds other staleness
+    FINANCE_SUMMARY_MAX_MONTHS: int = 36
+    EXPENSE_ROLLUP_REPAIR_BATCH_SIZE: int = 500  # users rebuilt per transaction
+
+    # Bulk expense import
+    EXPENSE_IMPORT_BATCH_SIZE: int = 1000  # rows per INSERT/COPY and commit
+    EXPENSE_IMPORT_INLINE_MAX_BYTES: int = 256 * 1024  # larger uploads run as a background job
+    EXPENSE_IMPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    EXPENSE_IMPORT_MAX_ERRORS: int = 100  # row errors kept in the report
+
+    # Financial calculators
+    CALCULATOR_CACHE_TTL: int = 86400  # results depend only on the input
+    CALCULATOR_MAX_PERIODS: int = 600  # months
+    CALCULATOR_MAX_SCENARIOS: int = 2500  # rates x terms
+
+    # Admin endpoints (settings reload); disabled unless a key is set
+    ADMIN_API_KEY: Optional[str] = None
 
     @field_validator("ALLOWED_ORIGINS", mode="before")
     @classmethod
@@ -43,5 +132,50 @@ class Settings(BaseSettings):
     }
 
 
+@lru_cache()
 def get_settings() -> Settings:
+    """The process-wide settings; ``.env`` is read and validated once.
+
+    Use ``Depends(get_settings)`` in routes. Call :func:`reload_settings` to
+    pick up changed configuration.
+    """
     return Settings()
+
+
+SettingsHook = Callable[[Settings, Set[str]], None]
+_reload_hooks: List[SettingsHook] = []
+
+
+def on_settings_reload(hook: SettingsHook) -> SettingsHook:
+    """Register ``hook(settings, changed_names)`` to run after a reload."""
+    _reload_hooks.append(hook)
+    return hook
+
+
+def reload_settings() -> Set[str]:
+    """Re-read the environment and ``.env`` and apply changes in place.
+
+    Modules keep the instance they got at import time, so the cached
+    ``Settings`` is updated rather than replaced; values read per request
+    (timeouts, TTLs, limits) take effect immediately and registered hooks
+    resize whatever was built from the old values (pools, caches). If the
+    new configuration doesn't validate the error is raised and nothing
+    changes. Returns the names of the settings that changed.
+    """
+    current = get_settings()
+    fresh = Settings()
+    changed = {
+        name for name in Settings.model_fields
+        if getattr(fresh, name) != getattr(current, name)
+    }
+    for name in changed:
+        setattr(current, name, getattr(fresh, name))
+
+    for hook in list(_reload_hooks):
+        try:
+            hook(current, changed)
+        except Exception as e:
+            logger.error(f"Settings reload hook {getattr(hook, '__qualname__', hook)} failed: {e}")
+
+    logger.info(f"Settings reloaded; changed: {sorted(changed) or 'nothing'}")
+    return changed
@@ -1,34 +1,218 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from jose import JWTError, jwt
+from loguru import logger
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-from fastapi import Request, HTTPException
-import time
-from collections import defaultdict
+
+from app.core.cache import cache_manager
+from app.core.config import get_settings
+
+settings = get_settings()
 
 limiter = Limiter(key_func=get_remote_address)
 
-# Simple in-memory rate limiting for development
-request_counts = defaultdict(list)
-RATE_LIMIT = 5  # requests per minute
-
-
-async def rate_limit(request: Request):
-    """Simple rate limiting dependency"""
-    client_ip = get_remote_address(request)
-    current_time = time.time()
-    
-    # Clean old requests (older than 1 minute)
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts[client_ip] 
-        if current_time - req_time < 60
-    ]
-    
-    # Check if rate limit exceeded
-    if len(request_counts[client_ip]) >= RATE_LIMIT:
-        raise HTTPException(
-            status_code=429, 
-            detail="Rate limit exceeded. Please try again later."
-        )
-    
-    # Add current request
-    request_counts[client_ip].append(current_time)
-    return True
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Sliding window counter: the previous fixed window's count is weighted by
+# how much of it still overlaps the sliding window. Uses Redis' clock so all
+# instances agree; derived keys share KEYS[1]'s hash tag.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local index = math.floor(now / window)
+local current_key = KEYS[1] .. ':' .. index
+local current = tonumber(redis.call('GET', current_key) or '0')
+local previous = tonumber(redis.call('GET', KEYS[1] .. ':' .. (index - 1)) or '0')
+local elapsed = now - index * window
+local estimated = previous * (1 - elapsed / window) + current
+local allowed = 0
+if estimated < limit then
+    current = redis.call('INCR', current_key)
+    if current == 1 then
+        redis.call('EXPIRE', current_key, window * 2)
+    end
+    estimated = estimated + 1
+    allowed = 1
+end
+return {allowed, math.max(0, math.floor(limit - estimated)), math.ceil((window - elapsed) * 1000)}
+"""
+
+
+def parse_quota(quota: str) -> Tuple[int, int]:
+    """``"100/minute"`` or ``"10/30s"`` -> ``(limit, window_seconds)``."""
+    count, _, period = quota.partition("/")
+    period = period.strip().lower()
+    if period.rstrip("s") in PERIODS:
+        window = PERIODS[period.rstrip("s")]
+    elif period.endswith("s") and period[:-1].isdigit():
+        window = int(period[:-1])
+    else:
+        raise ValueError(f"Invalid rate limit quota: {quota!r}")
+    return int(count), window
+
+
+class LocalRateLimiter:
+    """In-process sliding window counters, O(1) per check.
+
+    Keys live in an LRU; a key idle for two windows is evicted on later
+    checks, and at most ``max_keys`` keys are kept.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> (window index, current count, previous count, window, last seen)
+        self._counters: "OrderedDict[str, Tuple[int, int, int, int, float]]" = OrderedDict()
+
+    def hit(self, key: str, limit: int, window: int, now: Optional[float] = None) -> Tuple[bool, int, float]:
+        now = time.time() if now is None else now
+        index = int(now // window)
+        current, previous = 0, 0
+        entry = self._counters.get(key)
+        if entry is not None and entry[3] == window:
+            if entry[0] == index:
+                current, previous = entry[1], entry[2]
+            elif entry[0] == index - 1:
+                previous = entry[1]
+
+        elapsed = now - index * window
+        estimated = previous * (1 - elapsed / window) + current
+        allowed = estimated < limit
+        if allowed:
+            current += 1
+            estimated += 1
+
+        self._counters[key] = (index, current, previous, window, now)
+        self._counters.move_to_end(key)
+        self._evict(now)
+        return allowed, max(0, math.floor(limit - estimated)), window - elapsed
+
+    def _evict(self, now: float):
+        while self._counters:
+            key, entry = next(iter(self._counters.items()))
+            if len(self._counters) <= self.max_keys and entry[4] > now - 2 * entry[3]:
+                break
+            del self._counters[key]
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class RateLimiter:
+    """Sliding window rate limiter shared through Redis.
+
+    Each check runs one Lua script, so every worker and serverless instance
+    sees the same counts. Without Redis, or if it errors, checks fall back to
+    the in-process :class:`LocalRateLimiter`.
+    """
+
+    def __init__(self):
+        self.local = LocalRateLimiter(settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+        self._script = None
+        self._script_client = None
+        self.metrics = {
+            'allowed': 0,
+            'limited': 0,
+            'redis_errors': 0,
+        }
+
+    def _redis_script(self):
+        if settings.RATE_LIMIT_BACKEND == "local":
+            return None
+        client = cache_manager.redis_client
+        if client is None:
+            return None
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+            self._script_client = client
+        return self._script
+
+    async def hit(self, key: str, limit: int, window: int) -> Dict[str, Any]:
+        """Count one request for ``key``; returns ``{'allowed', 'limit', 'remaining', 'reset'}``."""
+        result = None
+        script = self._redis_script()
+        if script is not None:
+            try:
+                allowed, remaining, reset_ms = await script(
+                    keys=[f"ratelimit:{{{key}}}:{window}"], args=[limit, window]
+                )
+                result = (bool(allowed), int(remaining), int(reset_ms) / 1000)
+            except Exception as e:
+                self.metrics['redis_errors'] += 1
+                logger.warning(f"Redis rate limit check failed, using local limiter: {e}")
+        if result is None:
+            result = self.local.hit(key, limit, window)
+
+        allowed, remaining, reset = result
+        self.metrics['allowed' if allowed else 'limited'] += 1
+        return {'allowed': allowed, 'limit': limit, 'remaining': remaining, 'reset': reset}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            'backend': 'redis' if self._script is not None else 'local',
+            'local_keys': len(self.local),
+        }
+
+
+# Global rate limiter
+rate_limiter = RateLimiter()
+
+
+def _client_identity(request: Request) -> str:
+    """The authenticated user if the bearer token verifies, otherwise the client IP."""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            subject = payload.get("user_id") or payload.get("sub")
+            if subject:
+                return f"user:{subject}"
+        except JWTError:
+            pass
+    return f"ip:{get_remote_address(request)}"
+
+
+class RateLimit:
+    """Rate limit dependency with a per-route, per-client quota.
+
+    ``quota`` defaults to ``RATE_LIMIT_DEFAULT``; ``RATE_LIMIT_ROUTES`` can
+    override it per route (``"POST /finance/expenses": "30/minute"``).
+    Responses carry ``X-RateLimit-Limit``/``-Remaining``/``-Reset`` and a
+    429 adds ``Retry-After``.
+    """
+
+    def __init__(self, quota: Optional[str] = None, name: Optional[str] = None):
+        self.quota = quota
+        self.name = name
+
+    async def __call__(self, request: Request, response: Response):
+        route = request.scope.get("route")
+        route_name = self.name or f"{request.method} {getattr(route, 'path', request.url.path)}"
+        quota = settings.RATE_LIMIT_ROUTES.get(route_name) or self.quota or settings.RATE_LIMIT_DEFAULT
+        limit, window = parse_quota(quota)
+
+        result = await rate_limiter.hit(f"{route_name}:{_client_identity(request)}", limit, window)
+        headers = {
+            "X-RateLimit-Limit": str(result['limit']),
+            "X-RateLimit-Remaining": str(result['remaining']),
+            "X-RateLimit-Reset": str(math.ceil(result['reset'])),
+        }
+        if not result['allowed']:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded. Please try again later.",
+                headers={**headers, "Retry-After": str(max(1, math.ceil(result['reset'])))}
+            )
+        response.headers.update(headers)
+        return True
+
+
+# Default dependency: RATE_LIMIT_DEFAULT per route and client
+rate_limit = RateLimit()
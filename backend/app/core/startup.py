@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# Measured from the first import of this module, which happens early in app.main
+_process_started = time.perf_counter()
+_import_stages: Dict[str, float] = {}
+_registry: Dict[str, "Lazy"] = {}
+
+
+class Lazy(Generic[T]):
+    """A process-wide object built on first use.
+
+    ``get()`` runs ``factory`` once (thread-safe) and caches the result, so
+    importing a module that declares a client no longer connects or loads
+    anything. Instances register themselves by ``name`` so the warm-up
+    endpoint and the startup report can see them. A factory that raises is
+    retried on the next ``get()``.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self.factory = factory
+        self._value: Optional[T] = None
+        self._initialized = False
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+        self.initialized_at: Optional[float] = None
+        _registry[name] = self
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    def get(self) -> T:
+        if self._initialized:
+            return self._value
+        with self._lock:
+            if not self._initialized:
+                started = time.perf_counter()
+                self._value = self.factory()
+                self.init_seconds = time.perf_counter() - started
+                self.initialized_at = time.perf_counter() - _process_started
+                self._initialized = True
+                logger.info(f"Initialized {self.name} in {self.init_seconds * 1000:.1f}ms")
+        return self._value
+
+    def set(self, value: T):
+        """Replace the value (tests, or a client swapped at runtime)."""
+        with self._lock:
+            self._value = value
+            self._initialized = True
+
+    def reset(self):
+        """Forget the value so the next ``get()`` rebuilds it."""
+        with self._lock:
+            self._value = None
+            self._initialized = False
+            self.init_seconds = None
+            self.initialized_at = None
+
+
+@contextmanager
+def import_stage(name: str):
+    """Record how long the imports inside the block took."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _import_stages[name] = time.perf_counter() - started
+
+
+async def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Initialise the named singletons (all of them by default) off the event loop."""
+    selected = list(names) if names is not None else list(_registry)
+    results = {}
+    for name in selected:
+        lazy = _registry.get(name)
+        if lazy is None:
+            results[name] = {'status': 'unknown'}
+            continue
+        if lazy.initialized:
+            results[name] = {'status': 'ready'}
+            continue
+        try:
+            await asyncio.to_thread(lazy.get)
+            results[name] = {'status': 'initialized', 'init_ms': round(lazy.init_seconds * 1000, 1)}
+        except Exception as e:
+            logger.error(f"Warm-up of {name} failed: {e}")
+            results[name] = {'status': 'failed', 'error': str(e)}
+    return results
+
+
+def startup_report() -> Dict[str, Any]:
+    """Import-time profile and the state of every lazy singleton."""
+    return {
+        'import_stages_ms': {name: round(seconds * 1000, 1) for name, seconds in _import_stages.items()},
+        'import_total_ms': round(sum(_import_stages.values()) * 1000, 1),
+        'uptime_s': round(time.perf_counter() - _process_started, 3),
+        'singletons': {
+            name: {
+                'initialized': lazy.initialized,
+                'init_ms': round(lazy.init_seconds * 1000, 1) if lazy.init_seconds is not None else None,
+                'initialized_at_s': round(lazy.initialized_at, 3) if lazy.initialized_at is not None else None,
+            }
+            for name, lazy in _registry.items()
+        },
+    }
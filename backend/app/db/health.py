@@ -1,8 +1,42 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.pool import Pool, QueuePool
 from loguru import logger
+from app.db.models import get_engine
 from app.db.session import get_db_session
 
+_pool_events = {'connections_opened': 0, 'checkouts': 0}
+
+
+# Registered on the Pool class so the engine can be created lazily
+@event.listens_for(Pool, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    _pool_events['connections_opened'] += 1
+
+
+@event.listens_for(Pool, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_events['checkouts'] += 1
+
+
+def get_pool_status() -> dict:
+    """Connection pool usage for the shared engine."""
+    pool = get_engine().pool
+    status = {
+        "pool_class": type(pool).__name__,
+        **_pool_events,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    return status
+
 
 async def check_database_connection() -> bool:
     """Check if the database connection is healthy."""
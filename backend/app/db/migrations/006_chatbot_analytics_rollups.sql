@@ -0,0 +1,77 @@
+-- Migration: Daily chatbot analytics rollups
+-- Date: 2024-01-XX
+
+-- Per-day, per-language counters (maintained by the analytics writer)
+CREATE TABLE IF NOT EXISTS chatbot_daily_stats (
+    day DATE NOT NULL,
+    language VARCHAR NOT NULL,
+    conversations INTEGER NOT NULL DEFAULT 0,
+    messages INTEGER NOT NULL DEFAULT 0,
+    responses INTEGER NOT NULL DEFAULT 0,
+    response_time_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    response_time_count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    confidence_count INTEGER NOT NULL DEFAULT 0,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    neutral INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, language)
+);
+
+-- Per-day intent counters
+CREATE TABLE IF NOT EXISTS chatbot_daily_intents (
+    day DATE NOT NULL,
+    intent VARCHAR NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, intent)
+);
+
+-- Backfill from existing rows. Each counter is recomputed from the source
+-- tables and overwritten, so re-running the backfill does not double-count.
+INSERT INTO chatbot_daily_stats (day, language, conversations)
+SELECT created_at::date, COALESCE(language, 'unknown'), COUNT(*)
+FROM conversations
+GROUP BY 1, 2
+ON CONFLICT (day, language) DO UPDATE
+SET conversations = EXCLUDED.conversations;
+
+INSERT INTO chatbot_daily_stats (day, language, messages)
+SELECT m.timestamp::date, COALESCE(c.language, 'unknown'), COUNT(*)
+FROM chat_messages m JOIN conversations c ON c.id = m.conversation_id
+-- Match the writer, which counts user and assistant turns only
+WHERE m.role IN ('user', 'assistant')
+GROUP BY 1, 2
+ON CONFLICT (day, language) DO UPDATE
+SET messages = EXCLUDED.messages;
+
+INSERT INTO chatbot_daily_stats (
+    day, language, responses, response_time_sum, response_time_count,
+    confidence_sum, confidence_count, positive, negative, neutral
+)
+SELECT a.created_at::date, COALESCE(c.language, 'unknown'), COUNT(*),
+       COALESCE(SUM(a.response_time), 0), COUNT(a.response_time),
+       COALESCE(SUM(a.confidence), 0), COUNT(a.confidence),
+       COUNT(*) FILTER (WHERE a.sentiment = 'positive'),
+       COUNT(*) FILTER (WHERE a.sentiment = 'negative'),
+       COUNT(*) FILTER (WHERE a.sentiment = 'neutral')
+FROM chatbot_analytics a JOIN conversations c ON c.id = a.conversation_id
+GROUP BY 1, 2
+ON CONFLICT (day, language) DO UPDATE
+SET responses = EXCLUDED.responses,
+    response_time_sum = EXCLUDED.response_time_sum,
+    response_time_count = EXCLUDED.response_time_count,
+    confidence_sum = EXCLUDED.confidence_sum,
+    confidence_count = EXCLUDED.confidence_count,
+    positive = EXCLUDED.positive,
+    negative = EXCLUDED.negative,
+    neutral = EXCLUDED.neutral;
+
+INSERT INTO chatbot_daily_intents (day, intent, count, confidence_sum)
+SELECT created_at::date, intent, COUNT(*), COALESCE(SUM(confidence), 0)
+FROM chatbot_analytics
+WHERE intent IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT (day, intent) DO UPDATE
+SET count = EXCLUDED.count,
+    confidence_sum = EXCLUDED.confidence_sum;
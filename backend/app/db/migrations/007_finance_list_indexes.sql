@@ -0,0 +1,18 @@
+-- Migration: Indexes for paginated finance lists
+-- Date: 2024-01-XX
+
+-- Keyset pagination walks (user_id, sort column, id) newest first
+CREATE INDEX IF NOT EXISTS idx_expenses_user_date_id
+ON expenses(user_id, date DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_expenses_user_category_date_id
+ON expenses(user_id, category, date DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_income_sources_user_created_id
+ON income_sources(user_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_budgets_user_created_id
+ON budgets(user_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_savings_goals_user_created_id
+ON savings_goals(user_id, created_at DESC, id DESC);
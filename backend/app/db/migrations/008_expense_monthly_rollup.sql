@@ -0,0 +1,22 @@
+-- Migration: Per-user monthly expense rollup
+-- Date: 2024-01-XX
+
+-- Maintained by the finance service in the same transaction as each expense write
+CREATE TABLE IF NOT EXISTS expense_monthly_rollup (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    month VARCHAR(7) NOT NULL,  -- 'YYYY-MM'
+    category VARCHAR NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month, category)
+);
+
+-- Backfill from existing rows (run before deploying the writer; later drift is
+-- repaired with `python -m app.tasks.expense_rollup` or POST /admin/finance/rollups/repair)
+INSERT INTO expense_monthly_rollup (user_id, month, category, total, count)
+SELECT user_id, to_char(date, 'YYYY-MM'), category, SUM(amount), COUNT(*)
+FROM expenses
+GROUP BY 1, 2, 3
+ON CONFLICT (user_id, month, category) DO UPDATE
+SET total = EXCLUDED.total,
+    count = EXCLUDED.count;
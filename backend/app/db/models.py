@@ -1,11 +1,13 @@
+import asyncio
 import datetime
 import uuid
 from typing import Optional
 
-from app.core.config import get_settings
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, Float, Boolean, JSON
-from sqlalchemy.ext.asyncio import (AsyncAttrs, async_sessionmaker,
-                                    create_async_engine)
+from app.core.config import get_settings, on_settings_reload
+from app.core.startup import Lazy
+from sqlalchemy import BigInteger, Column, Date, DateTime, ForeignKey, Index, Integer, String, Text, Float, Boolean, JSON
+from sqlalchemy.ext.asyncio import (AsyncAttrs, AsyncEngine, AsyncSession,
+                                    async_sessionmaker, create_async_engine)
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.pool import NullPool
 
@@ -19,48 +21,130 @@ if not DATABASE_URL or DATABASE_URL == "":
     DATABASE_URL = "sqlite+aiosqlite:///./kipesa_dev.db"
     print("⚠️  No DATABASE_URL provided, using local SQLite database for development")
 
-# Configure engine with optimized connection pool settings
-if "supabase" in DATABASE_URL.lower():
-    # Supabase uses NullPool - no pool parameters allowed
-    engine = create_async_engine(
-        DATABASE_URL,
-        echo=False,  # Disable SQL logging in production
-        future=True,
-        pool_pre_ping=True,  # Verify connections before use
-        pool_recycle=3600,   # Recycle connections after 1 hour
-        poolclass=NullPool
-    )
-elif "sqlite" in DATABASE_URL.lower():
-    # SQLite configuration for development
-    engine = create_async_engine(
-        DATABASE_URL,
-        echo=False,  # Disable SQL logging in production
-        future=True,
-        pool_pre_ping=True,  # Verify connections before use
-        pool_recycle=3600,   # Recycle connections after 1 hour
-        poolclass=NullPool
-    )
-else:
+
+def _is_pgbouncer(url: str) -> bool:
+    """Supabase's Supavisor/PgBouncer pooler (or an explicitly flagged one)."""
+    if settings.DB_PGBOUNCER is not None:
+        return settings.DB_PGBOUNCER
+    return "supabase" in url.lower() or "pgbouncer" in url.lower()
+
+
+def _pool_kwargs() -> dict:
+    """Bounded QueuePool sized from settings."""
+    return {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Verify connections before use
+        "pool_recycle": settings.DB_POOL_RECYCLE,    # Recycle connections periodically
+        "pool_size": settings.DB_POOL_SIZE,          # Connections kept open per process
+        "max_overflow": settings.DB_MAX_OVERFLOW,    # Additional connections beyond pool_size
+        "pool_timeout": settings.DB_POOL_TIMEOUT,    # Timeout for getting connection from pool
+    }
+
+
+def _create_engine() -> AsyncEngine:
+    """Configure engine with optimized connection pool settings."""
+    if "sqlite" in DATABASE_URL.lower():
+        # SQLite configuration for development
+        return create_async_engine(
+            DATABASE_URL,
+            echo=False,  # Disable SQL logging in production
+            future=True,
+            pool_pre_ping=True,  # Verify connections before use
+            pool_recycle=3600,   # Recycle connections after 1 hour
+            poolclass=NullPool
+        )
+    if _is_pgbouncer(DATABASE_URL):
+        # Supabase pooler in transaction mode: a server connection is only ours
+        # for one transaction, so prepared statements must not be cached or
+        # reused by name across checkouts.
+        connect_args = {}
+        if "asyncpg" in DATABASE_URL:
+            connect_args = {
+                "statement_cache_size": 0,           # asyncpg's own statement cache
+                "prepared_statement_cache_size": 0,  # SQLAlchemy's asyncpg cache
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        pool_kwargs = {"poolclass": NullPool} if settings.DB_USE_NULL_POOL else _pool_kwargs()
+        return create_async_engine(
+            DATABASE_URL,
+            echo=False,  # Disable SQL logging in production
+            future=True,
+            connect_args=connect_args,
+            **pool_kwargs
+        )
     # Regular database with connection pooling
-    engine = create_async_engine(
+    return create_async_engine(
         DATABASE_URL,
         echo=False,  # Disable SQL logging in production
         future=True,
-        pool_pre_ping=True,  # Verify connections before use
-        pool_recycle=3600,   # Recycle connections after 1 hour
-        pool_size=20,         # Maximum number of connections in pool
-        max_overflow=30,      # Additional connections beyond pool_size
-        pool_timeout=30       # Timeout for getting connection from pool
+        **_pool_kwargs()
     )
 
+
+# Global engine, created on first use (loads the DB driver)
+_engine = Lazy("database_engine", _create_engine)
+
+
+def get_engine() -> AsyncEngine:
+    return _engine.get()
+
+
+class _LazySessionMaker:
+    """``async_sessionmaker`` that binds to the engine on the first session."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self._maker: Optional[async_sessionmaker] = None
+
+    def __call__(self, **kwargs) -> AsyncSession:
+        if self._maker is None:
+            self._maker = async_sessionmaker(get_engine(), **self.kwargs)
+        return self._maker(**kwargs)
+
+
 # Configure session with proper settings
-AsyncSessionLocal = async_sessionmaker(
-    engine,
+AsyncSessionLocal = _LazySessionMaker(
     expire_on_commit=False,
     autoflush=False,
     autocommit=False
 )
 
+
+_disposals: set = set()
+
+POOL_SETTINGS = {
+    "DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_POOL_TIMEOUT", "DB_POOL_RECYCLE",
+    "DB_POOL_PRE_PING", "DB_PGBOUNCER", "DB_USE_NULL_POOL",
+}
+
+
+@on_settings_reload
+def _rebuild_engine(settings, changed):
+    """Swap in an engine with the new pool settings.
+
+    New sessions use the new engine; sessions already open finish on the old
+    one, whose idle connections are closed. ``DATABASE_URL`` itself is only
+    read at startup.
+    """
+    if not changed & POOL_SETTINGS or not _engine.initialized:
+        return
+    old_engine = _engine.get()
+    _engine.reset()
+    AsyncSessionLocal._maker = None
+    try:
+        task = asyncio.get_running_loop().create_task(old_engine.dispose())
+    except RuntimeError:
+        return  # no loop: the old pool's connections close when it is collected
+    _disposals.add(task)
+    task.add_done_callback(_disposals.discard)
+
+
+def __getattr__(name: str):
+    # ``engine`` is still importable; importing it creates the engine
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 Base = declarative_base(cls=AsyncAttrs)
 
 
@@ -104,6 +188,11 @@ class IncomeSource(Base):
         DateTime, default=datetime.datetime.utcnow
     )
 
+    # Keyset pagination (see 007_finance_list_indexes.sql)
+    __table_args__ = (
+        Index("idx_income_sources_user_created_id", "user_id", created_at.desc(), id.desc()),
+    )
+
 
 class Expense(Base):
     __tablename__ = "expenses"
@@ -115,6 +204,11 @@ class Expense(Base):
     date = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("idx_expenses_user_date_id", "user_id", date.desc(), id.desc()),
+        Index("idx_expenses_user_category_date_id", "user_id", "category", date.desc(), id.desc()),
+    )
+
 
 class Budget(Base):
     __tablename__ = "budgets"
@@ -125,6 +219,10 @@ class Budget(Base):
     period = Column(String, nullable=False)  # e.g., 'monthly', 'yearly'
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("idx_budgets_user_created_id", "user_id", created_at.desc(), id.desc()),
+    )
+
 
 class SavingsGoal(Base):
     __tablename__ = "savings_goals"
@@ -135,6 +233,20 @@ class SavingsGoal(Base):
     target_date = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("idx_savings_goals_user_created_id", "user_id", created_at.desc(), id.desc()),
+    )
+
+
+class ExpenseMonthlyRollup(Base):
+    """Per-user, per-month, per-category expense totals kept in step with ``expenses``."""
+    __tablename__ = "expense_monthly_rollup"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # 'YYYY-MM'
+    category = Column(String, primary_key=True)
+    total = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
 
 # Chatbot Models
 class Conversation(Base):
@@ -181,6 +293,32 @@ class ChatbotAnalytics(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
 
+class ChatbotDailyStats(Base):
+    """Per-day, per-language chatbot counters maintained by the analytics writer."""
+    __tablename__ = "chatbot_daily_stats"
+    day = Column(Date, primary_key=True)
+    language = Column(String, primary_key=True)
+    conversations = Column(Integer, nullable=False, default=0)
+    messages = Column(Integer, nullable=False, default=0)
+    responses = Column(Integer, nullable=False, default=0)
+    response_time_sum = Column(Float, nullable=False, default=0.0)
+    response_time_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+
+
+class ChatbotDailyIntent(Base):
+    """Per-day intent counters maintained by the analytics writer."""
+    __tablename__ = "chatbot_daily_intents"
+    day = Column(Date, primary_key=True)
+    intent = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+
+
 class KnowledgeBase(Base):
     __tablename__ = "knowledge_base"
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
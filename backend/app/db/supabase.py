@@ -1,6 +1,19 @@
 from app.core.config import get_settings
-from supabase import Client, create_client
+from app.core.startup import Lazy
 
 settings = get_settings()
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+def _create_supabase_client():
+    # Imported here: the supabase package is slow to import and only a few
+    # auth flows need it
+    from supabase import create_client
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+
+# Global Supabase client, created on first use
+_supabase = Lazy("supabase", _create_supabase_client)
+
+
+def get_supabase():
+    return _supabase.get()
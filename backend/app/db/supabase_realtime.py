@@ -1,9 +1,7 @@
 from app.core.config import get_settings
 from loguru import logger
-from supabase import create_client
 
 settings = get_settings()
-supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 
 def subscribe_to_table(table_name: str, callback):
@@ -12,7 +10,7 @@ def subscribe_to_table(table_name: str, callback):
         f"Subscribing to real-time changes on {table_name}"
     )
     # This is a placeholder; actual implementation depends on supabase-py real-time support
-    # supabase.realtime.subscribe(table_name, callback)
+    # get_supabase().realtime.subscribe(table_name, callback)
     pass
 
 
@@ -0,0 +1,47 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import and_, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def upsert_increments(session: AsyncSession, model, rows: List[Dict[str, Any]], key_columns: List[str]):
+    """Add ``rows`` onto existing counter rows, inserting the ones that are missing.
+
+    PostgreSQL and SQLite use a single ``INSERT ... ON CONFLICT DO UPDATE``;
+    other dialects update row by row and insert where nothing matched.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    value_columns = [column for column in rows[0] if column not in key_columns]
+
+    dialect = session.bind.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + stmt.excluded[column] for column in value_columns}
+        )
+        await session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        await _increment_row(session, table, row, key_columns, value_columns)
+
+
+async def _increment_row(session: AsyncSession, table, row: Dict[str, Any], key_columns: List[str], value_columns: List[str]):
+    stmt = (
+        update(table)
+        .where(and_(*[table.c[column] == row[column] for column in key_columns]))
+        .values({column: table.c[column] + row[column] for column in value_columns})
+    )
+    if (await session.execute(stmt)).rowcount:
+        return
+    try:
+        async with session.begin_nested():
+            await session.execute(insert(table).values(row))
+    except IntegrityError:
+        # Another transaction inserted the row first
+        await session.execute(stmt)
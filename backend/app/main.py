@@ -1,22 +1,80 @@
-import uvicorn
-from app.api import api_router
-from app.core.config import get_settings
-from app.core.error_handlers import add_error_handlers
-from app.core.logging import setup_logging
-from app.core.rate_limit import limiter
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.openapi.utils import get_openapi
-from slowapi.middleware import SlowAPIMiddleware
+import asyncio
+import signal
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+from app.core.startup import import_stage, warm_up
+
+with import_stage("framework"):
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.openapi.utils import get_openapi
+    from slowapi.middleware import SlowAPIMiddleware
+
+with import_stage("core"):
+    from app.core.cache import cache_manager
+    from app.core.config import get_settings, reload_settings
+    from app.core.error_handlers import add_error_handlers
+    from app.core.logging import setup_logging
+    from app.core.rate_limit import limiter
+
+with import_stage("services"):
+    from app.services.llm import llm_client_manager
+    from app.services.passwords import password_hasher
+    from app.services.semantic_search import semantic_search_service
+    from app.tasks.analytics import analytics_writer
+
+with import_stage("routers"):
+    from app.api import api_router
 
 settings = get_settings()
 
 setup_logging()
 
+
+def _reload_settings_on_signal():
+    try:
+        reload_settings()
+    except Exception as e:
+        logger.error(f"Settings reload on SIGHUP failed: {e}")
+
+
+def _install_sighup_handler() -> bool:
+    """``kill -HUP <pid>`` reloads settings (main-thread event loops on Unix only)."""
+    if not hasattr(signal, "SIGHUP"):
+        return False
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _reload_settings_on_signal)
+        return True
+    except (NotImplementedError, RuntimeError, ValueError):
+        return False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop application-lifetime background services."""
+    if settings.WARMUP_ON_STARTUP:
+        await warm_up(settings.WARMUP_SERVICES)
+    await cache_manager.start_invalidation_listener()
+    analytics_writer.start()
+    sighup_installed = _install_sighup_handler()
+    yield
+    if sighup_installed:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+    await analytics_writer.stop()
+    await llm_client_manager.close()
+    await asyncio.to_thread(semantic_search_service.batcher.close)
+    await asyncio.to_thread(password_hasher.close)
+    await cache_manager.stop_invalidation_listener()
+
+
 app = FastAPI(
     title="Kipesa API", 
     version="1.0.0",
     description="Kipesa Finance Platform API",
+    lifespan=lifespan,
     openapi_tags=[
         {"name": "auth", "description": "Authentication operations"},
         {"name": "finance", "description": "Financial data operations"},
@@ -34,6 +92,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "Retry-After",
+        "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset",
+    ],
 )
 
 # Rate Limiting
@@ -0,0 +1,47 @@
+from typing import Annotated, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+# Keeps every projection within float range: at the rate cap over the longest
+# term, growth is ~1e158, so amounts up to 1e12 stay finite
+MAX_AMOUNT = 1e12
+Rate = Annotated[float, Field(ge=0, le=1000)]
+Term = Annotated[int, Field(ge=1)]
+
+
+class ScenarioGrid(BaseModel):
+    """Rates and terms to sweep; every combination is computed."""
+    annual_rates: List[Rate] = Field(..., min_length=1, description="Annual rates in percent")
+    terms_months: List[Term] = Field(..., min_length=1)
+
+    model_config = {
+        "extra": "forbid"
+    }
+
+
+class LoanRequest(BaseModel):
+    principal: float = Field(..., gt=0, le=MAX_AMOUNT)
+    annual_rate: float = Field(..., ge=0, le=1000, description="Annual interest rate in percent, e.g. 18 for 18%")
+    term_months: int = Field(..., ge=1)
+    include_schedule: bool = True
+    scenarios: Optional[ScenarioGrid] = None
+
+    model_config = {
+        "extra": "forbid"
+    }
+
+
+class SavingsRequest(BaseModel):
+    initial_deposit: float = Field(0.0, ge=0, le=MAX_AMOUNT)
+    monthly_contribution: float = Field(0.0, ge=0, le=MAX_AMOUNT)
+    annual_rate: float = Field(..., ge=0, le=1000, description="Annual interest rate in percent, compounded monthly")
+    term_months: int = Field(..., ge=1)
+    contribution_timing: Literal["end", "start"] = "end"
+    target_amount: Optional[float] = Field(None, gt=0, le=MAX_AMOUNT)
+    include_schedule: bool = True
+    scenarios: Optional[ScenarioGrid] = None
+
+    model_config = {
+        "extra": "forbid"
+    }
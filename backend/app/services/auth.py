@@ -1,11 +1,15 @@
+import asyncio
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set
 
+from app.core.cache import LocalCache, cache_manager
 from app.core.config import get_settings
-from app.db.models import User
-from app.db.supabase import supabase
+from app.db.models import AsyncSessionLocal, User
+from app.db.supabase import get_supabase
+from app.services.passwords import PasswordHasherBusy, password_hasher
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from loguru import logger
@@ -14,21 +18,111 @@ from fastapi.security import HTTPBearer
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 ALGORITHM = settings.ALGORITHM
 SECRET_KEY = settings.SECRET_KEY
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 security = HTTPBearer()
 
+class RevokedUsers:
+    """Ids of deleted users whose tokens must be rejected until they expire.
+
+    Kept apart from the id cache so lookups can never evict a marker: the
+    in-process set only drops entries once their TTL has passed. Markers
+    are also written through ``cache_manager`` so every worker sees them;
+    with Redis, an id missing locally is checked there and a negative answer
+    is trusted for ``AUTH_REVOCATION_CHECK_TTL`` seconds, so a deletion
+    reaches other workers within that window without a Redis round trip on
+    every request.
+    """
+
+    def __init__(self):
+        self._expires: Dict[int, float] = {}
+        self._pending: Set[asyncio.Task] = set()
+        # user id -> recently confirmed not revoked (one size unit per entry)
+        self._not_revoked = LocalCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_SIZE)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"revoked_user:{user_id}"
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    def add(self, user_id: int, ttl: float):
+        """Reject ``user_id`` here at once and publish the marker in the background."""
+        self._expires[user_id] = time.monotonic() + ttl
+        self._not_revoked.delete(user_id)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            task = loop.create_task(cache_manager.set(self._key(user_id), True, int(ttl)))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+        else:
+            asyncio.run(cache_manager.set(self._key(user_id), True, int(ttl)))
 
+    async def contains(self, user_id: int) -> bool:
+        expires = self._expires.get(user_id)
+        if expires is not None:
+            if expires > time.monotonic():
+                return True
+            del self._expires[user_id]
+        if cache_manager.redis_client is None:
+            return False
+        if self._not_revoked.get(user_id, None):
+            return False
+        revoked = await cache_manager.exists(self._key(user_id))
+        if not revoked:
+            self._not_revoked.set(user_id, True, settings.AUTH_REVOCATION_CHECK_TTL, 1)
+        return revoked
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+
+# Global token subject -> user id cache (one size unit per entry)
+_user_ids = LocalCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_SIZE)
+# Global deny list of deleted users, kept for the token lifetime
+revoked_users = RevokedUsers()
+
+
+def _hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _hashing_unavailable()
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _hashing_unavailable()
+
+
+async def rehash_password_if_needed(session: AsyncSession, user: User, password: str) -> bool:
+    """Re-hash ``password`` at the current bcrypt cost after a successful verify.
+
+    Returns True if the stored hash was replaced. Failures are logged and never
+    block the login that triggered them.
+    """
+    if not password_hasher.needs_rehash(user.hashed_password):
+        return False
+    try:
+        if not await verify_password(password, user.hashed_password):
+            return False
+        user.hashed_password = await hash_password(password)
+        await session.commit()
+        return True
+    except Exception as e:
+        await session.rollback()
+        logger.warning(f"Password rehash failed for user {user.id}: {e}")
+        return False
 
 
 async def get_user_by_email(session: AsyncSession, email: str):
@@ -38,6 +132,8 @@ async def get_user_by_email(session: AsyncSession, email: str):
 
 async def create_user_supabase_and_local(session: AsyncSession, user_data: dict):
     """Mock registration for development - replace with real Supabase auth in production"""
+    # Hash off the event loop before touching the session
+    hashed_password = await hash_password(user_data["password"])
     try:
         # For development, just create user in local DB
         # In production, this should use real Supabase authentication
@@ -49,7 +145,7 @@ async def create_user_supabase_and_local(session: AsyncSession, user_data: dict)
             gender=user_data.get("gender"),
             location=user_data.get("location"),
             language=user_data.get("language", "en"),
-            hashed_password=hash_password(user_data["password"]),
+            hashed_password=hashed_password,
         )
         session.add(user)
         await session.commit()
@@ -90,6 +186,47 @@ def decode_access_token(token: str):
         return None
 
 
+async def resolve_user_id(payload: dict) -> Optional[int]:
+    """User id for a verified token payload, without a query in the common case.
+
+    Tokens issued at login carry ``user_id``, which is trusted once the
+    signature has been verified unless the user has since been deleted
+    (:data:`revoked_users`). Older tokens only have ``sub`` (the email);
+    those are resolved once and kept in a bounded LRU/TTL cache.
+    """
+    user_id = payload.get("user_id")
+    if user_id is not None:
+        if await revoked_users.contains(user_id):
+            return None
+        return user_id
+
+    email = payload.get("sub")
+    if not email:
+        return None
+    user_id = _user_ids.get(email, None)
+    if user_id is not None:
+        return user_id
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(User.id).where(User.email == email))
+        user_id = result.scalar()
+    if user_id:
+        _user_ids.set(email, user_id, settings.AUTH_USER_CACHE_TTL, 1)
+    return user_id
+
+
+def invalidate_user_cache(email: str, user_id: Optional[int] = None):
+    """Forget a user's cached id; with ``user_id``, also reject tokens carrying it."""
+    _user_ids.delete(email)
+    if user_id is not None:
+        revoked_users.add(user_id, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    invalidate_user_cache(target.email, target.id)
+
+
 def get_supabase_user(access_token: str):
     """Get user info from local JWT token"""
     try:
@@ -131,7 +268,7 @@ def change_supabase_password(access_token: str, new_password: str):
 
 
 def send_supabase_password_reset(email: str):
-    resp = supabase.auth.reset_password_for_email(email)
+    resp = get_supabase().auth.reset_password_for_email(email)
     return resp
 
 
@@ -139,8 +276,8 @@ async def get_current_user_id(token: str = Depends(security)) -> Optional[int]:
     """Get current user ID from JWT token."""
     try:
         payload = decode_access_token(token.credentials)
-        if payload and payload.get("user_id"):
-            return payload["user_id"]
+        if payload:
+            return await resolve_user_id(payload)
         return None
     except Exception as e:
         logger.error(f"Error getting current user ID: {e}")
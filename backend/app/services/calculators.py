@@ -0,0 +1,268 @@
+import hashlib
+import json
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.cache import cache_manager
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def monthly_rate(annual_rate):
+    """Annual percent -> monthly fraction (scalar or array)."""
+    return np.asarray(annual_rate, dtype=np.float64) / 1200.0
+
+
+def _growth(rate: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    """``(1 + rate) ** periods`` without losing precision for small rates."""
+    return np.exp(periods * np.log1p(rate))
+
+
+def _annuity_factor(rate: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    """Future value of 1 paid at the end of each period: ``((1 + r)^n - 1) / r``, ``n`` when ``r`` is 0."""
+    safe = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, periods, np.expm1(periods * np.log1p(safe)) / safe)
+
+
+def loan_payment(principal: float, rate: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    """Level payment for each (rate, periods) pair; inputs broadcast."""
+    rate = np.asarray(rate, dtype=np.float64)
+    periods = np.asarray(periods, dtype=np.float64)
+    safe = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, principal / periods, principal * safe / -np.expm1(-periods * np.log1p(safe)))
+
+
+def amortisation_schedule(principal: float, annual_rate: float, term_months: int) -> Dict[str, np.ndarray]:
+    """Whole schedule in closed form, one array operation per column."""
+    rate = monthly_rate(annual_rate)
+    payment = float(loan_payment(principal, rate, term_months))
+    periods = np.arange(1, term_months + 1, dtype=np.float64)
+    # P * ((1+r)^n - (1+r)^k) / ((1+r)^n - 1), written so nothing large is subtracted
+    if rate == 0:
+        balance = principal * (term_months - periods) / term_months
+    else:
+        balance = principal * -np.expm1((periods - term_months) * np.log1p(rate)) / -np.expm1(-term_months * np.log1p(rate))
+    balance[-1] = 0.0
+    opening = np.concatenate(([principal], balance[:-1]))
+    interest = opening * rate
+    return {
+        'period': periods.astype(np.int64),
+        'payment': np.full(term_months, payment),
+        'principal': opening - balance,
+        'interest': interest,
+        'balance': balance,
+        'cumulative_interest': np.cumsum(interest),
+    }
+
+
+def savings_schedule(
+    initial_deposit: float,
+    monthly_contribution: float,
+    annual_rate: float,
+    term_months: int,
+    contribution_timing: str = "end"
+) -> Dict[str, np.ndarray]:
+    """Month-end balances with monthly compounding and a fixed contribution."""
+    rate = monthly_rate(annual_rate)
+    periods = np.arange(1, term_months + 1, dtype=np.float64)
+    timing = 1 + rate if contribution_timing == "start" else 1.0
+    balance = (initial_deposit * _growth(rate, periods)
+               + monthly_contribution * _annuity_factor(rate, periods) * timing)
+    contributed = initial_deposit + monthly_contribution * periods
+    return {
+        'period': periods.astype(np.int64),
+        'contributed': contributed,
+        'interest': balance - contributed,
+        'balance': balance,
+    }
+
+
+def months_to_target(
+    initial_deposit: float,
+    monthly_contribution: float,
+    annual_rate: float,
+    target_amount: float,
+    contribution_timing: str = "end"
+) -> Optional[int]:
+    """First month whose balance reaches ``target_amount``; ``None`` if it never does."""
+    if initial_deposit >= target_amount:
+        return 0
+    rate = float(monthly_rate(annual_rate))
+    if rate == 0:
+        if monthly_contribution <= 0:
+            return None
+        return math.ceil((target_amount - initial_deposit) / monthly_contribution)
+    contribution = monthly_contribution * (1 + rate if contribution_timing == "start" else 1.0)
+    denominator = initial_deposit * rate + contribution
+    if denominator <= 0:
+        return None
+    # Solve initial * g + contribution * (g - 1) / r = target for g = (1 + r)^n
+    growth = (target_amount * rate + contribution) / denominator
+    return math.ceil(math.log(growth) / math.log1p(rate) - 1e-9)
+
+
+def _grid(scenarios: Dict[str, List[float]]):
+    rates = np.array(scenarios['annual_rates'], dtype=np.float64)
+    terms = np.array(scenarios['terms_months'], dtype=np.float64)
+    return rates, terms, monthly_rate(rates)[:, None], terms[None, :]
+
+
+def loan_scenarios(principal: float, scenarios: Dict[str, List[float]]) -> Dict[str, Any]:
+    """Payment and cost for every rate x term pair in one broadcast pass."""
+    rates, terms, rate, periods = _grid(scenarios)
+    payment = loan_payment(principal, rate, periods)
+    total_paid = payment * periods
+    _require_finite(payment, total_paid)
+    return {
+        'annual_rates': rates.tolist(),
+        'terms_months': terms.astype(np.int64).tolist(),
+        'payment': _round(payment),
+        'total_paid': _round(total_paid),
+        'total_interest': _round(total_paid - principal),
+    }
+
+
+def savings_scenarios(
+    initial_deposit: float,
+    monthly_contribution: float,
+    contribution_timing: str,
+    scenarios: Dict[str, List[float]]
+) -> Dict[str, Any]:
+    """Final balance for every rate x term pair in one broadcast pass."""
+    rates, terms, rate, periods = _grid(scenarios)
+    timing = 1 + rate if contribution_timing == "start" else 1.0
+    balance = (initial_deposit * _growth(rate, periods)
+               + monthly_contribution * _annuity_factor(rate, periods) * timing)
+    contributed = np.broadcast_to(initial_deposit + monthly_contribution * periods, balance.shape)
+    _require_finite(balance, contributed)
+    return {
+        'annual_rates': rates.tolist(),
+        'terms_months': terms.astype(np.int64).tolist(),
+        'final_balance': _round(balance),
+        'total_contributed': _round(contributed),
+        'total_interest': _round(balance - contributed),
+    }
+
+
+def _require_finite(*arrays: np.ndarray):
+    """Overflowed inputs must not reach the JSON encoder as inf/nan (``ValueError``)."""
+    for values in arrays:
+        if not np.all(np.isfinite(values)):
+            raise ValueError("Inputs are too large to calculate; reduce the amounts, rate or term")
+
+
+def _round(values: np.ndarray) -> list:
+    return np.round(values, 2).tolist()
+
+
+def _rows(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    rounded = {name: (values.tolist() if values.dtype.kind == 'i' else _round(values)) for name, values in columns.items()}
+    return [dict(zip(rounded, row)) for row in zip(*rounded.values())]
+
+
+def canonicalize(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise a request so equivalent inputs share a cache key and a response.
+
+    Floats are reduced to 10 significant digits and scenario axes are
+    sorted and de-duplicated.
+    """
+    def normalise(value):
+        if isinstance(value, float):
+            return float(f"{value:.10g}")
+        if isinstance(value, dict):
+            return {key: normalise(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [normalise(item) for item in value]
+        return value
+
+    params = normalise(params)
+    if params.get('scenarios'):
+        params['scenarios'] = {
+            axis: sorted(set(values)) for axis, values in params['scenarios'].items()
+        }
+    return params
+
+
+def validate_limits(params: Dict[str, Any]):
+    """Reject inputs that would make a response unreasonably large (``ValueError``)."""
+    max_periods = settings.CALCULATOR_MAX_PERIODS
+    terms = [params['term_months']]
+    scenarios = params.get('scenarios')
+    if scenarios:
+        terms += scenarios['terms_months']
+        count = len(scenarios['annual_rates']) * len(scenarios['terms_months'])
+        if count > settings.CALCULATOR_MAX_SCENARIOS:
+            raise ValueError(f"At most {settings.CALCULATOR_MAX_SCENARIOS} scenarios per request (got {count})")
+        if min(scenarios['terms_months']) < 1:
+            raise ValueError("Scenario terms must be at least 1 month")
+        if min(scenarios['annual_rates']) < 0 or max(scenarios['annual_rates']) > 1000:
+            raise ValueError("Scenario rates must be between 0 and 1000 percent")
+    if max(terms) > max_periods:
+        raise ValueError(f"Terms are limited to {max_periods} months")
+
+
+# Overflow shows up as inf/nan and is rejected by _require_finite instead
+@np.errstate(over='ignore', invalid='ignore')
+def calculate_loan(params: Dict[str, Any]) -> Dict[str, Any]:
+    principal, annual_rate, term_months = params['principal'], params['annual_rate'], params['term_months']
+    schedule = amortisation_schedule(principal, annual_rate, term_months)
+    _require_finite(*schedule.values())
+    payment = float(schedule['payment'][0])
+    result = {
+        'monthly_payment': round(payment, 2),
+        'total_paid': round(payment * term_months, 2),
+        'total_interest': round(float(schedule['cumulative_interest'][-1]), 2),
+    }
+    if params.get('include_schedule', True):
+        result['schedule'] = _rows(schedule)
+    if params.get('scenarios'):
+        result['scenarios'] = loan_scenarios(principal, params['scenarios'])
+    return result
+
+
+@np.errstate(over='ignore', invalid='ignore')
+def calculate_savings(params: Dict[str, Any]) -> Dict[str, Any]:
+    timing = params.get('contribution_timing', 'end')
+    schedule = savings_schedule(
+        params['initial_deposit'], params['monthly_contribution'],
+        params['annual_rate'], params['term_months'], timing
+    )
+    _require_finite(*schedule.values())
+    result = {
+        'final_balance': round(float(schedule['balance'][-1]), 2),
+        'total_contributed': round(float(schedule['contributed'][-1]), 2),
+        'total_interest': round(float(schedule['interest'][-1]), 2),
+    }
+    if params.get('target_amount'):
+        result['months_to_target'] = months_to_target(
+            params['initial_deposit'], params['monthly_contribution'],
+            params['annual_rate'], params['target_amount'], timing
+        )
+    if params.get('include_schedule', True):
+        result['schedule'] = _rows(schedule)
+    if params.get('scenarios'):
+        result['scenarios'] = savings_scenarios(
+            params['initial_deposit'], params['monthly_contribution'], timing, params['scenarios']
+        )
+    return result
+
+
+async def cached_calculation(name: str, params: Dict[str, Any], compute: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run ``compute`` on the canonical form of ``params``, caching the result.
+
+    Results depend only on the input, so they are shared across users and
+    processes through ``cache_manager``.
+    """
+    params = canonicalize(params)
+    validate_limits(params)
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    key = f"calculator:{name}:{digest}"
+    cached = await cache_manager.get(key)
+    if cached is not None:
+        return cached
+    result = compute(params)
+    await cache_manager.set(key, result, settings.CALCULATOR_CACHE_TTL)
+    return result
@@ -3,16 +3,23 @@ import json
 import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
-import openai
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import selectinload
 
 from app.core.config import get_settings
-from app.core.cache import cache_manager, get_cached_knowledge_base, cache_knowledge_base, get_cached_conversation_history, cache_conversation_history, get_cached_user_profile, cache_user_profile
-from app.db.models import Conversation, ChatMessage, ChatbotAnalytics, KnowledgeBase, User
+from app.core.cache import cache_manager, get_cached_knowledge_base, cache_knowledge_base, get_cached_conversation_window, cache_conversation_window, append_conversation_window, get_cached_user_profile, cache_user_profile
+from app.db.models import Conversation, ChatMessage, ChatbotAnalytics, ChatbotDailyIntent, ChatbotDailyStats, KnowledgeBase, User
+from app.services.context_builder import context_builder
+from app.services.knowledge_chunks import chunk_knowledge
+from app.services.knowledge_index import KnowledgeIndex
+from app.services.llm import llm_client_manager
+from app.services.prompts import prompt_registry
+from app.services.response_cache import response_cache
+from app.db.upsert import upsert_increments
+from app.tasks.analytics import analytics_writer
 from app.schemas.chatbot import (
     ChatRequest, ChatResponse, ConversationCreate, ConversationResponse,
     Message, MessageRole, Language, ChatbotFeedback
@@ -20,145 +27,19 @@ from app.schemas.chatbot import (
 
 settings = get_settings()
 
-# Configure OpenAI client with timeout
-openai.api_key = settings.OPENAI_API_KEY
+
+class ConversationNotFound(Exception):
+    """Raised when a message names a conversation that is missing or not the user's."""
 
 
 class ChatbotService:
     def __init__(self):
-        self.system_prompts = {
-            Language.ENGLISH: """You are Kipesa, a helpful AI financial assistant for Tanzanian users. 
-            You provide personalized financial advice, help with budgeting, explain Tanzanian financial regulations, 
-            and assist with financial planning. Be conversational, empathetic, and culturally aware. 
-            Always provide practical, actionable advice with real Tanzanian examples and calculations.
-
-            IMPORTANT: Always provide specific, local examples using Tanzanian Shillings (TSh), 
-            Tanzanian banks (CRDB, NMB, NBC, etc.), Tanzanian financial products, and local context.
-
-            EXAMPLES AND SIMULATIONS TO USE:
-
-            BUDGETING EXAMPLES:
-            - Monthly salary: TSh 800,000
-            - Rent in Dar es Salaam: TSh 300,000-500,000
-            - Food expenses: TSh 150,000-200,000
-            - Transport (daladala): TSh 50,000-80,000
-            - Utilities: TSh 30,000-50,000
-            - Savings goal: 20% of income
-
-            SAVINGS EXAMPLES:
-            - Emergency fund: 3-6 months of expenses
-            - Mobile money: M-Pesa, Airtel Money, Tigo Pesa
-            - Bank savings: CRDB, NMB, NBC accounts
-            - Investment options: Treasury bonds, mutual funds
-
-            LOAN EXAMPLES:
-            - CRDB personal loan: 15-18% interest
-            - NMB business loan: 12-16% interest
-            - Microfinance: SELFINA, PRIDE Tanzania
-            - Student loans: HESLB (Higher Education Students' Loans Board)
-
-            TAX EXAMPLES:
-            - PAYE (Pay As You Earn): Progressive rates
-            - VAT: 18% on goods and services
-            - Corporate tax: 30% for companies
-            - Withholding tax: 15% on certain payments
-
-            INVESTMENT EXAMPLES:
-            - Treasury bonds: 10-15% returns
-            - Dar es Salaam Stock Exchange (DSE)
-            - Real estate: Dar es Salaam, Arusha, Mwanza
-            - Unit trusts: NMB, CRDB, Stanbic
-
-            BANKING EXAMPLES:
-            - CRDB Bank: Largest bank in Tanzania
-            - NMB Bank: Government-owned bank
-            - NBC Bank: International presence
-            - Mobile banking: M-Pesa, Airtel Money
-
-            REGULATORY EXAMPLES:
-            - Bank of Tanzania (BoT): Central bank
-            - Tanzania Revenue Authority (TRA): Tax collection
-            - Capital Markets and Securities Authority (CMSA)
-            - Insurance Regulatory Authority (IRA)
-
-            Always include:
-            1. Specific amounts in Tanzanian Shillings
-            2. Real Tanzanian bank names and products
-            3. Local market rates and fees
-            4. Tanzanian regulations and requirements
-            5. Practical steps with local institutions
-            6. Cultural context and local practices
-
-            If you're unsure about specific regulations, recommend consulting official sources like Bank of Tanzania or TRA.""",
-            
-            Language.SWAHILI: """Wewe ni Kipesa, msaidizi wa AI wa kifedha kwa watumiaji wa Tanzania. 
-            Unatoa ushauri wa kifedha wa kibinafsi, kusaidia na bajeti, kuelezea kanuni za kifedha za Tanzania, 
-            na kusaidia na mpango wa kifedha. Kuwa mwenye mazungumzo, mwenye huruma, na mwenye ufahamu wa kitamaduni. 
-            Daima toa ushauri wa vitendo, unaoweza kutekelezwa na mifano halisi ya Tanzania.
-
-            MUHIMU: Daima toa mifano maalum kwa kutumia Shilingi za Tanzania (TSh), 
-            benki za Tanzania (CRDB, NMB, NBC, n.k.), bidhaa za kifedha za Tanzania, na muktadha wa ndani.
-
-            MIFANO NA MIFANISHO YA KUTUMIA:
-
-            MIFANO YA BAJETI:
-            - Mshahara wa kila mwezi: TSh 800,000
-            - Kodi ya nyumba Dar es Salaam: TSh 300,000-500,000
-            - Gharama za chakula: TSh 150,000-200,000
-            - Usafiri (daladala): TSh 50,000-80,000
-            - Huduma za msingi: TSh 30,000-50,000
-            - Lengo la kuweka pesa: 20% ya mapato
-
-            MIFANO YA KUWEKA PESA:
-            - Mfuko wa dharura: Miezi 3-6 ya gharama
-            - Pesa za simu: M-Pesa, Airtel Money, Tigo Pesa
-            - Akaunti za benki: CRDB, NMB, NBC
-            - Chaguo za uwekezaji: Treasury bonds, mutual funds
-
-            MIFANO YA MIKOPO:
-            - Mikopo ya kibinafsi CRDB: 15-18% riba
-            - Mikopo ya biashara NMB: 12-16% riba
-            - Mikopo ndogo: SELFINA, PRIDE Tanzania
-            - Mikopo ya wanafunzi: HESLB
-
-            MIFANO YA KODI:
-            - PAYE: Viwango vya mafanikio
-            - VAT: 18% kwa bidhaa na huduma
-            - Kodi ya kampuni: 30% kwa kampuni
-            - Kodi ya kuhifadhi: 15% kwa malipo fulani
-
-            MIFANO YA UWEKEZAJI:
-            - Treasury bonds: 10-15% faida
-            - Dar es Salaam Stock Exchange (DSE)
-            - Mali isiyohamishika: Dar es Salaam, Arusha, Mwanza
-            - Unit trusts: NMB, CRDB, Stanbic
-
-            MIFANO YA BANKKI:
-            - CRDB Bank: Benki kubwa zaidi Tanzania
-            - NMB Bank: Benki ya serikali
-            - NBC Bank: Uwepo wa kimataifa
-            - Benki ya simu: M-Pesa, Airtel Money
-
-            MIFANO YA KANUNI:
-            - Benki ya Tanzania (BoT): Benki kuu
-            - Tanzania Revenue Authority (TRA): Uchukuaji wa kodi
-            - Capital Markets and Securities Authority (CMSA)
-            - Insurance Regulatory Authority (IRA)
-
-            Daima jumuisha:
-            1. Kiasi maalum kwa Shilingi za Tanzania
-            2. Majina halisi ya benki za Tanzania na bidhaa
-            3. Bei za soko la ndani na ada
-            4. Kanuni za Tanzania na mahitaji
-            5. Hatua za vitendo na taasisi za ndani
-            6. Muktadha wa kitamaduni na mazoea ya ndani
-
-            Ikiwa huna uhakika kuhusu kanuni maalum, 
-            pendekeza kushauriana na vyanzo rasmi kama Benki ya Tanzania au TRA."""
-        }
-        
         self.knowledge_base_cache = {}
         self.cache_ttl = 3600  # 1 hour
+        
+        # Per-language BM25 indexes over the cached knowledge base
+        self.knowledge_indexes: Dict[str, KnowledgeIndex] = {}
+        self.knowledge_index_ttl = 7200  # matches the knowledge base cache TTL
 
     async def create_conversation(
         self, 
@@ -168,51 +49,22 @@ class ChatbotService:
     ) -> ConversationResponse:
         """Create a new conversation."""
         try:
-            # Create conversation
-            conversation = Conversation(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                language=conversation_data.language.value,
-                meta_data=conversation_data.context
-            )
-            db.add(conversation)
-            await db.commit()
-            await db.refresh(conversation)
-            
-            # Add initial system message
-            system_message = ChatMessage(
-                id=str(uuid.uuid4()),
-                conversation_id=conversation.id,
-                role=MessageRole.SYSTEM.value,
-                content=self.system_prompts[conversation_data.language]
-            )
-            db.add(system_message)
-            
-            # Add user's initial message
-            user_message = ChatMessage(
-                id=str(uuid.uuid4()),
-                conversation_id=conversation.id,
-                role=MessageRole.USER.value,
-                content=conversation_data.initial_message
+            # Conversation and user message are written with the reply
+            conversation_id, records = self._new_turn_records(
+                None, conversation_data.language, conversation_data.initial_message,
+                user_id, conversation_data.context
             )
-            db.add(user_message)
-            
-            await db.commit()
+            conversation, user_message = records
             
             # Generate response
             response = await self._generate_response(
-                db, conversation.id, conversation_data.initial_message, 
-                conversation_data.language, user_id
+                db, conversation_id, conversation_data.initial_message, 
+                conversation_data.language, user_id, records
             )
             
             return ConversationResponse(
                 conversation_id=conversation.id,
                 messages=[
-                    Message(
-                        role=MessageRole.SYSTEM,
-                        content=system_message.content,
-                        timestamp=system_message.timestamp
-                    ),
                     Message(
                         role=MessageRole.USER,
                         content=user_message.content,
@@ -246,44 +98,16 @@ class ChatbotService:
         start_time = time.time()
         
         try:
-            # Get or create conversation
-            conversation_id = chat_request.conversation_id
-            if not conversation_id:
-                # Create new conversation
-                conversation = Conversation(
-                    id=str(uuid.uuid4()),
-                    user_id=user_id,
-                    language=chat_request.language.value,
-                    meta_data=chat_request.context
-                )
-                db.add(conversation)
-                await db.commit()
-                await db.refresh(conversation)
-                conversation_id = conversation.id
-                
-                # Add system message
-                system_message = ChatMessage(
-                    id=str(uuid.uuid4()),
-                    conversation_id=conversation_id,
-                    role=MessageRole.SYSTEM.value,
-                    content=self.system_prompts[chat_request.language]
-                )
-                db.add(system_message)
-            
-            # Add user message
-            user_message = ChatMessage(
-                id=str(uuid.uuid4()),
-                conversation_id=conversation_id,
-                role=MessageRole.USER.value,
-                content=chat_request.message
+            await self._check_conversation_access(db, chat_request.conversation_id, user_id)
+            conversation_id, records = self._new_turn_records(
+                chat_request.conversation_id, chat_request.language,
+                chat_request.message, user_id, chat_request.context
             )
-            db.add(user_message)
-            await db.commit()
             
             # Generate response
             response = await self._generate_response(
                 db, conversation_id, chat_request.message, 
-                chat_request.language, user_id
+                chat_request.language, user_id, records
             )
             
             response_time = time.time() - start_time
@@ -305,84 +129,148 @@ class ChatbotService:
             await db.rollback()
             raise
 
+    async def process_message_stream(
+        self, 
+        db: AsyncSession, 
+        chat_request: ChatRequest,
+        user_id: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Process a user message and stream the response as it is generated.
+
+        Yields ``{'token': ...}`` events for every delta received from OpenAI,
+        followed by a single ``{'status': 'complete', 'response': ...}`` event
+        once the assistant message has been persisted and analysed.
+        """
+        start_time = time.time()
+        
+        try:
+            await self._check_conversation_access(db, chat_request.conversation_id, user_id)
+            conversation_id, records = self._new_turn_records(
+                chat_request.conversation_id, chat_request.language,
+                chat_request.message, user_id, chat_request.context
+            )
+            
+            async for event in self._generate_response_stream(
+                db, conversation_id, chat_request.message,
+                chat_request.language, user_id, records
+            ):
+                if isinstance(event, ChatResponse):
+                    event.response_time = time.time() - start_time
+                    yield {'status': 'complete', 'response': event.model_dump(mode='json')}
+                else:
+                    yield event
+            
+        except Exception as e:
+            logger.error(f"Error processing streamed message: {e}")
+            await db.rollback()
+            raise
+
+    async def _check_conversation_access(
+        self,
+        db: AsyncSession,
+        conversation_id: Optional[str],
+        user_id: Optional[int] = None
+    ):
+        """Reject an unknown or foreign conversation before any tokens are spent.
+
+        Raises :class:`ConversationNotFound` if ``conversation_id`` does not exist or belongs
+        to another user; conversations without an owner stay open to anyone
+        holding their id.
+        """
+        if not conversation_id:
+            return
+        result = await db.execute(
+            select(Conversation.user_id).where(Conversation.id == conversation_id)
+        )
+        row = result.first()
+        if row is None or (row.user_id is not None and row.user_id != user_id):
+            raise ConversationNotFound(conversation_id)
+
+    def _new_turn_records(
+        self, 
+        conversation_id: Optional[str],
+        language: Language,
+        message: str,
+        user_id: Optional[int] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, List[Any]]:
+        """Build (but don't add) the rows for an incoming user message.
+
+        Returns the conversation id and ``[conversation, user_message]`` for a
+        new conversation or ``[user_message]`` for an existing one. Ids and
+        timestamps are set client-side so the rows can be written together
+        with the reply in a single commit. New conversations reference the
+        current system prompt by id instead of storing its text.
+        """
+        now = datetime.utcnow()
+        records = []
+        if not conversation_id:
+            # Create new conversation
+            conversation = Conversation(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                language=language.value,
+                created_at=now,
+                updated_at=now,
+                meta_data={**(context or {}), 'system_prompt_id': prompt_registry.current_id(language)}
+            )
+            conversation_id = conversation.id
+            records.append(conversation)
+        
+        # Add user message
+        user_message = ChatMessage(
+            id=str(uuid.uuid4()),
+            conversation_id=conversation_id,
+            role=MessageRole.USER.value,
+            content=message,
+            timestamp=now
+        )
+        records.append(user_message)
+        
+        return conversation_id, records
+
     async def _generate_response(
         self, 
         db: AsyncSession, 
         conversation_id: str, 
         user_message: str,
         language: Language,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        pending_records: Optional[List[Any]] = None
     ) -> ChatResponse:
-        """Generate response using OpenAI API with context and knowledge base."""
+        """Generate response using OpenAI API with context and knowledge base.
+
+        ``pending_records`` (conversation/user message rows for this turn) are
+        committed together with the reply.
+        """
         try:
-            # Get conversation history
-            messages = await self._get_conversation_history(db, conversation_id)
-            
-            # Get relevant knowledge base content
-            knowledge_content = await self._get_relevant_knowledge(
-                db, user_message, language
+            context = await self._build_openai_messages(
+                db, conversation_id, user_message, language, user_id, pending_records
             )
             
-            # Prepare messages for OpenAI
-            openai_messages = []
-            
-            # Add system message with knowledge base context
-            system_content = self.system_prompts[language]
-            if knowledge_content:
-                system_content += f"\n\nRelevant information:\n{knowledge_content}"
-            
-            openai_messages.append({
-                "role": "system",
-                "content": system_content
-            })
-            
-            # Add conversation history (limit to last 10 messages for context)
-            for msg in messages[-10:]:
-                openai_messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-            
-            # Add user's current message
-            openai_messages.append({
-                "role": "user",
-                "content": user_message
-            })
-            
-            # Get user profile for personalization
-            user_profile = None
-            if user_id:
-                user_profile = await self._get_user_profile(db, user_id)
-            
-            # Add user context if available
-            if user_profile:
-                context_message = f"User profile: {user_profile['age_group']}, {user_profile['location']}, {user_profile['language']}"
-                openai_messages.append({
-                    "role": "system",
-                    "content": context_message
-                })
-            
-            # Call OpenAI API with timeout and optimization
-            client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+            # Repeated first-turn questions are answered from the response cache
+            cached = await self._get_cached_response(context, user_message)
+            if cached:
+                return await self._save_assistant_response(
+                    db, conversation_id, user_message, cached['response']['message'],
+                    language, context, pending_records, cache_match=cached['match']
+                )
             
-            # Set timeout for the request
-            timeout = 30  # seconds
+            # Call OpenAI API through the shared, pooled client
+            timeout = settings.CHATBOT_RESPONSE_TIMEOUT
+            llm_succeeded = False
             
             try:
-                response = await asyncio.wait_for(
-                    client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=openai_messages,
-                        max_tokens=500,
-                        temperature=0.7,
-                        presence_penalty=0.1,
-                        frequency_penalty=0.1,
+                async with llm_client_manager.acquire(user_id):
+                    response = await asyncio.wait_for(
+                        llm_client_manager.client.chat.completions.create(
+                            **self._completion_params(context['messages'])
+                        ),
                         timeout=timeout
-                    ),
-                    timeout=timeout
-                )
+                    )
                 
                 assistant_message = response.choices[0].message.content
+                llm_succeeded = True
                 
             except asyncio.TimeoutError:
                 logger.error("OpenAI API request timed out")
@@ -391,166 +279,459 @@ class ChatbotService:
                 logger.error(f"OpenAI API error: {e}")
                 assistant_message = "I'm experiencing technical difficulties. Please try again later."
             
-            # Save assistant message
-            assistant_msg = ChatMessage(
-                id=str(uuid.uuid4()),
-                conversation_id=conversation_id,
-                role=MessageRole.ASSISTANT.value,
-                content=assistant_message
-            )
-            db.add(assistant_msg)
-            await db.commit()
-            
-            # Analyze response for analytics
-            analytics = await self._analyze_response(
-                db, conversation_id, assistant_msg.id, 
-                user_message, assistant_message, language
-            )
-            
-            return ChatResponse(
-                conversation_id=conversation_id,
-                message=assistant_message,
-                language=language,
-                confidence=analytics.get('confidence', 0.8),
-                intent=analytics.get('intent'),
-                entities=analytics.get('entities'),
-                sentiment=analytics.get('sentiment'),
-                response_time=0.0,  # Will be set by caller
-                metadata={
-                    'knowledge_used': bool(knowledge_content),
-                    'user_profile_used': bool(user_profile)
-                }
+            chat_response = await self._save_assistant_response(
+                db, conversation_id, user_message, assistant_message,
+                language, context, pending_records
             )
+            if llm_succeeded:
+                await self._cache_response(context, user_message, assistant_message)
+            return chat_response
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             raise
 
+    async def _generate_response_stream(
+        self, 
+        db: AsyncSession, 
+        conversation_id: str, 
+        user_message: str,
+        language: Language,
+        user_id: Optional[int] = None,
+        pending_records: Optional[List[Any]] = None
+    ) -> AsyncIterator[Any]:
+        """Stream the OpenAI response, then persist it.
+
+        Yields ``{'token': ...}`` dicts as deltas arrive and finally the
+        ``ChatResponse`` built once the full message has been saved. The LLM
+        slot is held for at most ``CHATBOT_RESPONSE_TIMEOUT`` seconds; a
+        stalled stream is closed and whatever arrived is saved.
+        """
+        context = await self._build_openai_messages(
+            db, conversation_id, user_message, language, user_id, pending_records
+        )
+        
+        cached = await self._get_cached_response(context, user_message)
+        if cached:
+            assistant_message = cached['response']['message']
+            yield {'token': assistant_message, 'index': 0}
+            yield await self._save_assistant_response(
+                db, conversation_id, user_message, assistant_message,
+                language, context, pending_records, cache_match=cached['match']
+            )
+            return
+        
+        timeout = settings.CHATBOT_RESPONSE_TIMEOUT
+        deltas = []
+        llm_succeeded = False
+        
+        try:
+            # Hold the LLM slot for the whole stream
+            async with llm_client_manager.acquire(user_id):
+                # One deadline covers the request and every chunk after it
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + timeout
+                stream = await asyncio.wait_for(
+                    llm_client_manager.client.chat.completions.create(
+                        **self._completion_params(context['messages']),
+                        stream=True
+                    ),
+                    timeout=timeout
+                )
+                chunks = stream.__aiter__()
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(
+                                chunks.__anext__(), timeout=max(deadline - loop.time(), 0)
+                            )
+                        except StopAsyncIteration:
+                            break
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            deltas.append(delta)
+                            yield {'token': delta, 'index': len(deltas) - 1}
+                finally:
+                    # Release the upstream connection, also when the deadline expired
+                    await self._close_stream(stream)
+            
+            assistant_message = "".join(deltas)
+            llm_succeeded = bool(deltas)
+            
+        except asyncio.TimeoutError:
+            logger.error("OpenAI API stream timed out")
+            assistant_message = "".join(deltas) or "I apologize, but I'm taking longer than expected to respond. Please try again in a moment."
+        except Exception as e:
+            logger.error(f"OpenAI API streaming error: {e}")
+            assistant_message = "".join(deltas) or "I'm experiencing technical difficulties. Please try again later."
+        
+        if not deltas:
+            # Nothing was streamed, send the fallback message as a single token
+            yield {'token': assistant_message, 'index': 0}
+        
+        chat_response = await self._save_assistant_response(
+            db, conversation_id, user_message, assistant_message,
+            language, context, pending_records
+        )
+        if llm_succeeded:
+            await self._cache_response(context, user_message, assistant_message)
+        yield chat_response
+
+    @staticmethod
+    async def _close_stream(stream: Any):
+        close = getattr(stream, 'close', None)
+        if close is None:
+            return
+        try:
+            await close()
+        except Exception as e:
+            logger.warning(f"Error closing OpenAI stream: {e}")
+
+    async def _build_openai_messages(
+        self, 
+        db: AsyncSession, 
+        conversation_id: str, 
+        user_message: str,
+        language: Language,
+        user_id: Optional[int] = None,
+        pending_records: Optional[List[Any]] = None
+    ) -> Dict[str, Any]:
+        """Assemble the OpenAI message list with history, knowledge and profile context.
+
+        Sections are fitted into ``CHATBOT_CONTEXT_TOKEN_BUDGET`` by
+        ``context_builder`` and ordered from most to least stable (system
+        prompt, user profile, history, retrieved knowledge, new message) so
+        consecutive turns share a prefix the provider can cache.
+
+        Returns a context dict with the OpenAI ``messages`` and what went into
+        them (prompt id, knowledge, profile, token counts, response cache key).
+        """
+        prompt_id, system_prompt = await self._get_system_prompt(
+            db, conversation_id, language, pending_records
+        )
+        
+        # Get conversation history
+        messages = await self._get_conversation_history(db, conversation_id)
+        
+        # Get relevant knowledge base content
+        knowledge = await self._get_relevant_knowledge(
+            db, user_message, language
+        )
+        
+        # Get user profile for personalization
+        user_profile = None
+        if user_id:
+            user_profile = await self._get_user_profile(db, user_id)
+        
+        profile_line = None
+        if user_profile:
+            profile_line = f"User profile: {user_profile['age_group']}, {user_profile['location']}, {user_profile['language']}"
+        
+        # Older conversations still have their system prompt stored as a message
+        history = [msg for msg in messages if msg['role'] != MessageRole.SYSTEM.value]
+        
+        # Fit everything into the prompt token budget
+        await context_builder.counter.load()
+        built = context_builder.build(
+            system_prompt, user_message, knowledge['items'], history, profile_line
+        )
+        
+        # Only first-turn answers are cacheable; later turns depend on the history
+        cache_key = cache_bucket = None
+        if not any(msg['role'] == MessageRole.ASSISTANT.value for msg in messages):
+            cache_bucket = response_cache.bucket(language.value, knowledge['version'], user_profile, prompt_id)
+            cache_key = response_cache.make_key(user_message, language.value, cache_bucket, knowledge['ids'])
+        
+        return {
+            'messages': built['messages'],
+            'prompt_id': prompt_id,
+            'knowledge_content': built['knowledge_content'],
+            'tokens': built['tokens'],
+            'knowledge_ids': knowledge['ids'],
+            'user_profile': user_profile,
+            'cache_key': cache_key,
+            'cache_bucket': cache_bucket
+        }
+
+    async def _get_system_prompt(
+        self,
+        db: AsyncSession,
+        conversation_id: str,
+        language: Language,
+        pending_records: Optional[List[Any]] = None
+    ) -> Tuple[str, str]:
+        """Return ``(prompt_id, text)`` of the system prompt the conversation uses."""
+        for record in pending_records or []:
+            if isinstance(record, Conversation):
+                return prompt_registry.resolve((record.meta_data or {}).get('system_prompt_id'), language)
+        
+        # A conversation's prompt id never changes, so it is cached for long
+        cache_key = f"conversation_prompt:{conversation_id}"
+        prompt_id = await cache_manager.get(cache_key)
+        if prompt_id is None:
+            try:
+                result = await db.execute(
+                    select(Conversation.meta_data).where(Conversation.id == conversation_id)
+                )
+                meta_data = result.scalar_one_or_none() or {}
+                prompt_id = meta_data.get('system_prompt_id')
+            except Exception as e:
+                logger.error(f"Error getting conversation prompt: {e}")
+            # Conversations from before the registry use the current prompt
+            prompt_id, _ = prompt_registry.resolve(prompt_id, language)
+            await cache_manager.set(cache_key, prompt_id, 86400)
+        
+        return prompt_registry.resolve(prompt_id, language)
+
+    def _completion_params(self, openai_messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Shared chat completion parameters for the blocking and streaming paths."""
+        return {
+            'model': settings.OPENAI_MODEL,
+            'messages': openai_messages,
+            'max_tokens': settings.OPENAI_MAX_TOKENS,
+            'temperature': settings.OPENAI_TEMPERATURE,
+            'presence_penalty': 0.1,
+            'frequency_penalty': 0.1,
+            'timeout': settings.CHATBOT_RESPONSE_TIMEOUT
+        }
+
+    async def _get_cached_response(
+        self, 
+        context: Dict[str, Any], 
+        user_message: str
+    ) -> Optional[Dict[str, Any]]:
+        """Look up a cached answer for this question, if it is cacheable."""
+        if not context['cache_key']:
+            return None
+        return await response_cache.get(context['cache_key'], user_message, context['cache_bucket'])
+
+    async def _cache_response(
+        self, 
+        context: Dict[str, Any], 
+        user_message: str, 
+        assistant_message: str
+    ):
+        """Store a freshly generated answer in the response cache."""
+        if context['cache_key']:
+            await response_cache.set(
+                context['cache_key'], user_message, context['cache_bucket'],
+                {'message': assistant_message}
+            )
+
+    async def _save_assistant_response(
+        self, 
+        db: AsyncSession, 
+        conversation_id: str, 
+        user_message: str,
+        assistant_message: str,
+        language: Language,
+        context: Dict[str, Any],
+        pending_records: Optional[List[Any]] = None,
+        cache_match: Optional[str] = None
+    ) -> ChatResponse:
+        """Persist the turn in one commit, queue its analytics and build the response.
+
+        The turn's conversation and message counts are added to the daily
+        rollup in the same commit, so they always match the saved rows; only
+        the per-response analytics go through the write-behind queue.
+        """
+        pending_records = pending_records or []
+        db.add_all(pending_records)
+        
+        # Save assistant message
+        assistant_msg = ChatMessage(
+            id=str(uuid.uuid4()),
+            conversation_id=conversation_id,
+            role=MessageRole.ASSISTANT.value,
+            content=assistant_message,
+            timestamp=datetime.utcnow(),
+            meta_data={'cache_match': cache_match} if cache_match else None
+        )
+        db.add(assistant_msg)
+        
+        turn_messages = [record for record in pending_records if isinstance(record, ChatMessage)]
+        is_new = any(isinstance(record, Conversation) for record in pending_records)
+        await upsert_increments(db, ChatbotDailyStats, [{
+            'day': assistant_msg.timestamp.date(),
+            'language': language.value,
+            'conversations': int(is_new),
+            'messages': len(turn_messages) + 1,
+        }], ['day', 'language'])
+        await db.commit()
+        
+        await self._update_conversation_window(
+            conversation_id, turn_messages + [assistant_msg], is_new=is_new
+        )
+        
+        # The turn started when the user message was recorded
+        started = turn_messages[0].timestamp if turn_messages else assistant_msg.timestamp
+        
+        # Analyze response; the analytics row is written behind
+        analytics = self._analyze_response(
+            conversation_id, assistant_msg.id, 
+            user_message, assistant_message, language,
+            response_time=(assistant_msg.timestamp - started).total_seconds()
+        )
+        
+        metadata = {
+            'knowledge_used': bool(context['knowledge_content']),
+            'user_profile_used': bool(context['user_profile']),
+            'context_tokens': context['tokens'],
+            'cached': cache_match is not None
+        }
+        if cache_match:
+            metadata['cache_match'] = cache_match
+        
+        return ChatResponse(
+            conversation_id=conversation_id,
+            message=assistant_message,
+            language=language,
+            confidence=analytics.get('confidence', 0.8),
+            intent=analytics.get('intent'),
+            entities=analytics.get('entities'),
+            sentiment=analytics.get('sentiment'),
+            response_time=0.0,  # Will be set by caller
+            metadata=metadata
+        )
+
+    @staticmethod
+    def _window_entry(msg: ChatMessage) -> Dict[str, Any]:
+        return {
+            'id': msg.id,
+            'role': msg.role,
+            'content': msg.content,
+            'timestamp': msg.timestamp.isoformat()
+        }
+
     async def _get_conversation_history(
         self, 
         db: AsyncSession, 
         conversation_id: str
-    ) -> List[ChatMessage]:
-        """Get conversation history with caching."""
+    ) -> List[Dict[str, Any]]:
+        """Get the last ``CHATBOT_MAX_HISTORY`` messages, oldest first.
+
+        Served from the cached conversation window; on a miss only the
+        window is read from the database and cached.
+        """
         try:
             # Try to get from cache first
-            cached_history = await get_cached_conversation_history(conversation_id)
-            if cached_history:
-                # Convert cached data back to ChatMessage objects
-                messages = []
-                for msg_data in cached_history:
-                    message = ChatMessage(
-                        id=msg_data['id'],
-                        conversation_id=msg_data['conversation_id'],
-                        role=msg_data['role'],
-                        content=msg_data['content'],
-                        timestamp=datetime.fromisoformat(msg_data['timestamp'])
-                    )
-                    messages.append(message)
-                return messages
-            
-            # If not in cache, query database
-            query = select(ChatMessage).where(
-                ChatMessage.conversation_id == conversation_id
-            ).order_by(ChatMessage.timestamp)
+            cached_window = await get_cached_conversation_window(conversation_id, settings.CHATBOT_MAX_HISTORY)
+            if cached_window:
+                return cached_window
+            
+            # If not in cache, query only the latest messages
+            query = select(
+                ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.timestamp
+            ).where(
+                ChatMessage.conversation_id == conversation_id,
+                ChatMessage.role != MessageRole.SYSTEM.value
+            ).order_by(ChatMessage.timestamp.desc()).limit(settings.CHATBOT_MAX_HISTORY)
             
             result = await db.execute(query)
-            messages = result.scalars().all()
-            
-            # Cache the conversation history
-            if messages:
-                history_data = []
-                for msg in messages:
-                    history_data.append({
-                        'id': msg.id,
-                        'conversation_id': msg.conversation_id,
-                        'role': msg.role,
-                        'content': msg.content,
-                        'timestamp': msg.timestamp.isoformat()
-                    })
-                await cache_conversation_history(conversation_id, history_data)
-            
-            return messages
+            window = [self._window_entry(row) for row in reversed(result.all())]
+            
+            # Cache the conversation window
+            if window:
+                await cache_conversation_window(conversation_id, window, settings.CHATBOT_MAX_HISTORY)
+            
+            return window
             
         except Exception as e:
             logger.error(f"Error getting conversation history: {e}")
             return []
 
+    async def _update_conversation_window(self, conversation_id: str, new_messages: List[ChatMessage], is_new: bool):
+        """Add this turn's committed messages to the cached conversation window."""
+        entries = [self._window_entry(msg) for msg in new_messages]
+        if is_new:
+            await cache_conversation_window(conversation_id, entries, settings.CHATBOT_MAX_HISTORY)
+        else:
+            await append_conversation_window(conversation_id, entries, settings.CHATBOT_MAX_HISTORY)
+
     async def _get_relevant_knowledge(
         self, 
         db: AsyncSession, 
         user_message: str, 
         language: Language
-    ) -> Optional[str]:
-        """Get relevant knowledge base content with caching."""
+    ) -> Dict[str, Any]:
+        """Get relevant knowledge base content with caching.
+
+        The cached knowledge base holds passages (see ``chunk_knowledge``)
+        rather than whole articles, so only the best matching passages reach
+        the prompt.
+
+        Returns ``{'items': [...], 'ids': [...], 'version': ...}`` where
+        ``items`` are the ranked "title: passage" texts, ``ids`` their
+        passage ids and ``version`` the fingerprint of the knowledge base
+        they came from.
+        """
         try:
             # Try to get from cache first
-            cached_knowledge = await get_cached_knowledge_base(language.value)
-            if cached_knowledge:
-                # Use cached knowledge for keyword matching
-                relevant_content = self._match_keywords_in_cached_knowledge(
-                    user_message, cached_knowledge
+            knowledge_dict = await get_cached_knowledge_base(language.value)
+            if knowledge_dict is None:
+                # If not in cache, query database and cache results
+                query = select(KnowledgeBase).where(
+                    KnowledgeBase.language == language.value,
+                    KnowledgeBase.is_active == True
                 )
-                if relevant_content:
-                    return relevant_content
-            
-            # If not in cache, query database and cache results
-            query = select(KnowledgeBase).where(
-                KnowledgeBase.language == language.value,
-                KnowledgeBase.is_active == True
-            )
-            
-            result = await db.execute(query)
-            knowledge_items = result.scalars().all()
-            
-            # Prepare knowledge for caching
-            knowledge_dict = {}
-            for item in knowledge_items:
-                knowledge_dict[item.id] = {
-                    'title': item.title,
-                    'content': item.content,
-                    'category': item.category,
-                    'relevance_score': item.relevance_score
-                }
-            
-            # Cache the knowledge base
-            await cache_knowledge_base(language.value, knowledge_dict)
+                
+                result = await db.execute(query)
+                knowledge_items = result.scalars().all()
+                
+                # Split articles into overlapping passages for retrieval
+                knowledge_dict = chunk_knowledge({
+                    item.id: {
+                        'title': item.title,
+                        'content': item.content,
+                        'category': item.category,
+                        'relevance_score': item.relevance_score
+                    }
+                    for item in knowledge_items
+                })
+                
+                # Cache the passages and rebuild their keyword index
+                await cache_knowledge_base(language.value, knowledge_dict)
+                self.knowledge_indexes[language.value] = KnowledgeIndex(knowledge_dict, language.value)
             
-            # Match keywords in fresh data
-            relevant_content = self._match_keywords_in_cached_knowledge(
-                user_message, knowledge_dict
+            # Use cached knowledge for keyword matching
+            item_ids = self._match_keywords_in_cached_knowledge(
+                user_message, knowledge_dict, language
             )
+            relevant_content = [
+                f"{knowledge_dict[item_id]['title']}: {knowledge_dict[item_id]['content']}"
+                for item_id in item_ids
+            ]
             
-            return relevant_content
+            return {
+                'items': relevant_content,
+                'ids': item_ids,
+                'version': self.knowledge_indexes[language.value].version
+            }
             
         except Exception as e:
             logger.error(f"Error getting knowledge: {e}")
-            return None
+            return {'items': [], 'ids': [], 'version': None}
 
     def _match_keywords_in_cached_knowledge(
         self, 
         user_message: str, 
-        knowledge_dict: dict
-    ) -> Optional[str]:
-        """Match keywords in cached knowledge base."""
-        keywords = user_message.lower().split()
-        relevant_content = []
-        
-        for item_id, item_data in knowledge_dict.items():
-            content_lower = item_data['content'].lower()
-            title_lower = item_data['title'].lower()
-            
-            # Check if any keywords match
-            for keyword in keywords:
-                if keyword in content_lower or keyword in title_lower:
-                    relevant_content.append(f"{item_data['title']}: {item_data['content']}")
-                    break
-            
-            # Limit to top 3 most relevant items
-            if len(relevant_content) >= 3:
-                break
+        knowledge_dict: dict,
+        language: Language = Language.ENGLISH,
+        top_k: int = 3
+    ) -> List[str]:
+        """Rank cached knowledge base passages against the message with BM25."""
+        index = self.knowledge_indexes.get(language.value)
+        if index is None or time.time() - index.built_at > self.knowledge_index_ttl:
+            # First use in this process, or the cached knowledge may have been refreshed elsewhere
+            index = KnowledgeIndex(knowledge_dict, language.value)
+            self.knowledge_indexes[language.value] = index
         
-        return "\n\n".join(relevant_content) if relevant_content else None
+        return [
+            item_id for item_id, _score in index.search(user_message, top_k)
+            if item_id in knowledge_dict
+        ]
 
     async def _get_user_profile(
         self, 
@@ -585,16 +766,21 @@ class ChatbotService:
             logger.error(f"Error getting user profile: {e}")
             return None
 
-    async def _analyze_response(
+    def _analyze_response(
         self, 
-        db: AsyncSession, 
         conversation_id: str, 
         message_id: str,
         user_message: str, 
         assistant_message: str,
-        language: Language
+        language: Language,
+        response_time: float = 0.0
     ) -> Dict[str, Any]:
-        """Analyze response for intent, entities, and sentiment."""
+        """Analyze response for intent, entities, and sentiment.
+
+        The analytics row, with the measured ``response_time`` in seconds, is
+        handed to the write-behind ``analytics_writer`` for the daily rollup
+        tables.
+        """
         try:
             # Simple analysis for now
             # In production, you'd use NLP libraries or AI services
@@ -608,19 +794,18 @@ class ChatbotService:
             # Sentiment analysis
             sentiment = self._analyze_sentiment(assistant_message)
             
-            # Save analytics
-            analytics = ChatbotAnalytics(
-                id=str(uuid.uuid4()),
-                conversation_id=conversation_id,
-                message_id=message_id,
-                intent=intent,
-                confidence=0.8,  # Default confidence
-                entities=entities,
-                sentiment=sentiment,
-                response_time=0.0
-            )
-            db.add(analytics)
-            await db.commit()
+            # Queue analytics
+            analytics_writer.enqueue({
+                'id': str(uuid.uuid4()),
+                'conversation_id': conversation_id,
+                'message_id': message_id,
+                'intent': intent,
+                'confidence': 0.8,  # Default confidence
+                'entities': entities,
+                'sentiment': sentiment,
+                'response_time': response_time,
+                'created_at': datetime.utcnow()
+            }, {'language': language.value})
             
             return {
                 'intent': intent,
@@ -773,77 +958,151 @@ class ChatbotService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> Dict[str, Any]:
-        """Get chatbot analytics."""
+        """Get chatbot analytics.
+
+        Global figures are summed from the daily rollup tables (dates are
+        applied at day granularity). Per-user figures are aggregated in SQL
+        from that user's conversations.
+        """
         try:
-            # Get basic stats
-            conversations_query = select(Conversation)
-            if user_id:
-                conversations_query = conversations_query.where(Conversation.user_id == user_id)
-            if start_date:
-                conversations_query = conversations_query.where(Conversation.created_at >= start_date)
-            if end_date:
-                conversations_query = conversations_query.where(Conversation.created_at <= end_date)
-            
-            result = await db.execute(conversations_query)
-            conversations = result.scalars().all()
-            
-            total_conversations = len(conversations)
-            
-            # Get total messages
-            messages_query = select(ChatMessage)
             if user_id:
-                messages_query = messages_query.join(Conversation).where(Conversation.user_id == user_id)
-            
-            messages_result = await db.execute(messages_query)
-            total_messages = len(messages_result.scalars().all())
-            
-            # Get average response time
-            analytics_query = select(ChatbotAnalytics.response_time)
-            if user_id:
-                analytics_query = analytics_query.join(Conversation).where(Conversation.user_id == user_id)
-            
-            analytics_result = await db.execute(analytics_query)
-            response_times = [rt for rt in analytics_result.scalars().all() if rt is not None]
-            avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-            
-            # Get language distribution
-            language_distribution = {}
-            for conv in conversations:
-                lang = conv.language
-                language_distribution[lang] = language_distribution.get(lang, 0) + 1
-            
-            # Get top intents
-            intent_query = select(ChatbotAnalytics.intent, ChatbotAnalytics.confidence)
-            if user_id:
-                intent_query = intent_query.join(Conversation).where(Conversation.user_id == user_id)
-            
-            intent_result = await db.execute(intent_query)
-            intents = intent_result.all()
-            
-            intent_counts = {}
-            for intent, confidence in intents:
-                if intent:
-                    intent_counts[intent] = intent_counts.get(intent, 0) + 1
-            
-            top_intents = [
-                {'intent': intent, 'count': count}
-                for intent, count in sorted(intent_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-            ]
-            
-            return {
-                'total_conversations': total_conversations,
-                'total_messages': total_messages,
-                'average_response_time': avg_response_time,
-                'average_confidence': 0.8,  # Default for now
-                'language_distribution': language_distribution,
-                'top_intents': top_intents,
-                'sentiment_distribution': {'positive': 0, 'negative': 0, 'neutral': 0}  # Placeholder
-            }
+                return await self._get_user_analytics(db, user_id, start_date, end_date)
+            return await self._get_rollup_analytics(db, start_date, end_date)
             
         except Exception as e:
             logger.error(f"Error getting analytics: {e}")
             return {}
 
+    async def _get_rollup_analytics(
+        self,
+        db: AsyncSession,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        stats_filters = []
+        intent_filters = []
+        if start_date:
+            stats_filters.append(ChatbotDailyStats.day >= start_date.date())
+            intent_filters.append(ChatbotDailyIntent.day >= start_date.date())
+        if end_date:
+            stats_filters.append(ChatbotDailyStats.day <= end_date.date())
+            intent_filters.append(ChatbotDailyIntent.day <= end_date.date())
+        
+        # Per-language totals
+        result = await db.execute(
+            select(
+                ChatbotDailyStats.language,
+                func.sum(ChatbotDailyStats.conversations),
+                func.sum(ChatbotDailyStats.messages),
+                func.sum(ChatbotDailyStats.response_time_sum),
+                func.sum(ChatbotDailyStats.response_time_count),
+                func.sum(ChatbotDailyStats.confidence_sum),
+                func.sum(ChatbotDailyStats.confidence_count),
+                func.sum(ChatbotDailyStats.positive),
+                func.sum(ChatbotDailyStats.negative),
+                func.sum(ChatbotDailyStats.neutral)
+            ).where(*stats_filters).group_by(ChatbotDailyStats.language)
+        )
+        
+        totals = [0] * 9
+        language_distribution = {}
+        for language, *values in result.all():
+            values = [value or 0 for value in values]
+            totals = [total + value for total, value in zip(totals, values)]
+            if values[0]:
+                language_distribution[language] = int(values[0])
+        conversations, messages, rt_sum, rt_count, conf_sum, conf_count, positive, negative, neutral = totals
+        
+        # Top intents
+        intent_count = func.sum(ChatbotDailyIntent.count)
+        intent_result = await db.execute(
+            select(ChatbotDailyIntent.intent, intent_count)
+            .where(*intent_filters)
+            .group_by(ChatbotDailyIntent.intent)
+            .order_by(intent_count.desc())
+            .limit(5)
+        )
+        
+        return {
+            'total_conversations': int(conversations),
+            'total_messages': int(messages),
+            'average_response_time': rt_sum / rt_count if rt_count else 0.0,
+            'average_confidence': conf_sum / conf_count if conf_count else 0.0,
+            'language_distribution': language_distribution,
+            'top_intents': [
+                {'intent': intent, 'count': int(count)}
+                for intent, count in intent_result.all()
+            ],
+            'sentiment_distribution': {
+                'positive': int(positive),
+                'negative': int(negative),
+                'neutral': int(neutral)
+            }
+        }
+
+    async def _get_user_analytics(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        conversation_filters = [Conversation.user_id == user_id]
+        if start_date:
+            conversation_filters.append(Conversation.created_at >= start_date)
+        if end_date:
+            conversation_filters.append(Conversation.created_at <= end_date)
+        user_conversations = select(Conversation.id).where(*conversation_filters)
+        
+        # Conversations per language
+        result = await db.execute(
+            select(Conversation.language, func.count())
+            .where(*conversation_filters)
+            .group_by(Conversation.language)
+        )
+        language_distribution = {language: count for language, count in result.all()}
+        
+        total_messages = (await db.execute(
+            select(func.count()).select_from(ChatMessage)
+            .where(ChatMessage.conversation_id.in_(user_conversations))
+        )).scalar() or 0
+        
+        in_user_conversations = ChatbotAnalytics.conversation_id.in_(user_conversations)
+        avg_response_time, avg_confidence = (await db.execute(
+            select(func.avg(ChatbotAnalytics.response_time), func.avg(ChatbotAnalytics.confidence))
+            .where(in_user_conversations)
+        )).one()
+        
+        sentiment_result = await db.execute(
+            select(ChatbotAnalytics.sentiment, func.count())
+            .where(in_user_conversations, ChatbotAnalytics.sentiment.is_not(None))
+            .group_by(ChatbotAnalytics.sentiment)
+        )
+        sentiment_distribution = {'positive': 0, 'negative': 0, 'neutral': 0}
+        sentiment_distribution.update(dict(sentiment_result.all()))
+        
+        intent_count = func.count()
+        intent_result = await db.execute(
+            select(ChatbotAnalytics.intent, intent_count)
+            .where(in_user_conversations, ChatbotAnalytics.intent.is_not(None))
+            .group_by(ChatbotAnalytics.intent)
+            .order_by(intent_count.desc())
+            .limit(5)
+        )
+        
+        return {
+            'total_conversations': sum(language_distribution.values()),
+            'total_messages': total_messages,
+            'average_response_time': avg_response_time or 0.0,
+            'average_confidence': avg_confidence or 0.0,
+            'language_distribution': language_distribution,
+            'top_intents': [
+                {'intent': intent, 'count': count}
+                for intent, count in intent_result.all()
+            ],
+            'sentiment_distribution': sentiment_distribution
+        }
+
 
 # Create service instance
 chatbot_service = ChatbotService() 
\ No newline at end of file
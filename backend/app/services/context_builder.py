@@ -0,0 +1,194 @@
+import asyncio
+import math
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import get_settings, on_settings_reload
+from app.core.startup import Lazy
+
+settings = get_settings()
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD = 4
+# Don't bother including a truncated section smaller than this
+MIN_SECTION_TOKENS = 32
+TRUNCATION_MARKER = " …"
+KNOWLEDGE_HEADER = "Relevant information:\n"
+
+
+class TokenCounter:
+    """Local token counting with ``tiktoken`` and a character-based fallback.
+
+    The encoding is a :class:`~app.core.startup.Lazy` singleton: ``tiktoken``
+    may download its BPE file the first time, so async callers ``await
+    load()`` (which runs off the event loop) and warm-up can load it ahead
+    of traffic. If ``tiktoken`` is missing or its encoding files can't be
+    loaded, counts are estimated at four characters per token, which is
+    close enough for budgeting.
+    """
+
+    def __init__(self, model: str, name: str = None):
+        self.model = model
+        self._encoding = Lazy(name or f"tokenizer:{model}", self._load_encoding)
+
+    def _load_encoding(self):
+        if not TIKTOKEN_AVAILABLE:
+            return None
+        try:
+            try:
+                return tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable, estimating token counts: {e}")
+            return None
+
+    async def load(self):
+        """Load the encoding in a worker thread if it isn't loaded yet."""
+        if not self._encoding.initialized:
+            await asyncio.to_thread(self._encoding.get)
+
+    @property
+    def encoding(self):
+        return self._encoding.get()
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut ``text`` to at most ``max_tokens`` tokens, marking the cut."""
+        if self.count(text) <= max_tokens:
+            return text
+        budget = max(max_tokens - self.count(TRUNCATION_MARKER), 0)
+        if self.encoding is not None:
+            cut = self.encoding.decode(self.encoding.encode(text)[:budget])
+        else:
+            cut = text[:budget * 4]
+            # Prefer ending on a word boundary
+            if " " in cut:
+                cut = cut.rsplit(" ", 1)[0]
+        return cut.rstrip() + TRUNCATION_MARKER
+
+
+class ContextBuilder:
+    """Fit a chat request into a prompt token budget.
+
+    Sections are admitted by priority: system prompt and profile, the
+    current question, retrieved knowledge (best ranked first, capped at
+    ``knowledge_max_tokens``), then history from the most recent message
+    backwards. A section that only partly fits is truncated; anything left
+    over is dropped and counted in the report. The returned messages keep the
+    stable prefix order (system, profile, history, knowledge, question).
+    """
+
+    def __init__(self, counter: TokenCounter, budget: int, knowledge_max_tokens: int):
+        self.counter = counter
+        self.budget = budget
+        self.knowledge_max_tokens = knowledge_max_tokens
+
+    def _message_tokens(self, content: str) -> int:
+        return self.counter.count(content) + MESSAGE_OVERHEAD
+
+    def build(
+        self,
+        system_prompt: str,
+        user_message: str,
+        knowledge_items: List[str],
+        history: List[Dict[str, Any]],
+        profile_line: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return ``{'messages', 'knowledge_content', 'tokens'}``.
+
+        ``tokens`` reports the tokens used per section, the total and how
+        many knowledge items and history messages were cut.
+        """
+        report = {
+            'system': self._message_tokens(system_prompt),
+            'profile': self._message_tokens(profile_line) if profile_line else 0,
+            'question': self._message_tokens(user_message),
+            'knowledge': 0,
+            'history': 0,
+            'knowledge_items_used': 0,
+            'knowledge_items_truncated': 0,
+            'history_messages_used': 0,
+            'history_messages_dropped': 0,
+        }
+        remaining = self.budget - report['system'] - report['profile'] - report['question']
+
+        # Retrieved knowledge, best ranked first
+        knowledge_parts = []
+        knowledge_budget = (
+            min(remaining, self.knowledge_max_tokens)
+            - MESSAGE_OVERHEAD - self.counter.count(KNOWLEDGE_HEADER)
+        )
+        for item in knowledge_items:
+            knowledge_budget -= 1  # separator
+            tokens = self.counter.count(item)
+            if tokens > knowledge_budget:
+                if knowledge_budget < MIN_SECTION_TOKENS:
+                    break
+                item = self.counter.truncate(item, knowledge_budget)
+                tokens = self.counter.count(item)
+                report['knowledge_items_truncated'] += 1
+            knowledge_parts.append(item)
+            knowledge_budget -= tokens
+        knowledge_content = None
+        if knowledge_parts:
+            knowledge_content = KNOWLEDGE_HEADER + "\n\n".join(knowledge_parts)
+            report['knowledge'] = self._message_tokens(knowledge_content)
+            report['knowledge_items_used'] = len(knowledge_parts)
+            remaining -= report['knowledge']
+
+        # History, newest first
+        history_messages = []
+        for msg in reversed(history):
+            tokens = self._message_tokens(msg['content'])
+            content = msg['content']
+            if tokens > remaining:
+                if remaining - MESSAGE_OVERHEAD < MIN_SECTION_TOKENS:
+                    break
+                content = self.counter.truncate(content, remaining - MESSAGE_OVERHEAD)
+                tokens = self._message_tokens(content)
+            history_messages.append({"role": msg['role'], "content": content})
+            remaining -= tokens
+            report['history'] += tokens
+        history_messages.reverse()
+        report['history_messages_used'] = len(history_messages)
+        report['history_messages_dropped'] = len(history) - len(history_messages)
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if profile_line:
+            messages.append({"role": "system", "content": profile_line})
+        messages.extend(history_messages)
+        if knowledge_content:
+            messages.append({"role": "system", "content": knowledge_content})
+        messages.append({"role": "user", "content": user_message})
+
+        report['total'] = sum(report[section] for section in ('system', 'profile', 'question', 'knowledge', 'history'))
+        report['budget'] = self.budget
+        return {'messages': messages, 'knowledge_content': knowledge_content, 'tokens': report}
+
+
+# Global context builder
+context_builder = ContextBuilder(
+    TokenCounter(settings.OPENAI_MODEL, name="tokenizer"),
+    settings.CHATBOT_CONTEXT_TOKEN_BUDGET,
+    settings.CHATBOT_KNOWLEDGE_MAX_TOKENS
+)
+
+
+@on_settings_reload
+def _apply_budget(settings, changed):
+    context_builder.budget = settings.CHATBOT_CONTEXT_TOKEN_BUDGET
+    context_builder.knowledge_max_tokens = settings.CHATBOT_KNOWLEDGE_MAX_TOKENS
@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """Micro-batching executor for embedding model calls.
+
+    Callers submit lists of texts and get a ``concurrent.futures.Future``
+    back (``asyncio.wrap_future`` makes it awaitable). A single worker
+    thread owns the model: it waits up to ``max_wait`` after the first
+    request for more to arrive, then encodes up to ``max_batch_size`` texts
+    from all pending requests in one forward pass and resolves each future
+    with its slice. The event loop never runs the model itself.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = None,
+        max_wait_ms: float = None
+    ):
+        self.encode = encode
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_MAX_BATCH_SIZE
+        self.max_wait = (settings.EMBEDDING_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.metrics = {
+            'requests': 0,
+            'texts': 0,
+            'batches': 0,
+            'largest_batch': 0,
+            'errors': 0,
+        }
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue ``texts`` for encoding; the future resolves to an ``(n, dim)`` array."""
+        future: Future = Future()
+        if not texts:
+            future.set_result(np.empty((0, 0), dtype=np.float32))
+            return future
+        self._ensure_worker()
+        self._queue.put((list(texts), future))
+        return future
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker after the requests already queued."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _collect(self, first: Tuple[List[str], Future]) -> Tuple[List[Tuple[List[str], Future]], bool]:
+        """Gather requests until the batch is full or ``max_wait`` has passed."""
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            size += len(item[0])
+        return batch, False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect(item)
+            # Drop requests whose callers have given up
+            batch = [(texts, future) for texts, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch: List[Tuple[List[str], Future]]):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            vectors = np.asarray(self.encode(texts), dtype=np.float32)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.metrics['requests'] += len(batch)
+        self.metrics['texts'] += len(texts)
+        self.metrics['batches'] += 1
+        self.metrics['largest_batch'] = max(self.metrics['largest_batch'], len(texts))
+
+        offset = 0
+        for request_texts, future in batch:
+            future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.metrics['batches']
+        return {
+            **self.metrics,
+            'average_batch': self.metrics['texts'] / batches if batches else 0.0,
+            'queued': self._queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
@@ -0,0 +1,87 @@
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Expense, ExpenseMonthlyRollup
+from app.db.upsert import upsert_increments
+
+KEY_COLUMNS = ['user_id', 'month', 'category']
+
+
+def month_of(day: datetime.datetime) -> str:
+    return day.strftime('%Y-%m')
+
+
+def month_key(session: AsyncSession, column):
+    """``YYYY-MM`` of a datetime column in the session's SQL dialect."""
+    if session.bind.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def build_deltas(changes: Iterable[Tuple[Dict[str, Any], int]]) -> List[Dict[str, Any]]:
+    """Fold ``(expense fields, +1 or -1)`` pairs into per-month increments.
+
+    Each expense dict needs ``user_id``, ``date``, ``category`` and
+    ``amount``; an update is the old values with -1 and the new ones with +1.
+    Pairs that cancel out are dropped.
+    """
+    deltas: Dict[Tuple[int, str, str], Dict[str, Any]] = {}
+    for expense, sign in changes:
+        key = (expense['user_id'], month_of(expense['date']), expense['category'])
+        entry = deltas.setdefault(key, dict(zip(KEY_COLUMNS, key), total=0, count=0))
+        entry['total'] += sign * int(expense['amount'])
+        entry['count'] += sign
+    return [entry for entry in deltas.values() if entry['total'] or entry['count']]
+
+
+async def apply_deltas(session: AsyncSession, deltas: List[Dict[str, Any]]):
+    """Add ``deltas`` onto the rollup in the caller's transaction.
+
+    Months and categories left without expenses are removed, so the table
+    only ever holds non-empty groups.
+    """
+    if not deltas:
+        return
+    await upsert_increments(session, ExpenseMonthlyRollup, deltas, KEY_COLUMNS)
+    if any(entry['count'] < 0 for entry in deltas):
+        await session.execute(
+            delete(ExpenseMonthlyRollup).where(
+                ExpenseMonthlyRollup.user_id.in_({entry['user_id'] for entry in deltas}),
+                ExpenseMonthlyRollup.count <= 0
+            )
+        )
+
+
+def expense_fields(expense: Expense) -> Dict[str, Any]:
+    return {
+        'user_id': expense.user_id,
+        'date': expense.date,
+        'category': expense.category,
+        'amount': expense.amount,
+    }
+
+
+async def rebuild(session: AsyncSession, user_ids: Optional[List[int]] = None) -> int:
+    """Recompute the rollup from ``expenses`` for ``user_ids`` (everyone by default).
+
+    Used to backfill existing data and to repair drift, e.g. after rows were
+    changed outside the service layer. Runs in the caller's transaction and
+    returns the number of rollup rows written.
+    """
+    month = month_key(session, Expense.date)
+    clear = delete(ExpenseMonthlyRollup)
+    aggregate = (
+        select(Expense.user_id, month, Expense.category, func.sum(Expense.amount), func.count())
+        .group_by(Expense.user_id, month, Expense.category)
+    )
+    if user_ids is not None:
+        clear = clear.where(ExpenseMonthlyRollup.user_id.in_(user_ids))
+        aggregate = aggregate.where(Expense.user_id.in_(user_ids))
+    await session.execute(clear)
+    result = await session.execute(
+        insert(ExpenseMonthlyRollup).from_select(['user_id', 'month', 'category', 'total', 'count'], aggregate)
+    )
+    return result.rowcount
@@ -1,18 +1,117 @@
+import base64
+import datetime
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.cache import invalidate_finance_cache
+from app.core.config import get_settings
 from app.db.models import IncomeSource, Expense, Budget, SavingsGoal
+from app.services import expense_rollup
+from app.tasks.expense_import import parse_date
+from sqlalchemy import and_, or_, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+settings = get_settings()
+
+# Per model: keyset sort column, the column date filters apply to, and the amount column
+LIST_OPTIONS = {
+    IncomeSource: {'sort': 'created_at', 'date': 'created_at', 'amount': 'amount'},
+    Expense: {'sort': 'date', 'date': 'date', 'amount': 'amount'},
+    Budget: {'sort': 'created_at', 'date': 'created_at', 'amount': 'amount'},
+    SavingsGoal: {'sort': 'created_at', 'date': 'target_date', 'amount': 'target_amount'},
+}
+
+
+def encode_cursor(sort_value: Optional[datetime.datetime], row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat() if sort_value is not None else None, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime.datetime], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(sort_value) if sort_value is not None else None, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def list_rows(
+    session: AsyncSession,
+    model,
+    user_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of a user's rows, newest first, as dicts.
+
+    Pages are keyed on ``(sort column, id)`` so each page is an index range
+    scan on ``(user_id, sort column, id)`` however deep the client pages.
+    ``fields`` limits the selected columns. Returns the rows and the cursor
+    for the next page (``None`` on the last page). Raises ``ValueError`` for
+    an unknown field or a malformed cursor.
+    """
+    options = LIST_OPTIONS[model]
+    table = model.__table__
+    sort_column, id_column = table.c[options['sort']], table.c.id
+
+    if fields:
+        unknown = set(fields) - set(table.c.keys())
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        selected = list(dict.fromkeys(fields))
+    else:
+        selected = list(table.c.keys())
+    # The cursor needs the sort key of the last row
+    columns = [table.c[name] for name in dict.fromkeys([*selected, 'id', options['sort']])]
+
+    limit = min(limit or settings.FINANCE_PAGE_SIZE, settings.FINANCE_MAX_PAGE_SIZE)
+    query = select(*columns).where(table.c.user_id == user_id)
+    if category is not None and 'category' in table.c:
+        query = query.where(table.c.category == category)
+    if date_from is not None:
+        query = query.where(table.c[options['date']] >= date_from)
+    if date_to is not None:
+        query = query.where(table.c[options['date']] < date_to)
+    if min_amount is not None:
+        query = query.where(table.c[options['amount']] >= min_amount)
+    if max_amount is not None:
+        query = query.where(table.c[options['amount']] <= max_amount)
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_value is None:
+            # Still inside the leading NULLs; every non-NULL row is still to come
+            query = query.where(or_(and_(sort_column.is_(None), id_column < last_id), sort_column.isnot(None)))
+        else:
+            query = query.where(tuple_(sort_column, id_column) < tuple_(sort_value, last_id))
+    # NULLS FIRST is PostgreSQL's order for DESC, so the indexes still match
+    query = query.order_by(sort_column.desc().nulls_first(), id_column.desc()).limit(limit + 1)
+
+    rows = (await session.execute(query)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][options['sort']], rows[-1]['id'])
+    return [{name: row[name] for name in selected} for row in rows], next_cursor
+
 # INCOME SOURCES
 async def create_income_source(session: AsyncSession, user_id: int, data: dict):
     income = IncomeSource(user_id=user_id, **data)
     session.add(income)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(income)
     return income
 
-async def list_income_sources(session: AsyncSession, user_id: int):
-    result = await session.execute(select(IncomeSource).where(IncomeSource.user_id == user_id))
-    return result.scalars().all()
+async def list_income_sources(session: AsyncSession, user_id: int, **options):
+    return await list_rows(session, IncomeSource, user_id, **options)
 
 async def update_income_source(session: AsyncSession, user_id: int, income_id: int, data: dict):
     result = await session.execute(select(IncomeSource).where(IncomeSource.id == income_id, IncomeSource.user_id == user_id))
@@ -22,6 +121,7 @@ async def update_income_source(session: AsyncSession, user_id: int, income_id: i
     for k, v in data.items():
         setattr(income, k, v)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(income)
     return income
 
@@ -32,28 +132,46 @@ async def delete_income_source(session: AsyncSession, user_id: int, income_id: i
         return False
     await session.delete(income)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     return True
 
 # EXPENSES
+def expense_values(data: dict) -> dict:
+    """Column values for an expense; string dates are parsed (``ValueError`` if invalid)."""
+    data = dict(data)
+    if isinstance(data.get('date'), str):
+        data['date'] = parse_date(data['date'])
+    if 'amount' in data:
+        data['amount'] = int(round(data['amount']))
+    return data
+
 async def create_expense(session: AsyncSession, user_id: int, data: dict):
-    expense = Expense(user_id=user_id, **data)
+    expense = Expense(user_id=user_id, **expense_values(data))
     session.add(expense)
+    await expense_rollup.apply_deltas(session, expense_rollup.build_deltas([
+        (expense_rollup.expense_fields(expense), 1)
+    ]))
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(expense)
     return expense
 
-async def list_expenses(session: AsyncSession, user_id: int):
-    result = await session.execute(select(Expense).where(Expense.user_id == user_id))
-    return result.scalars().all()
+async def list_expenses(session: AsyncSession, user_id: int, **options):
+    return await list_rows(session, Expense, user_id, **options)
 
 async def update_expense(session: AsyncSession, user_id: int, expense_id: int, data: dict):
     result = await session.execute(select(Expense).where(Expense.id == expense_id, Expense.user_id == user_id))
     expense = result.scalars().first()
     if not expense:
         return None
-    for k, v in data.items():
+    before = expense_rollup.expense_fields(expense)
+    for k, v in expense_values(data).items():
         setattr(expense, k, v)
+    await expense_rollup.apply_deltas(session, expense_rollup.build_deltas([
+        (before, -1), (expense_rollup.expense_fields(expense), 1)
+    ]))
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(expense)
     return expense
 
@@ -63,7 +181,11 @@ async def delete_expense(session: AsyncSession, user_id: int, expense_id: int):
     if not expense:
         return False
     await session.delete(expense)
+    await expense_rollup.apply_deltas(session, expense_rollup.build_deltas([
+        (expense_rollup.expense_fields(expense), -1)
+    ]))
     await session.commit()
+    await invalidate_finance_cache(user_id)
     return True
 
 # BUDGETS
@@ -71,12 +193,12 @@ async def create_budget(session: AsyncSession, user_id: int, data: dict):
     budget = Budget(user_id=user_id, **data)
     session.add(budget)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(budget)
     return budget
 
-async def list_budgets(session: AsyncSession, user_id: int):
-    result = await session.execute(select(Budget).where(Budget.user_id == user_id))
-    return result.scalars().all()
+async def list_budgets(session: AsyncSession, user_id: int, **options):
+    return await list_rows(session, Budget, user_id, **options)
 
 async def update_budget(session: AsyncSession, user_id: int, budget_id: int, data: dict):
     result = await session.execute(select(Budget).where(Budget.id == budget_id, Budget.user_id == user_id))
@@ -86,6 +208,7 @@ async def update_budget(session: AsyncSession, user_id: int, budget_id: int, dat
     for k, v in data.items():
         setattr(budget, k, v)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(budget)
     return budget
 
@@ -96,6 +219,7 @@ async def delete_budget(session: AsyncSession, user_id: int, budget_id: int):
         return False
     await session.delete(budget)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     return True
 
 # SAVINGS GOALS
@@ -103,12 +227,12 @@ async def create_savings_goal(session: AsyncSession, user_id: int, data: dict):
     goal = SavingsGoal(user_id=user_id, **data)
     session.add(goal)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(goal)
     return goal
 
-async def list_savings_goals(session: AsyncSession, user_id: int):
-    result = await session.execute(select(SavingsGoal).where(SavingsGoal.user_id == user_id))
-    return result.scalars().all()
+async def list_savings_goals(session: AsyncSession, user_id: int, **options):
+    return await list_rows(session, SavingsGoal, user_id, **options)
 
 async def update_savings_goal(session: AsyncSession, user_id: int, goal_id: int, data: dict):
     result = await session.execute(select(SavingsGoal).where(SavingsGoal.id == goal_id, SavingsGoal.user_id == user_id))
@@ -118,6 +242,7 @@ async def update_savings_goal(session: AsyncSession, user_id: int, goal_id: int,
     for k, v in data.items():
         setattr(goal, k, v)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     await session.refresh(goal)
     return goal
 
@@ -128,4 +253,5 @@ async def delete_savings_goal(session: AsyncSession, user_id: int, goal_id: int)
         return False
     await session.delete(goal)
     await session.commit()
+    await invalidate_finance_cache(user_id)
     return True 
\ No newline at end of file
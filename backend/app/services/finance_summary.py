@@ -0,0 +1,243 @@
+import datetime
+import json
+import math
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache_manager, get_finance_cache_version
+from app.core.config import get_settings
+from app.db.models import Budget, Expense, ExpenseMonthlyRollup, IncomeSource, SavingsGoal
+from app.services.expense_rollup import month_of
+
+settings = get_settings()
+
+# Income frequency -> occurrences per month; unknown or missing counts as monthly
+FREQUENCY_PER_MONTH = {
+    'daily': 365 / 12,
+    'weekly': 52 / 12,
+    'biweekly': 26 / 12,
+    'fortnightly': 26 / 12,
+    'monthly': 1.0,
+    'quarterly': 1 / 3,
+    'yearly': 1 / 12,
+    'annually': 1 / 12,
+    'annual': 1 / 12,
+}
+
+SUMMARY_PARTS = ('spending', 'budgets', 'cash_flow', 'savings_goals')
+
+
+def add_months(day: datetime.date, months: int) -> datetime.datetime:
+    """Start of the month ``months`` away from ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def period_start(period: str, today: datetime.date) -> datetime.datetime:
+    """Start of the current budget period (ISO week, calendar month or year)."""
+    period = (period or '').lower()
+    if period == 'weekly':
+        monday = today - datetime.timedelta(days=today.weekday())
+        return datetime.datetime(monday.year, monday.month, monday.day)
+    if period in ('yearly', 'annually', 'annual'):
+        return datetime.datetime(today.year, 1, 1)
+    return datetime.datetime(today.year, today.month, 1)
+
+
+def period_end(period: str, today: datetime.date) -> datetime.datetime:
+    """Start of the next budget period; the current period ends before it."""
+    period = (period or '').lower()
+    start = period_start(period, today)
+    if period == 'weekly':
+        return start + datetime.timedelta(days=7)
+    if period in ('yearly', 'annually', 'annual'):
+        return datetime.datetime(today.year + 1, 1, 1)
+    return add_months(today, 1)
+
+
+async def monthly_spending(session: AsyncSession, user_id: int, months: int, today: datetime.date) -> List[Dict[str, Any]]:
+    """Expense totals per month and category for the last ``months`` months.
+
+    Reads ``expense_monthly_rollup``, so the cost grows with months and
+    categories rather than with the number of expenses. Future-dated
+    expenses are left out.
+    """
+    result = await session.execute(
+        select(ExpenseMonthlyRollup.month, ExpenseMonthlyRollup.category,
+               ExpenseMonthlyRollup.total, ExpenseMonthlyRollup.count)
+        .where(ExpenseMonthlyRollup.user_id == user_id,
+               ExpenseMonthlyRollup.month >= month_of(add_months(today, 1 - months)),
+               ExpenseMonthlyRollup.month <= month_of(today))
+        .order_by(ExpenseMonthlyRollup.month, ExpenseMonthlyRollup.category)
+    )
+    return [
+        {'month': row[0], 'category': row[1], 'total': float(row[2] or 0), 'count': row[3]}
+        for row in result.all()
+    ]
+
+
+async def budget_utilisation(session: AsyncSession, user_id: int, today: datetime.date) -> List[Dict[str, Any]]:
+    """Spending against each budget in its current period.
+
+    Monthly and yearly budgets are summed from the monthly rollup; weekly
+    budgets need day precision and sum the current week of ``expenses``.
+    Each period ends where the next one starts, so future-dated expenses
+    do not count against the current period.
+    """
+    weekly = func.lower(Budget.period) == 'weekly'
+    yearly = func.lower(Budget.period).in_(['yearly', 'annually', 'annual'])
+    first_month = case((yearly, f"{today.year:04d}-01"), else_=month_of(today))
+    last_month = case((yearly, f"{today.year:04d}-12"), else_=month_of(today))
+    spent = func.coalesce(func.sum(ExpenseMonthlyRollup.total), 0)
+    result = await session.execute(
+        select(Budget.id, Budget.category, Budget.period, Budget.amount, spent)
+        .outerjoin(ExpenseMonthlyRollup, (ExpenseMonthlyRollup.user_id == Budget.user_id)
+                   & (ExpenseMonthlyRollup.category == Budget.category)
+                   & (ExpenseMonthlyRollup.month >= first_month)
+                   & (ExpenseMonthlyRollup.month <= last_month)
+                   & ~weekly)
+        .where(Budget.user_id == user_id)
+        .group_by(Budget.id, Budget.category, Budget.period, Budget.amount)
+        .order_by(Budget.id)
+    )
+    rows = result.all()
+
+    weekly_spent: Dict[str, float] = {}
+    weekly_categories = {category for _, category, period, _, _ in rows if (period or '').lower() == 'weekly'}
+    if weekly_categories:
+        result = await session.execute(
+            select(Expense.category, func.sum(Expense.amount))
+            .where(Expense.user_id == user_id,
+                   Expense.category.in_(weekly_categories),
+                   Expense.date >= period_start('weekly', today),
+                   Expense.date < period_end('weekly', today))
+            .group_by(Expense.category)
+        )
+        weekly_spent = {category: float(total or 0) for category, total in result.all()}
+
+    budgets = []
+    for budget_id, category, period, amount, spent_amount in rows:
+        if (period or '').lower() == 'weekly':
+            spent_amount = weekly_spent.get(category, 0.0)
+        amount, spent_amount = float(amount or 0), float(spent_amount or 0)
+        budgets.append({
+            'budget_id': budget_id,
+            'category': category,
+            'period': period,
+            'period_start': period_start(period, today).date().isoformat(),
+            'budget': amount,
+            'spent': spent_amount,
+            'remaining': amount - spent_amount,
+            'utilisation': spent_amount / amount if amount else None,
+        })
+    return budgets
+
+
+async def monthly_income(session: AsyncSession, user_id: int) -> float:
+    """Income per month with each source normalised by its frequency."""
+    factor = case(
+        *[(func.lower(IncomeSource.frequency) == name, per_month) for name, per_month in FREQUENCY_PER_MONTH.items()],
+        else_=1.0
+    )
+    result = await session.execute(
+        select(func.coalesce(func.sum(IncomeSource.amount * factor), 0))
+        .where(IncomeSource.user_id == user_id)
+    )
+    return float(result.scalar() or 0)
+
+
+def cash_flow(spending: List[Dict[str, Any]], income: float, months: int, today: datetime.date) -> Dict[str, Any]:
+    """Net cash flow per month from the aggregated spending rows."""
+    expenses = {}
+    for row in spending:
+        expenses[row['month']] = expenses.get(row['month'], 0.0) + row['total']
+    series = []
+    for offset in range(1 - months, 1):
+        month = add_months(today, offset).strftime('%Y-%m')
+        spent = expenses.get(month, 0.0)
+        series.append({'month': month, 'income': income, 'expenses': spent, 'net': income - spent})
+    # The current month is still running, so average over complete months when there are any
+    complete = series[:-1] or series
+    return {
+        'monthly_income': income,
+        'average_net': sum(item['net'] for item in complete) / len(complete),
+        'months': series,
+    }
+
+
+async def savings_goal_progress(
+    session: AsyncSession,
+    user_id: int,
+    average_net: float,
+    today: datetime.date
+) -> List[Dict[str, Any]]:
+    """What each goal needs per month against the user's average net cash flow."""
+    result = await session.execute(
+        select(SavingsGoal.id, SavingsGoal.description, SavingsGoal.target_amount, SavingsGoal.target_date)
+        .where(SavingsGoal.user_id == user_id)
+        .order_by(SavingsGoal.target_date, SavingsGoal.id)
+    )
+    goals = []
+    for goal_id, description, target_amount, target_date in result.all():
+        target_amount = float(target_amount or 0)
+        months_left = max(
+            (target_date.year - today.year) * 12 + target_date.month - today.month, 0
+        ) if target_date else 0
+        required = target_amount / max(months_left, 1)
+        goals.append({
+            'goal_id': goal_id,
+            'description': description,
+            'target_amount': target_amount,
+            'target_date': target_date.isoformat() if target_date else None,
+            'months_remaining': months_left,
+            'required_monthly': required,
+            'on_track': average_net >= required,
+            'months_to_target': math.ceil(target_amount / average_net) if average_net > 0 else None,
+        })
+    return goals
+
+
+async def _cached(user_id: int, part: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Per-user result cache; a write to the user's finance tables changes the version."""
+    version = await get_finance_cache_version(user_id)
+    key = f"finance_summary:{user_id}:{version}:{part}:{json.dumps(params, sort_keys=True)}"
+    cached = await cache_manager.get(key)
+    if cached is not None:
+        return cached
+    value = await compute()
+    await cache_manager.set(key, value, settings.FINANCE_SUMMARY_CACHE_TTL)
+    return value
+
+
+async def get_summary(
+    session: AsyncSession,
+    user_id: int,
+    months: int = 6,
+    parts: Optional[List[str]] = None,
+    today: Optional[datetime.date] = None
+) -> Dict[str, Any]:
+    """Dashboard summary: the requested ``parts`` of :data:`SUMMARY_PARTS`."""
+    parts = [part for part in SUMMARY_PARTS if part in (parts or SUMMARY_PARTS)]
+    today = today or datetime.datetime.utcnow().date()
+
+    async def compute():
+        summary: Dict[str, Any] = {'months': months, 'as_of': today.isoformat()}
+        spending = None
+        if {'spending', 'cash_flow', 'savings_goals'} & set(parts):
+            spending = await monthly_spending(session, user_id, months, today)
+        if 'spending' in parts:
+            summary['spending'] = spending
+        if 'budgets' in parts:
+            summary['budgets'] = await budget_utilisation(session, user_id, today)
+        flow = None
+        if {'cash_flow', 'savings_goals'} & set(parts):
+            flow = cash_flow(spending, await monthly_income(session, user_id), months, today)
+        if 'cash_flow' in parts:
+            summary['cash_flow'] = flow
+        if 'savings_goals' in parts:
+            summary['savings_goals'] = await savings_goal_progress(session, user_id, flow['average_net'], today)
+        return summary
+
+    return await _cached(user_id, ",".join(parts), {'months': months, 'today': today.isoformat()}, compute)
@@ -0,0 +1,82 @@
+import re
+from typing import Any, Dict, List
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+PASSAGE_SEPARATOR = "#"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def passage_id(article_id: str, index: int) -> str:
+    return f"{article_id}{PASSAGE_SEPARATOR}{index}"
+
+
+def article_id_of(passage_id: str) -> str:
+    return passage_id.rsplit(PASSAGE_SEPARATOR, 1)[0]
+
+
+def split_passages(text: str, max_words: int = None, overlap_words: int = None) -> List[str]:
+    """Split ``text`` into passages of at most ``max_words`` words.
+
+    Passages end on sentence boundaries where possible and start with the
+    last sentences (up to ``overlap_words`` words) of the previous passage,
+    so a fact spanning a boundary is still retrievable from one passage.
+    Sentences longer than ``max_words`` are split on words.
+    """
+    max_words = max_words or settings.KNOWLEDGE_PASSAGE_WORDS
+    overlap_words = settings.KNOWLEDGE_PASSAGE_OVERLAP_WORDS if overlap_words is None else overlap_words
+
+    sentences = []
+    for sentence in _SENTENCE_RE.split(text or ""):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            sentences.append(words[start:start + max_words])
+
+    passages = []
+    current: List[List[str]] = []
+    current_words = 0
+    for words in sentences:
+        if current and current_words + len(words) > max_words:
+            passages.append(" ".join(" ".join(s) for s in current))
+            # Carry trailing sentences over as overlap, always dropping at least one
+            overlap: List[List[str]] = []
+            overlap_count = 0
+            for previous in reversed(current[1:]):
+                if overlap_count + len(previous) > overlap_words:
+                    break
+                overlap.insert(0, previous)
+                overlap_count += len(previous)
+            if overlap_count + len(words) > max_words:
+                overlap, overlap_count = [], 0
+            current, current_words = overlap, overlap_count
+        current.append(words)
+        current_words += len(words)
+
+    if current:
+        passages.append(" ".join(" ".join(s) for s in current))
+    return passages
+
+
+def chunk_knowledge(
+    articles: Dict[str, Dict[str, Any]],
+    max_words: int = None,
+    overlap_words: int = None
+) -> Dict[str, Dict[str, Any]]:
+    """Expand ``{article_id: article}`` into ``{passage_id: passage}``.
+
+    Each passage keeps its article's title, category and relevance score
+    and records ``article_id``; passage ids are ``<article_id>#<n>``.
+    """
+    passages = {}
+    for article_id, article in articles.items():
+        contents = split_passages(article.get('content', ''), max_words, overlap_words) or ['']
+        for index, content in enumerate(contents):
+            passages[passage_id(article_id, index)] = {
+                **article,
+                'content': content,
+                'article_id': article_id,
+            }
+    return passages
@@ -0,0 +1,112 @@
+import hashlib
+import heapq
+import json
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Tuple
+
+STOPWORDS = {
+    "en": {
+        "a", "about", "am", "an", "and", "any", "are", "as", "at", "be", "but", "by", "can",
+        "could", "did", "do", "does", "for", "from", "get", "have", "how", "i", "if", "in",
+        "is", "it", "its", "me", "my", "of", "on", "or", "should", "so", "that", "the",
+        "their", "there", "this", "to", "up", "was", "we", "what", "when", "where", "which",
+        "who", "why", "will", "with", "would", "you", "your",
+    },
+    "sw": {
+        "au", "bado", "cha", "hii", "hiyo", "hizi", "huo", "ili", "je", "ka", "kama", "katika",
+        "kila", "kuhusu", "kwa", "kwamba", "la", "lakini", "mimi", "na", "naomba", "ndiyo",
+        "ni", "nini", "nina", "nyingi", "pia", "sana", "si", "tu", "vya", "wa", "wako", "wewe",
+        "ya", "yako", "yangu", "yake", "za",
+    },
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3})")
+
+
+def tokenize(text: str, language: str = "en") -> List[str]:
+    """Lower-case, split on word boundaries and drop stopwords.
+
+    Thousands separators are removed so "800,000" matches "800000", and
+    English plurals are folded onto their singular form.
+    """
+    stopwords = STOPWORDS.get(language, STOPWORDS["en"])
+    tokens = []
+    for token in _TOKEN_RE.findall(_THOUSANDS_RE.sub("", text.lower())):
+        if token in stopwords or (len(token) < 2 and not token.isdigit()):
+            continue
+        if language == "en" and len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class KnowledgeIndex:
+    """In-memory inverted index over knowledge base items with BM25 ranking.
+
+    BM25 term weights are precomputed per posting at build time, so a query
+    only sums weights for the postings of its terms. Title terms count
+    ``title_weight`` times and each item's ``relevance_score`` scales its score.
+    """
+
+    def __init__(
+        self,
+        knowledge_dict: Dict[str, Dict[str, Any]],
+        language: str = "en",
+        k1: float = 1.5,
+        b: float = 0.75,
+        title_weight: int = 2,
+    ):
+        self.language = language
+        self.built_at = time.time()
+        # Content fingerprint, identical across processes for the same knowledge base
+        self.version = hashlib.sha1(
+            json.dumps(knowledge_dict, sort_keys=True, default=str).encode()
+        ).hexdigest()[:12]
+        self.doc_ids: List[str] = list(knowledge_dict.keys())
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+
+        term_counts = []
+        for item in knowledge_dict.values():
+            counts = Counter(tokenize(item.get("content", ""), language))
+            for token in tokenize(item.get("title", ""), language):
+                counts[token] += title_weight
+            term_counts.append(counts)
+
+        doc_count = len(term_counts)
+        lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = (sum(lengths) / doc_count) if doc_count else 0.0
+        priors = [float(item.get("relevance_score") or 1.0) for item in knowledge_dict.values()]
+
+        raw_postings = defaultdict(list)
+        for doc_idx, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                raw_postings[term].append((doc_idx, tf))
+
+        for term, docs in raw_postings.items():
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = [
+                (
+                    doc_idx,
+                    priors[doc_idx] * idf * tf * (k1 + 1)
+                    / (tf + k1 * (1 - b + b * lengths[doc_idx] / (avg_length or 1.0))),
+                )
+                for doc_idx, tf in docs
+            ]
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[str, float]]:
+        """Return the ``top_k`` best ``(item_id, score)`` pairs for ``query``."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query, self.language)):
+            for doc_idx, weight in self.postings.get(term, ()):
+                scores[doc_idx] += weight
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
+        return [(self.doc_ids[doc_idx], score) for doc_idx, score in best if score > 0]
+
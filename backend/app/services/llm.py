@@ -0,0 +1,182 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Hashable, List, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import get_settings, on_settings_reload
+from app.core.startup import Lazy
+
+if TYPE_CHECKING:
+    import openai
+
+settings = get_settings()
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class LLMClientManager:
+    """Application-lifetime OpenAI client with a tuned connection pool.
+
+    One ``AsyncOpenAI`` client (and its httpx pool) is shared by every request
+    so chat calls reuse warm keep-alive connections. Calls are admitted
+    through a global semaphore and an optional per-user semaphore; time spent
+    waiting for a slot is recorded as queue time.
+
+    On a settings reload the global semaphore is rebuilt at the new limit;
+    calls already holding a slot release it on the semaphore they acquired.
+    Per-user semaphores pick up the new limit once their current holders
+    and waiters are gone.
+    """
+
+    def __init__(self):
+        self.max_concurrency = settings.OPENAI_MAX_CONCURRENCY
+        self.max_concurrency_per_user = settings.OPENAI_MAX_CONCURRENCY_PER_USER
+        self.queue_timeout = settings.CHATBOT_RESPONSE_TIMEOUT
+        self._client: Optional["openai.AsyncOpenAI"] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        # The openai package is imported when the client is first needed
+        self._lazy_client = Lazy("llm_client", self._create_client)
+        self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        # user key -> [semaphore, holders]; removed when nobody holds or waits on it
+        self._user_slots: Dict[Hashable, List[Any]] = {}
+        self._metrics = {
+            'requests': 0,
+            'in_flight': 0,
+            'waiting': 0,
+            'queue_timeouts': 0,
+            'total_queue_time': 0.0,
+            'max_queue_time': 0.0,
+        }
+
+    def apply_settings(self, settings):
+        self.queue_timeout = settings.CHATBOT_RESPONSE_TIMEOUT
+        self.max_concurrency_per_user = settings.OPENAI_MAX_CONCURRENCY_PER_USER
+        if settings.OPENAI_MAX_CONCURRENCY != self.max_concurrency:
+            self.max_concurrency = settings.OPENAI_MAX_CONCURRENCY
+            self._global_slots = asyncio.Semaphore(self.max_concurrency)
+            logger.info(f"LLM concurrency limit set to {self.max_concurrency}")
+
+    async def start(self):
+        """Create the shared client (called from the app lifespan)."""
+        if self._client is None:
+            try:
+                self._lazy_client.get()
+            except Exception as e:
+                # Don't block startup; chat calls will report the error instead
+                logger.warning(f"LLM client not started: {e}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+        self._http_client = None
+        self._lazy_client.reset()
+
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        """The shared client, created on first use if the lifespan did not run."""
+        return self._lazy_client.get()
+
+    def _create_client(self) -> "openai.AsyncOpenAI":
+        import openai
+
+        http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.CHATBOT_RESPONSE_TIMEOUT, connect=5.0),
+        )
+        self._client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+        )
+        self._http_client = http_client
+        logger.info(f"LLM client pool created (http2={HTTP2_AVAILABLE})")
+        return self._client
+
+    @asynccontextmanager
+    async def acquire(self, user_id: Optional[Hashable] = None) -> AsyncIterator[None]:
+        """Wait for a global (and per-user) slot before calling the LLM.
+
+        Raises ``asyncio.TimeoutError`` if no slot frees up within the
+        chatbot response timeout.
+        """
+        user_slot = None
+        if user_id is not None and self.max_concurrency_per_user > 0:
+            user_slot = self._user_slots.setdefault(
+                user_id, [asyncio.Semaphore(self.max_concurrency_per_user), 0]
+            )
+            user_slot[1] += 1
+
+        # Released on the same semaphore even if a reload replaces it meanwhile
+        global_slots = self._global_slots
+        queued_at = time.perf_counter()
+        self._metrics['waiting'] += 1
+        acquired_user = acquired_global = False
+        try:
+            deadline = queued_at + self.queue_timeout
+            if user_slot is not None:
+                await asyncio.wait_for(user_slot[0].acquire(), timeout=self.queue_timeout)
+                acquired_user = True
+            await asyncio.wait_for(
+                global_slots.acquire(),
+                timeout=max(deadline - time.perf_counter(), 0)
+            )
+            acquired_global = True
+        except asyncio.TimeoutError:
+            self._metrics['queue_timeouts'] += 1
+            logger.warning("Timed out waiting for an LLM slot")
+            raise
+        finally:
+            self._metrics['waiting'] -= 1
+            if not acquired_global:
+                self._release_user_slot(user_id, user_slot, acquired_user)
+
+        queue_time = time.perf_counter() - queued_at
+        self._metrics['requests'] += 1
+        self._metrics['total_queue_time'] += queue_time
+        self._metrics['max_queue_time'] = max(self._metrics['max_queue_time'], queue_time)
+        self._metrics['in_flight'] += 1
+        try:
+            yield
+        finally:
+            self._metrics['in_flight'] -= 1
+            global_slots.release()
+            self._release_user_slot(user_id, user_slot, True)
+
+    def _release_user_slot(self, user_id: Optional[Hashable], user_slot: Optional[List[Any]], acquired: bool):
+        if user_slot is None:
+            return
+        if acquired:
+            user_slot[0].release()
+        user_slot[1] -= 1
+        if user_slot[1] == 0:
+            self._user_slots.pop(user_id, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        requests = self._metrics['requests']
+        return {
+            **self._metrics,
+            'average_queue_time': self._metrics['total_queue_time'] / requests if requests else 0.0,
+            'max_concurrency': self.max_concurrency,
+            'max_concurrency_per_user': self.max_concurrency_per_user,
+            'active_users': len(self._user_slots),
+            'http2': HTTP2_AVAILABLE,
+            'started': self._client is not None,
+        }
+
+
+# Global LLM client manager
+llm_client_manager = LLMClientManager()
+on_settings_reload(lambda settings, changed: llm_client_manager.apply_settings(settings))
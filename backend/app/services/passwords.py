@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+from loguru import logger
+
+from app.core.config import get_settings, on_settings_reload
+
+settings = get_settings()
+
+# bcrypt only uses the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already queued."""
+
+
+class PasswordHasher:
+    """bcrypt hashing on a bounded thread pool.
+
+    bcrypt releases the GIL while it works, so ``workers`` threads give real
+    parallelism without blocking the event loop. At most ``max_pending``
+    calls may be running or queued; beyond that :class:`PasswordHasherBusy`
+    is raised so a login burst is shed instead of queueing for seconds.
+    Hashes made with a different cost than ``rounds`` verify normally and are
+    reported by :meth:`needs_rehash`.
+    """
+
+    def __init__(self, rounds: int = None, workers: int = None, max_pending: int = None):
+        self.rounds = rounds or settings.PASSWORD_BCRYPT_ROUNDS
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.metrics = {
+            'hashes': 0,
+            'verifications': 0,
+            'rejected': 0,
+            'total_seconds': 0.0,
+            'max_seconds': 0.0,
+            'total_queue_seconds': 0.0,
+        }
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    @staticmethod
+    def _encode(password: str) -> bytes:
+        return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(self._encode(password), bcrypt.gensalt(self.rounds)).decode("ascii")
+
+    def _verify(self, password: str, hashed_password: str) -> bool:
+        try:
+            return bcrypt.checkpw(self._encode(password), hashed_password.encode("ascii"))
+        except ValueError:
+            # Not a bcrypt hash
+            return False
+
+    async def hash(self, password: str) -> str:
+        return await self._submit('hashes', self._hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit('verifications', self._verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True if the hash was made with a different cost (``$2b$<rounds>$...``)."""
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    async def _submit(self, kind: str, func: Callable[..., Any], *args) -> Any:
+        if self._pending >= self.max_pending:
+            self.metrics['rejected'] += 1
+            logger.warning(f"Password hashing queue full ({self._pending} pending), rejecting")
+            raise PasswordHasherBusy()
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        started = None
+
+        def timed():
+            nonlocal started
+            started = time.perf_counter()
+            return func(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self._pending -= 1
+            finished = time.perf_counter()
+            if started is not None:
+                elapsed = finished - started
+                self.metrics[kind] += 1
+                self.metrics['total_seconds'] += elapsed
+                self.metrics['max_seconds'] = max(self.metrics['max_seconds'], elapsed)
+                self.metrics['total_queue_seconds'] += started - submitted
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.metrics['hashes'] + self.metrics['verifications']
+        return {
+            **self.metrics,
+            'average_ms': self.metrics['total_seconds'] / calls * 1000 if calls else 0.0,
+            'average_queue_ms': self.metrics['total_queue_seconds'] / calls * 1000 if calls else 0.0,
+            'pending': self._pending,
+            'max_pending': self.max_pending,
+            'workers': self.workers,
+            'rounds': self.rounds,
+        }
+
+
+# Global password hasher
+password_hasher = PasswordHasher()
+
+
+@on_settings_reload
+def _apply_password_settings(settings, changed):
+    password_hasher.rounds = settings.PASSWORD_BCRYPT_ROUNDS
+    password_hasher.max_pending = settings.PASSWORD_HASH_MAX_PENDING
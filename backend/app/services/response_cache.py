@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.cache import cache_manager
+from app.core.config import get_settings, on_settings_reload
+from app.services.knowledge_index import tokenize
+from app.services.semantic_search import semantic_search_service
+
+settings = get_settings()
+
+
+class ResponseCache:
+    """Cache of chatbot answers for repeated first-turn questions.
+
+    Exact lookups are keyed on the normalised question, language, system
+    prompt version, knowledge base version, retrieved knowledge ids and user
+    profile, and stored via ``cache_manager`` so they are shared across
+    processes. An optional in-process embedding lookup returns the answer to
+    a near-duplicate question in the same bucket (language + prompt and
+    knowledge versions + profile) when cosine similarity reaches
+    ``similarity_threshold``.
+
+    Only the exact write happens on the request path; indexing the question
+    embedding runs as a background task, so a cold worker never waits for
+    the embedding model to load before answering.
+
+    Because the knowledge base version is part of every key, refreshing the
+    knowledge base orphans old answers; they then expire after ``ttl``.
+    """
+
+    def __init__(self):
+        self.apply_settings(settings)
+        self.max_similarity_buckets = 64
+        # bucket -> (normalised question embeddings, cache keys), least recently used first
+        self._vectors: "OrderedDict[str, Tuple[np.ndarray, List[str]]]" = OrderedDict()
+        self._pending: Set[asyncio.Task] = set()
+        self.metrics = {
+            'hits': 0,
+            'semantic_hits': 0,
+            'misses': 0,
+            'stores': 0,
+        }
+
+    def apply_settings(self, settings):
+        self.enabled = settings.CHATBOT_RESPONSE_CACHE_ENABLED
+        self.ttl = settings.CHATBOT_CACHE_TTL
+        self.similarity_threshold = settings.CHATBOT_RESPONSE_CACHE_SIMILARITY
+        self.max_similarity_entries = settings.CHATBOT_RESPONSE_CACHE_SIMILARITY_ENTRIES
+
+    @staticmethod
+    def normalize_question(question: str, language: str) -> str:
+        return " ".join(tokenize(question, language))
+
+    @staticmethod
+    def bucket(
+        language: str,
+        knowledge_version: Optional[str],
+        user_profile: Optional[Dict[str, Any]],
+        prompt_id: Optional[str] = None
+    ) -> str:
+        profile_hash = ""
+        if user_profile:
+            profile_hash = hashlib.sha1(json.dumps(user_profile, sort_keys=True).encode()).hexdigest()[:8]
+        prompt_version = prompt_id.rsplit(':', 1)[-1] if prompt_id else 'none'
+        return f"{language}:{prompt_version}:{knowledge_version or 'none'}:{profile_hash}"
+
+    def make_key(self, question: str, language: str, bucket: str, knowledge_ids: List[str]) -> str:
+        normalized = self.normalize_question(question, language)
+        digest = hashlib.sha1(f"{normalized}|{','.join(sorted(knowledge_ids))}".encode()).hexdigest()
+        return f"chat_response:{bucket}:{digest}"
+
+    async def get(self, key: str, question: str, bucket: str) -> Optional[Dict[str, Any]]:
+        """Return ``{'response': ..., 'match': 'exact'|'semantic'}`` or ``None``."""
+        if not self.enabled:
+            return None
+
+        cached = await cache_manager.get(key)
+        if cached:
+            self.metrics['hits'] += 1
+            return {'response': cached, 'match': 'exact'}
+
+        similar_key = await self._find_similar_key(question, bucket)
+        if similar_key:
+            cached = await cache_manager.get(similar_key)
+            if cached:
+                self.metrics['semantic_hits'] += 1
+                return {'response': cached, 'match': 'semantic'}
+
+        self.metrics['misses'] += 1
+        return None
+
+    async def set(self, key: str, question: str, bucket: str, response: Dict[str, Any]):
+        if not self.enabled:
+            return
+        if await cache_manager.set(key, response, self.ttl):
+            self.metrics['stores'] += 1
+            if self.similarity_threshold < 1.0 and semantic_search_service.available:
+                task = asyncio.get_running_loop().create_task(self._remember_question(key, question, bucket))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+
+    async def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.similarity_threshold >= 1.0 or not semantic_search_service.available:
+            return None
+        embedding = await semantic_search_service.embed(question)
+        if embedding is None:
+            return None
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else None
+
+    async def _find_similar_key(self, question: str, bucket: str) -> Optional[str]:
+        if bucket not in self._vectors:
+            return None
+        try:
+            query = await self._embed(question)
+            if query is None:
+                return None
+            matrix, keys = self._vectors[bucket]
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            return keys[best] if scores[best] >= self.similarity_threshold else None
+        except Exception as e:
+            logger.error(f"Response cache similarity lookup error: {e}")
+            return None
+
+    async def _remember_question(self, key: str, question: str, bucket: str):
+        try:
+            vector = await self._embed(question)
+            if vector is None:
+                return
+            matrix, keys = self._vectors.get(bucket, (np.empty((0, vector.shape[0]), dtype=np.float32), []))
+            if key in keys:
+                return
+            # Keep only the most recent entries per bucket
+            matrix = np.vstack([matrix, vector])[-self.max_similarity_entries:]
+            keys = (keys + [key])[-self.max_similarity_entries:]
+            self._vectors[bucket] = (matrix, keys)
+            self._vectors.move_to_end(bucket)
+            if len(self._vectors) > self.max_similarity_buckets:
+                self._vectors.popitem(last=False)
+        except Exception as e:
+            logger.error(f"Response cache similarity store error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics['hits'] + self.metrics['semantic_hits'] + self.metrics['misses']
+        return {
+            **self.metrics,
+            'enabled': self.enabled,
+            'hit_rate': (self.metrics['hits'] + self.metrics['semantic_hits']) / lookups if lookups else 0.0,
+            'similarity_entries': sum(len(keys) for _, keys in self._vectors.values()),
+        }
+
+
+# Global response cache
+response_cache = ResponseCache()
+on_settings_reload(lambda settings, changed: response_cache.apply_settings(settings))
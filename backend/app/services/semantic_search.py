@@ -1,120 +1,322 @@
-import numpy as np
+import asyncio
+import importlib.util
+import re
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
+
+import numpy as np
 from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings, on_settings_reload
+from app.core.startup import Lazy
+from app.db.models import KnowledgeBase
+from app.services.embedding_executor import EmbeddingBatcher
+from app.services.knowledge_chunks import article_id_of, chunk_knowledge
+from app.services.vector_index import EmbeddingIndex
 
-# Try to import ML dependencies with fallback
-try:
-    from sentence_transformers import SentenceTransformer
-    from sklearn.metrics.pairwise import cosine_similarity
-    ML_AVAILABLE = True
+settings = get_settings()
+
+# Check for ML dependencies without importing them; torch and
+# sentence-transformers take seconds to load and are only needed once a
+# request actually embeds something
+ML_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+if ML_AVAILABLE:
     logger.info("ML dependencies available for semantic search")
-except ImportError as e:
-    logger.warning(f"ML dependencies not available: {e}. Semantic search will be disabled.")
-    ML_AVAILABLE = False
+else:
+    logger.warning("ML dependencies not available. Semantic search will be disabled.")
+
+
+def _load_model():
+    """Initialize the sentence transformer model (``None`` if it can't be loaded)."""
+    if not ML_AVAILABLE:
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(settings.SEMANTIC_MODEL_NAME)
+        logger.info("Semantic search service initialized")
+        return model
+    except Exception as e:
+        logger.error(f"Failed to initialize semantic search: {e}")
+        return None
+
 
 class SemanticSearchService:
     """Semantic search service for knowledge base content."""
-    
+
     def __init__(self):
+        # Loaded on first use or by the warm-up endpoint
+        self._model = Lazy("embedding_model", _load_model)
+        self.embeddings_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.embeddings_cache_size = settings.SEMANTIC_QUERY_CACHE_SIZE
+        # Used from the event loop and from worker threads
+        self._cache_lock = threading.Lock()
+        self.similarity_threshold = settings.SEMANTIC_SIMILARITY_THRESHOLD
+        self.indexes: Dict[str, EmbeddingIndex] = {}
+        # All model calls go through one worker thread that coalesces concurrent requests
+        self.batcher = EmbeddingBatcher(self._encode)
+
         if not ML_AVAILABLE:
-            self.model = None
-            self.embeddings_cache = {}
-            self.similarity_threshold = 0.3
             logger.warning("Semantic search disabled - ML dependencies not available")
-            return
-            
-        # Initialize sentence transformer model
+
+    @property
+    def model(self):
+        """The embedding model; loading it blocks, so async callers use :meth:`load_model`."""
+        return self._model.get()
+
+    @model.setter
+    def model(self, model):
+        self._model.set(model)
+
+    @property
+    def available(self) -> bool:
+        """Whether embeddings can be produced, without loading the model."""
+        if self._model.initialized:
+            return self._model.get() is not None
+        return ML_AVAILABLE
+
+    async def load_model(self):
+        """Load the model in a worker thread so the event loop keeps serving."""
+        if self._model.initialized:
+            return self._model.get()
+        return await asyncio.to_thread(self._model.get)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Run the model; only called from the batcher's worker thread."""
+        return self.model.encode(texts, batch_size=32, convert_to_numpy=True)
+
+    def _cached_embedding(self, text: str) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            embedding = self.embeddings_cache.get(text)
+            if embedding is not None:
+                self.embeddings_cache.move_to_end(text)
+            return embedding
+
+    def _remember_embedding(self, text: str, embedding: np.ndarray):
+        with self._cache_lock:
+            self.embeddings_cache[text] = embedding
+            if len(self.embeddings_cache) > self.embeddings_cache_size:
+                self.embeddings_cache.popitem(last=False)
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embedding for ``text`` without blocking the event loop.
+
+        Concurrent calls are batched into one forward pass; recent results
+        are kept in a bounded LRU.
+        """
+        if not self.available or not await self.load_model():
+            return None
+
+        embedding = self._cached_embedding(text)
+        if embedding is not None:
+            return embedding
+
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.embeddings_cache = {}
-            self.similarity_threshold = 0.3
-            logger.info("Semantic search service initialized")
+            embedding = (await asyncio.wrap_future(self.batcher.submit([text])))[0]
+            self._remember_embedding(text, embedding)
+            return embedding
         except Exception as e:
-            logger.error(f"Failed to initialize semantic search: {e}")
-            self.model = None
-    
+            logger.error(f"Error getting embedding: {e}")
+            return None
+
     def get_embedding(self, text: str) -> Optional[np.ndarray]:
-        """Get embedding for text."""
+        """Blocking variant of :meth:`embed` for worker threads and scripts."""
         if not self.model:
             return None
-            
-        if text in self.embeddings_cache:
-            return self.embeddings_cache[text]
-        
+
+        embedding = self._cached_embedding(text)
+        if embedding is not None:
+            return embedding
+
         try:
-            embedding = self.model.encode(text)
-            self.embeddings_cache[text] = embedding
+            embedding = self.batcher.submit([text]).result()[0]
+            self._remember_embedding(text, embedding)
             return embedding
         except Exception as e:
             logger.error(f"Error getting embedding: {e}")
             return None
-    
-    def find_similar_content(
-        self, 
-        query: str, 
-        knowledge_items: List[Dict[str, Any]], 
-        top_k: int = 3
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode several texts through the batcher (blocks the calling thread)."""
+        return self.batcher.submit(texts).result()
+
+    def get_index(self, namespace: str = "default") -> EmbeddingIndex:
+        """Get (or open) the persistent embedding index for a namespace."""
+        if namespace not in self.indexes:
+            # The model name is part of the file name so a model change never mixes dimensions
+            model_slug = re.sub(r"[^A-Za-z0-9_.-]", "_", settings.SEMANTIC_MODEL_NAME)
+            self.indexes[namespace] = EmbeddingIndex(
+                settings.SEMANTIC_INDEX_DIR, f"{namespace}-{model_slug}"
+            )
+        return self.indexes[namespace]
+
+    @staticmethod
+    def _item_text(item: Dict[str, Any]) -> str:
+        # Combine title and content for embedding
+        return f"{item['title']} {item['content']}"
+
+    @staticmethod
+    def _item_version(item: Dict[str, Any]) -> str:
+        updated_at = item.get('updated_at')
+        if hasattr(updated_at, 'isoformat'):
+            updated_at = updated_at.isoformat()
+        # Passage settings are part of the version so changing them re-chunks everything
+        return (
+            f"{item['id']}:{updated_at or ''}:"
+            f"{settings.KNOWLEDGE_PASSAGE_WORDS}/{settings.KNOWLEDGE_PASSAGE_OVERLAP_WORDS}"
+        )
+
+    def _passage_versions(
+        self,
+        index: EmbeddingIndex,
+        article_versions: Dict[str, str],
+        articles: Dict[str, Dict[str, Any]]
+    ):
+        """Passage versions and texts to sync ``index`` with the given articles.
+
+        ``articles`` must hold ``title``/``content`` for every article whose
+        version changed. Passages of unchanged articles keep their rows.
+        """
+        versions = {
+            row_id: version for row_id, version in index.versions.items()
+            if article_versions.get(article_id_of(row_id)) == version
+        }
+        passages = chunk_knowledge(articles)
+        versions.update({
+            row_id: article_versions[passage['article_id']] for row_id, passage in passages.items()
+        })
+        texts = {row_id: self._item_text(passage) for row_id, passage in passages.items()}
+        return versions, texts
+
+    def _stale_articles(self, index: EmbeddingIndex, article_versions: Dict[str, str]) -> List[str]:
+        """Articles with no passages in ``index`` at their current version."""
+        indexed = {article_id_of(row_id): version for row_id, version in index.versions.items()}
+        return [
+            article_id for article_id, version in article_versions.items()
+            if indexed.get(article_id) != version
+        ]
+
+    async def find_similar_content(
+        self,
+        query: str,
+        knowledge_items: Optional[List[Dict[str, Any]]] = None,
+        top_k: int = 3,
+        namespace: str = "default"
     ) -> List[Dict[str, Any]]:
-        """Find similar content using semantic search."""
-        if not self.model:
+        """Find the most similar passages using the persistent embedding index.
+
+        When ``knowledge_items`` are given (each with an ``id`` and optionally
+        ``updated_at``) the index is synced with their passages first and the
+        matching passages are returned with their ``article_id`` and a
+        ``similarity_score``. Otherwise the index is queried as-is and only
+        ``id``/``article_id``/``similarity_score`` are returned.
+
+        Model loading, encoding and the index scan run in worker threads, and
+        only the articles behind the hits are chunked for the response.
+        """
+        if not self.available or not await self.load_model():
             logger.debug("Semantic search not available, returning empty results")
             return []
-            
+
         try:
-            if not knowledge_items:
-                return []
-            
+            if knowledge_items is not None:
+                if not knowledge_items:
+                    return []
+                await asyncio.to_thread(self.update_embeddings_cache, knowledge_items, namespace)
+
             # Get query embedding
-            query_embedding = self.get_embedding(query)
+            query_embedding = await self.embed(query)
             if query_embedding is None:
                 return []
-            
-            # Get embeddings for all knowledge items
-            item_embeddings = []
-            for item in knowledge_items:
-                # Combine title and content for embedding
-                text = f"{item['title']} {item['content']}"
-                embedding = self.get_embedding(text)
-                if embedding is not None:
-                    item_embeddings.append(embedding)
-                else:
-                    # Skip items that can't be embedded
-                    continue
-            
-            if not item_embeddings:
-                return []
-            
-            # Calculate similarities
-            similarities = cosine_similarity([query_embedding], item_embeddings)[0]
-            
-            # Create results with similarity scores
-            results = []
-            for i, item in enumerate(knowledge_items):
-                if i < len(similarities):
-                    similarity = similarities[i]
-                    if similarity >= self.similarity_threshold:
-                        results.append({
-                            **item,
-                            'similarity_score': float(similarity)
-                        })
-            
-            # Sort by similarity score and return top_k
-            results.sort(key=lambda x: x['similarity_score'], reverse=True)
-            return results[:top_k]
-            
+
+            hits = await asyncio.to_thread(
+                self.get_index(namespace).search, query_embedding, top_k, self.similarity_threshold
+            )
+
+            if knowledge_items is None:
+                return [
+                    {'id': row_id, 'article_id': article_id_of(row_id), 'similarity_score': score}
+                    for row_id, score in hits
+                ]
+
+            hit_articles = {article_id_of(row_id) for row_id, _ in hits}
+            passages = chunk_knowledge({
+                item['id']: item for item in knowledge_items if item['id'] in hit_articles
+            })
+            return [
+                {**passages[row_id], 'id': row_id, 'similarity_score': score}
+                for row_id, score in hits
+                if row_id in passages
+            ]
+
         except Exception as e:
             logger.error(f"Error in semantic search: {e}")
             return []
-    
-    def update_embeddings_cache(self, knowledge_items: List[Dict[str, Any]]):
-        """Update embeddings cache with new knowledge items."""
+
+    def update_embeddings_cache(
+        self,
+        knowledge_items: List[Dict[str, Any]],
+        namespace: str = "default"
+    ) -> int:
+        """Sync the namespace index with the passages of ``knowledge_items``.
+
+        Only passages of new or changed articles are encoded.
+        """
         if not self.model:
-            return
-            
-        for item in knowledge_items:
-            text = f"{item['title']} {item['content']}"
-            if text not in self.embeddings_cache:
-                self.get_embedding(text)
+            return 0
+
+        index = self.get_index(namespace)
+        article_versions = {item['id']: self._item_version(item) for item in knowledge_items}
+        stale = set(self._stale_articles(index, article_versions))
+        versions, texts = self._passage_versions(
+            index, article_versions,
+            {item['id']: item for item in knowledge_items if item['id'] in stale}
+        )
+        return index.sync(versions, self.encode_batch, texts)
+
+    async def sync_knowledge_base(self, db: AsyncSession, language: str) -> int:
+        """Incrementally rebuild the passage index for a language from the knowledge_base table.
+
+        Only ``id``/``updated_at`` are read for every row; title and content
+        are fetched, chunked and encoded just for rows that are new or have
+        changed.
+        """
+        if not self.available or not await self.load_model():
+            return 0
+
+        index = self.get_index(language)
+        result = await db.execute(
+            select(KnowledgeBase.id, KnowledgeBase.updated_at).where(
+                KnowledgeBase.language == language,
+                KnowledgeBase.is_active == True
+            )
+        )
+        article_versions = {
+            row.id: self._item_version({'id': row.id, 'updated_at': row.updated_at})
+            for row in result
+        }
+
+        articles = {}
+        stale = self._stale_articles(index, article_versions)
+        for start in range(0, len(stale), 500):
+            result = await db.execute(
+                select(KnowledgeBase.id, KnowledgeBase.title, KnowledgeBase.content).where(
+                    KnowledgeBase.id.in_(stale[start:start + 500])
+                )
+            )
+            articles.update({row.id: {'title': row.title, 'content': row.content} for row in result})
+
+        versions, texts = self._passage_versions(index, article_versions, articles)
+        # Encoding is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(index.sync, versions, self.encode_batch, texts)
+
 
 # Global semantic search service
-semantic_search_service = SemanticSearchService() 
\ No newline at end of file
+semantic_search_service = SemanticSearchService()
+
+
+@on_settings_reload
+def _apply_threshold(settings, changed):
+    semantic_search_service.similarity_threshold = settings.SEMANTIC_SIMILARITY_THRESHOLD
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+
+class EmbeddingIndex:
+    """Persistent, memory-mapped embedding matrix for top-k similarity search.
+
+    Rows are L2-normalised float32 vectors stored in ``{name}.f32`` with a
+    JSON manifest (``{name}.json``) holding the row ids and their version
+    keys (``KnowledgeBase.id`` + ``updated_at``). Only rows whose version
+    changed are re-encoded on :meth:`sync`; queries are a single matmul
+    plus ``argpartition`` over the mapped matrix.
+    """
+
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        self.matrix_path = os.path.join(directory, f"{name}.f32")
+        self.manifest_path = os.path.join(directory, f"{name}.json")
+        self._lock = threading.Lock()
+        # (matrix, ids) is swapped as one tuple so searches never see a torn update
+        self._state: Tuple[Optional[np.ndarray], List[str]] = (None, [])
+        self._versions: Dict[str, str] = {}
+        self._dim = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._state[1])
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._state[1])
+
+    @property
+    def versions(self) -> Dict[str, str]:
+        """Mapping of row id to the version key it was embedded at."""
+        return dict(self._versions)
+
+    def _load(self):
+        """Map an existing index from disk, discarding it if inconsistent."""
+        if not (os.path.exists(self.manifest_path) and os.path.exists(self.matrix_path)):
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            ids = manifest["ids"]
+            versions = manifest["versions"]
+            dim = int(manifest["dim"])
+            expected_size = len(ids) * dim * np.dtype(np.float32).itemsize
+            if os.path.getsize(self.matrix_path) != expected_size:
+                raise ValueError("matrix size does not match manifest")
+
+            matrix = None
+            if ids:
+                matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(ids), dim))
+            self._state, self._dim = (matrix, ids), dim
+            self._versions = dict(zip(ids, versions))
+            logger.info(f"Loaded embedding index '{self.name}' with {len(ids)} rows")
+        except Exception as e:
+            logger.warning(f"Discarding embedding index '{self.name}': {e}")
+            self._state, self._versions, self._dim = (None, []), {}, 0
+
+    def stale_ids(self, versions: Dict[str, str]) -> List[str]:
+        """Return ids from ``versions`` that are missing or outdated in the index."""
+        return [row_id for row_id, version in versions.items() if self._versions.get(row_id) != version]
+
+    def sync(
+        self,
+        versions: Dict[str, str],
+        encode: Callable[[List[str]], np.ndarray],
+        texts: Dict[str, str],
+    ) -> int:
+        """Bring the index in line with ``versions`` (id -> version key).
+
+        ``texts`` must contain the text for every stale id; ``encode`` is
+        called once with all of them. Rows not present in ``versions`` are
+        dropped. Returns the number of rows that were (re-)encoded.
+        """
+        with self._lock:
+            stale = self.stale_ids(versions)
+            removed = set(self._versions) - set(versions)
+            if not stale and not removed:
+                return 0
+
+            new_vectors = None
+            if stale:
+                new_vectors = self._normalise(np.asarray(encode([texts[row_id] for row_id in stale]), dtype=np.float32))
+            dim = new_vectors.shape[1] if new_vectors is not None else self._dim
+
+            old_matrix, old_ids = self._state
+            ids = list(versions.keys())
+            matrix = np.empty((len(ids), dim), dtype=np.float32)
+            old_rows = {row_id: i for i, row_id in enumerate(old_ids)}
+            positions = {row_id: i for i, row_id in enumerate(ids)}
+            stale_set = set(stale)
+            kept = [(positions[row_id], old_rows[row_id]) for row_id in ids if row_id not in stale_set]
+            if kept:
+                dst, src = zip(*kept)
+                matrix[list(dst)] = old_matrix[list(src)]
+            if stale:
+                matrix[[positions[row_id] for row_id in stale]] = new_vectors
+
+            self._persist(ids, [versions[row_id] for row_id in ids], dim, matrix)
+            logger.info(
+                f"Embedding index '{self.name}' synced: {len(stale)} encoded, "
+                f"{len(removed)} removed, {len(ids)} total"
+            )
+            return len(stale)
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 3,
+        threshold: float = 0.0,
+    ) -> List[Tuple[str, float]]:
+        """Return up to ``top_k`` ``(id, cosine_similarity)`` pairs above ``threshold``."""
+        matrix, ids = self._state
+        if matrix is None or not ids or top_k <= 0:
+            return []
+
+        query = self._normalise(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        scores = matrix @ query
+
+        k = min(top_k, len(ids))
+        if k < len(ids):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(ids))
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        return [(ids[i], float(scores[i])) for i in candidates if scores[i] >= threshold]
+
+    def _persist(self, ids: Sequence[str], versions: Sequence[str], dim: int, matrix: np.ndarray):
+        """Atomically replace the on-disk index and re-map it."""
+        os.makedirs(self.directory, exist_ok=True)
+        matrix_tmp = f"{self.matrix_path}.tmp"
+        manifest_tmp = f"{self.manifest_path}.tmp"
+
+        matrix.tofile(matrix_tmp)
+        with open(manifest_tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "ids": list(ids), "versions": list(versions)}, f)
+        os.replace(matrix_tmp, self.matrix_path)
+        os.replace(manifest_tmp, self.manifest_path)
+
+        mapped = None
+        if ids:
+            mapped = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(ids), dim))
+        self._state, self._dim = (mapped, list(ids)), dim
+        self._versions = dict(zip(ids, versions))
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import insert
+
+from app.core.config import get_settings, on_settings_reload
+from app.db.models import AsyncSessionLocal, ChatbotAnalytics, ChatbotDailyIntent, ChatbotDailyStats
+from app.db.upsert import upsert_increments
+
+settings = get_settings()
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+
+def build_rollups(batch: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Fold a batch of analytics rows into daily stats and intent increments.
+
+    Each queued item is ``(row, rollup)`` where ``rollup`` carries the turn's
+    ``language``. Conversation and message counts are not part of the batch;
+    the chat service adds them when it commits the turn.
+    """
+    stats: Dict[Tuple[Any, str], Dict[str, Any]] = {}
+    intents: Dict[Tuple[Any, str], Dict[str, Any]] = {}
+
+    for row, rollup in batch:
+        rollup = rollup or {}
+        day = row['created_at'].date()
+        language = rollup.get('language') or 'unknown'
+
+        entry = stats.get((day, language))
+        if entry is None:
+            entry = stats[(day, language)] = {
+                'day': day, 'language': language, 'responses': 0,
+                'response_time_sum': 0.0, 'response_time_count': 0,
+                'confidence_sum': 0.0, 'confidence_count': 0,
+                'positive': 0, 'negative': 0, 'neutral': 0,
+            }
+        entry['responses'] += 1
+        if row.get('response_time') is not None:
+            entry['response_time_sum'] += row['response_time']
+            entry['response_time_count'] += 1
+        if row.get('confidence') is not None:
+            entry['confidence_sum'] += row['confidence']
+            entry['confidence_count'] += 1
+        if row.get('sentiment') in SENTIMENTS:
+            entry[row['sentiment']] += 1
+
+        if row.get('intent'):
+            intent = intents.setdefault(
+                (day, row['intent']),
+                {'day': day, 'intent': row['intent'], 'count': 0, 'confidence_sum': 0.0}
+            )
+            intent['count'] += 1
+            intent['confidence_sum'] += row.get('confidence') or 0.0
+
+    return list(stats.values()), list(intents.values())
+
+
+class AnalyticsWriter:
+    """Write-behind queue for ``ChatbotAnalytics`` rows.
+
+    Request handlers only enqueue a row dict. A background consumer drains
+    the bounded queue and writes batches with one multi-row INSERT whenever
+    ``batch_size`` rows are waiting or ``flush_interval`` has passed since
+    the first row of the batch. When the queue is full new rows are dropped
+    and counted rather than slowing down the chat path. A batch that fails
+    to write is retried ``retries`` times with backoff before it is counted
+    as failed.
+
+    The same transaction adds the batch onto the daily rollup tables
+    (``chatbot_daily_stats``/``chatbot_daily_intents``) that back
+    ``/chatbot/analytics``.
+    """
+
+    def __init__(self):
+        self.batch_size = settings.ANALYTICS_BATCH_SIZE
+        self.flush_interval = settings.ANALYTICS_FLUSH_INTERVAL_MS / 1000
+        self.retries = settings.ANALYTICS_WRITE_RETRIES
+        self.retry_backoff = 0.5
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ANALYTICS_QUEUE_SIZE)
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'retries': 0,
+            'batches': 0,
+        }
+
+    def apply_settings(self, settings):
+        """Pick up new batching settings; the queue bound needs a restart."""
+        self.batch_size = settings.ANALYTICS_BATCH_SIZE
+        self.flush_interval = settings.ANALYTICS_FLUSH_INTERVAL_MS / 1000
+        self.retries = settings.ANALYTICS_WRITE_RETRIES
+
+    def enqueue(self, row: Dict[str, Any], rollup: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue a row for writing; returns False if it was dropped."""
+        # Starts lazily if the lifespan did not run (e.g. tests or a bare serverless import)
+        self.start()
+        try:
+            self._queue.put_nowait((row, rollup))
+            self.metrics['enqueued'] += 1
+            return True
+        except asyncio.QueueFull:
+            self.metrics['dropped'] += 1
+            logger.warning("Analytics queue full, dropping row")
+            return False
+
+    def start(self):
+        """Start the background consumer (called from the app lifespan)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        if self._loop is not None and self._loop is not loop:
+            # The queue belonged to another event loop; carry its rows over
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._queue = asyncio.Queue(maxsize=self._queue.maxsize)
+            for item in pending:
+                self._queue.put_nowait(item)
+        self._loop = loop
+        self._task = loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush queued rows and stop the consumer."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Analytics flush timed out with {self._queue.qsize()} rows queued")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]):
+        stats, intents = build_rollups(batch)
+        for attempt in range(self.retries + 1):
+            try:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(insert(ChatbotAnalytics), [row for row, _ in batch])
+                    await upsert_increments(session, ChatbotDailyStats, stats, ['day', 'language'])
+                    await upsert_increments(session, ChatbotDailyIntent, intents, ['day', 'intent'])
+                    await session.commit()
+                self.metrics['written'] += len(batch)
+                self.metrics['batches'] += 1
+                return
+            except Exception as e:
+                if attempt < self.retries:
+                    self.metrics['retries'] += 1
+                    logger.warning(f"Analytics write failed ({e}), retrying {len(batch)} rows")
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                self.metrics['failed'] += len(batch)
+                logger.error(f"Failed to write {len(batch)} analytics rows after {attempt + 1} attempts: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            'queued': self._queue.qsize(),
+            'running': self._task is not None,
+        }
+
+
+# Global analytics writer
+analytics_writer = AnalyticsWriter()
+on_settings_reload(lambda settings, changed: analytics_writer.apply_settings(settings))
@@ -0,0 +1,200 @@
+import csv
+import datetime
+import io
+import json
+import tempfile
+import uuid
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+from app.core.cache import cache_import_job, invalidate_finance_cache
+from app.core.config import get_settings
+from app.db.models import AsyncSessionLocal, Expense
+from app.schemas.finance import ExpenseCreate
+from app.services import expense_rollup
+
+settings = get_settings()
+
+FORMATS = ('csv', 'ndjson')
+COLUMNS = ('user_id', 'amount', 'category', 'description', 'date', 'created_at')
+DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%Y %H:%M', '%d-%m-%Y', '%Y/%m/%d')
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+class ImportTooLarge(Exception):
+    pass
+
+
+def detect_format(content_type: Optional[str], requested: Optional[str] = None) -> Optional[str]:
+    if requested:
+        return requested.lower() if requested.lower() in FORMATS else None
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/json'):
+        return 'ndjson'
+    return None
+
+
+async def spool_body(chunks, max_bytes: int) -> Tuple[BinaryIO, int]:
+    """Copy an upload into a temp file that only stays in memory while small."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise ImportTooLarge()
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, size
+
+
+def parse_date(value: str) -> datetime.datetime:
+    value = value.strip()
+    try:
+        return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+
+def validate_row(raw: Dict[str, Any], user_id: int, now: datetime.datetime) -> Dict[str, Any]:
+    """Turn an uploaded record into an ``expenses`` row; raises ``ValueError``."""
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object")
+    fields = {key: raw.get(key) for key in ('amount', 'category', 'description', 'date')}
+    fields['description'] = fields['description'] or None
+    try:
+        data = ExpenseCreate(**fields)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    if not data.category.strip():
+        raise ValueError("category: must not be empty")
+    return {
+        'user_id': user_id,
+        'amount': int(round(data.amount)),
+        'category': data.category.strip(),
+        'description': data.description,
+        'date': parse_date(data.date),
+        'created_at': now,
+    }
+
+
+def iter_records(file: BinaryIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(row number, record or exception)`` one record at a time."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            if reader.fieldnames:
+                reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield number, ValueError(f"invalid JSON: {e.msg}")
+    finally:
+        text.detach()
+
+
+async def insert_batch(session, rows: List[Dict[str, Any]]):
+    """COPY on asyncpg, otherwise one multi-row INSERT; the rollup is updated in the same transaction."""
+    connection = await session.connection()
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'asyncpg':
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Expense.__tablename__,
+            records=[tuple(row[column] for column in COLUMNS) for row in rows],
+            columns=list(COLUMNS),
+        )
+    else:
+        await session.execute(insert(Expense), rows)
+    await expense_rollup.apply_deltas(session, expense_rollup.build_deltas((row, 1) for row in rows))
+
+
+def new_job(user_id: int, fmt: str, size: int) -> Dict[str, Any]:
+    return {
+        'job_id': uuid.uuid4().hex,
+        'user_id': user_id,
+        'status': 'queued',
+        'format': fmt,
+        'bytes': size,
+        'rows': 0,
+        'inserted': 0,
+        'failed': 0,
+        'errors': [],
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'finished_at': None,
+    }
+
+
+async def run_import(job: Dict[str, Any], file: BinaryIO) -> Dict[str, Any]:
+    """Validate and insert the upload in batches, recording progress on ``job``.
+
+    Each batch is committed on its own, so memory use is bounded by the
+    batch size and a failure part-way leaves earlier batches imported.
+    Only the first ``EXPENSE_IMPORT_MAX_ERRORS`` row errors are kept.
+    """
+    batch_size = settings.EXPENSE_IMPORT_BATCH_SIZE
+    max_errors = settings.EXPENSE_IMPORT_MAX_ERRORS
+    now = datetime.datetime.utcnow()
+    job['status'] = 'running'
+    await cache_import_job(job)
+
+    def fail(number: int, error: Exception):
+        job['failed'] += 1
+        if len(job['errors']) < max_errors:
+            job['errors'].append({'row': number, 'error': str(error)})
+
+    try:
+        async with AsyncSessionLocal() as session:
+            batch: List[Dict[str, Any]] = []
+            for number, record in iter_records(file, job['format']):
+                job['rows'] += 1
+                if isinstance(record, Exception):
+                    fail(number, record)
+                    continue
+                try:
+                    batch.append(validate_row(record, job['user_id'], now))
+                except ValueError as e:
+                    fail(number, e)
+                    continue
+                if len(batch) >= batch_size:
+                    await insert_batch(session, batch)
+                    await session.commit()
+                    job['inserted'] += len(batch)
+                    batch = []
+                    await cache_import_job(job)
+            if batch:
+                await insert_batch(session, batch)
+                await session.commit()
+                job['inserted'] += len(batch)
+        job['status'] = 'completed'
+    except Exception as e:
+        logger.error(f"Expense import {job['job_id']} failed: {e}")
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    finally:
+        file.close()
+        if job['inserted']:
+            await invalidate_finance_cache(job['user_id'])
+        job['finished_at'] = datetime.datetime.utcnow().isoformat()
+        await cache_import_job(job)
+    return job
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import select
+
+from app.core.cache import invalidate_finance_cache
+from app.core.config import get_settings
+from app.db.models import AsyncSessionLocal, Expense, ExpenseMonthlyRollup
+from app.services import expense_rollup
+
+settings = get_settings()
+
+
+async def repair_expense_rollups(user_ids: Optional[List[int]] = None, batch_size: int = None) -> Dict[str, Any]:
+    """Backfill or repair ``expense_monthly_rollup`` from ``expenses``.
+
+    Users are rebuilt ``batch_size`` at a time, each batch in its own
+    transaction, so a full backfill never holds one long lock. Without
+    ``user_ids`` every user with expenses or rollup rows is rebuilt.
+    """
+    batch_size = batch_size or settings.EXPENSE_ROLLUP_REPAIR_BATCH_SIZE
+    started = time.perf_counter()
+    report = {'users': 0, 'rows': 0, 'failed_batches': 0}
+
+    if user_ids is None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Expense.user_id).union(select(ExpenseMonthlyRollup.user_id))
+            )
+            user_ids = sorted(result.scalars().all())
+
+    for offset in range(0, len(user_ids), batch_size):
+        batch = user_ids[offset:offset + batch_size]
+        try:
+            async with AsyncSessionLocal() as session:
+                report['rows'] += await expense_rollup.rebuild(session, batch)
+                await session.commit()
+            report['users'] += len(batch)
+            for user_id in batch:
+                await invalidate_finance_cache(user_id)
+        except Exception as e:
+            report['failed_batches'] += 1
+            logger.error(f"Expense rollup repair failed for users {batch[0]}..{batch[-1]}: {e}")
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"Expense rollup repair: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    # python -m app.tasks.expense_rollup
+    asyncio.run(repair_expense_rollups())
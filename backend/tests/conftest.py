@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.models import Base
+
+
+@pytest.fixture
+def run_with_db():
+    """Run ``body(sessions)`` on a fresh in-memory SQLite schema and return its result."""
+    def run(body):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            try:
+                return await body(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
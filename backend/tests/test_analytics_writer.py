@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.db.models import ChatbotAnalytics, ChatbotDailyStats
+from app.tasks import analytics
+from app.tasks.analytics import AnalyticsWriter, build_rollups
+
+
+def test_analytics_writer_batches_and_drops_when_full():
+    async def run():
+        writer = AnalyticsWriter()
+        writer.batch_size = 2
+        writer._queue = asyncio.Queue(maxsize=3)
+        batches = []
+
+        async def fake_write(batch):
+            batches.append(list(batch))
+
+        writer._write = fake_write
+        results = [writer.enqueue({'id': str(i)}) for i in range(4)]
+        await writer.stop()
+        return writer, results, batches
+
+    writer, results, batches = asyncio.run(run())
+
+    assert results == [True, True, True, False]
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert writer.stats()['dropped'] == 1
+
+
+def test_build_rollups_folds_rows_per_day_and_language():
+    created_at = datetime(2024, 1, 1, 12, 0)
+    batch = [
+        ({'created_at': created_at, 'intent': 'loan_advice', 'confidence': 0.8,
+          'sentiment': 'positive', 'response_time': 1.0},
+         {'language': 'en'}),
+        ({'created_at': created_at, 'intent': 'loan_advice', 'confidence': 0.6,
+          'sentiment': 'neutral', 'response_time': None},
+         {'language': 'en'}),
+    ]
+
+    stats, intents = build_rollups(batch)
+
+    assert len(stats) == 1
+    assert 'conversations' not in stats[0] and stats[0]['responses'] == 2
+    assert stats[0]['response_time_count'] == 1
+    assert stats[0]['positive'] == 1 and stats[0]['neutral'] == 1
+    assert intents == [{'day': created_at.date(), 'intent': 'loan_advice', 'count': 2, 'confidence_sum': 1.4}]
+
+
+def test_analytics_writer_retries_failed_batches(run_with_db, monkeypatch):
+    row = {'id': '1', 'conversation_id': 'c', 'message_id': 'm',
+           'created_at': datetime(2024, 1, 1), 'response_time': 0.5}
+
+    async def body(sessions):
+        attempts = []
+
+        def flaky_sessions():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("database unavailable")
+            return sessions()
+
+        monkeypatch.setattr(analytics, "AsyncSessionLocal", flaky_sessions)
+        writer = AnalyticsWriter()
+        writer.retries, writer.retry_backoff = 2, 0
+        await writer._write([(row, {'language': 'en'})])
+
+        given_up = AnalyticsWriter()
+        given_up.retries, given_up.retry_backoff = 0, 0
+        attempts.clear()
+        await given_up._write([({**row, 'id': '2'}, {'language': 'en'})])
+
+        async with sessions() as session:
+            written = (await session.execute(select(ChatbotAnalytics.id))).scalars().all()
+            responses = (await session.execute(select(ChatbotDailyStats.responses))).scalars().all()
+        return writer.stats(), given_up.stats(), written, responses
+
+    stats, given_up, written, responses = run_with_db(body)
+
+    assert stats['retries'] == 2 and stats['written'] == 1 and stats['failed'] == 0
+    assert given_up['failed'] == 1 and given_up['written'] == 0
+    assert written == ['1'] and responses == [1]
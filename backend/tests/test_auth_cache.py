@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import CacheManager
+from app.services import auth
+
+
+@pytest.fixture(autouse=True)
+def fresh_auth_state(monkeypatch):
+    """Give each test its own id cache, deny list and cache tier."""
+    monkeypatch.setattr(auth, "_user_ids", auth.LocalCache(100, 100))
+    monkeypatch.setattr(auth, "revoked_users", auth.RevokedUsers())
+    monkeypatch.setattr(auth, "cache_manager", CacheManager())
+
+
+class FakeResult:
+    def scalar(self):
+        return 42
+
+
+class FakeSession:
+    queries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        FakeSession.queries += 1
+        return FakeResult()
+
+
+def test_resolve_user_id_uses_token_claim_and_cache(monkeypatch):
+    monkeypatch.setattr(auth, "AsyncSessionLocal", FakeSession)
+    token = auth.create_access_token({"sub": "a@example.com", "user_id": 7}, auth.timedelta(minutes=5))
+    payload = auth.decode_access_token(token)
+
+    assert asyncio.run(auth.resolve_user_id(payload)) == 7
+    assert asyncio.run(auth.resolve_user_id({"sub": "b@example.com"})) == 42
+    assert asyncio.run(auth.resolve_user_id({"sub": "b@example.com"})) == 42
+    assert FakeSession.queries == 1
+
+    auth.invalidate_user_cache("b@example.com")
+    assert asyncio.run(auth.resolve_user_id({"sub": "b@example.com"})) == 42
+    assert FakeSession.queries == 2
+
+    # A deleted user's tokens stop resolving
+    auth.invalidate_user_cache("a@example.com", 7)
+    assert asyncio.run(auth.resolve_user_id(payload)) is None
+
+
+def test_revoked_user_survives_id_cache_evictions(monkeypatch):
+    monkeypatch.setattr(auth, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(auth, "_user_ids", auth.LocalCache(2, 2))
+
+    auth.invalidate_user_cache("gone@example.com", 9)
+    for i in range(10):
+        asyncio.run(auth.resolve_user_id({"sub": f"user{i}@example.com"}))
+
+    assert asyncio.run(auth.resolve_user_id({"sub": "gone@example.com", "user_id": 9})) is None
+
+
+class CountingRedisCache:
+    """Stands in for ``cache_manager`` with Redis configured."""
+
+    redis_client = object()
+
+    def __init__(self):
+        self.keys = set()
+        self.exists_calls = 0
+
+    async def exists(self, key):
+        self.exists_calls += 1
+        return key in self.keys
+
+
+def test_not_revoked_answers_are_reused_briefly(monkeypatch):
+    cache = CountingRedisCache()
+    monkeypatch.setattr(auth, "cache_manager", cache)
+    revoked = auth.RevokedUsers()
+
+    async def run():
+        for _ in range(5):
+            assert not await revoked.contains(3)
+        assert cache.exists_calls == 1
+
+        # Another worker revoked the user; seen once the negative entry expires
+        cache.keys.add("revoked_user:3")
+        revoked._not_revoked.clear()
+        assert await revoked.contains(3)
+        assert cache.exists_calls == 2
+
+    asyncio.run(run())
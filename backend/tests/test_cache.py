@@ -0,0 +1,51 @@
+import asyncio
+
+from app.core.cache import _MISSING, CacheManager, LocalCache
+
+
+def test_local_cache_evicts_least_recently_used_within_bounds():
+    cache = LocalCache(max_entries=2, max_bytes=100)
+    cache.set("a", 1, ttl=60, size=10)
+    cache.set("b", 2, ttl=60, size=10)
+    cache.get("a")
+    cache.set("c", 3, ttl=60, size=10)
+
+    assert cache.get("b") is _MISSING
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+    assert cache.current_bytes == 20
+
+
+def test_local_cache_expires_entries():
+    cache = LocalCache(max_entries=10, max_bytes=100)
+    cache.set("a", 1, ttl=0, size=10)
+
+    assert cache.get("a") is _MISSING
+    assert cache.current_bytes == 0
+
+
+def test_cache_manager_falls_back_to_memory_without_redis():
+    manager = CacheManager()
+    manager.redis_client = None
+
+    async def run():
+        assert await manager.set("knowledge_base:en", {"kb-1": {"title": "Budget"}})
+        assert await manager.get("knowledge_base:en") == {"kb-1": {"title": "Budget"}}
+        await manager.delete("knowledge_base:en")
+        return await manager.get("knowledge_base:en")
+
+    assert asyncio.run(run()) is None
+
+
+def test_cache_manager_capped_list_only_appends_to_cached_lists():
+    manager = CacheManager()
+    manager.redis_client = None
+
+    async def run():
+        assert not await manager.list_append("window", [1], max_len=3)
+        assert await manager.list_tail("window", 3) is None
+        await manager.list_replace("window", [1, 2], max_len=3)
+        await manager.list_append("window", [3, 4], max_len=3)
+        return await manager.list_tail("window", 2), await manager.list_tail("window", 10)
+
+    assert asyncio.run(run()) == ([3, 4], [2, 3, 4])
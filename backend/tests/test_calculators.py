@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.services import calculators
+
+
+def test_loan_schedule_matches_standard_amortisation():
+    result = calculators.calculate_loan({'principal': 100000.0, 'annual_rate': 12.0, 'term_months': 360})
+
+    assert result['monthly_payment'] == 1028.61
+    schedule = result['schedule']
+    assert len(schedule) == 360
+    assert schedule[0]['interest'] == 1000.0 and schedule[-1]['balance'] == 0.0
+    assert sum(row['principal'] for row in schedule) == pytest.approx(100000, abs=0.5)
+
+    zero = calculators.calculate_loan({'principal': 1200.0, 'annual_rate': 0.0, 'term_months': 12})
+    assert zero['monthly_payment'] == 100.0 and zero['total_interest'] == 0.0
+
+
+def test_savings_projection_and_target():
+    params = {'initial_deposit': 1000.0, 'monthly_contribution': 100.0, 'annual_rate': 6.0, 'term_months': 24}
+    schedule = calculators.savings_schedule(**params)
+
+    # Month-by-month compounding agrees with the closed form
+    balance = 1000.0
+    for _ in range(24):
+        balance = balance * 1.005 + 100
+    assert schedule['balance'][-1] == pytest.approx(balance)
+
+    months = calculators.months_to_target(1000.0, 100.0, 6.0, float(schedule['balance'][11]))
+    assert months == 12
+    assert calculators.months_to_target(0.0, 0.0, 5.0, 100.0) is None
+
+
+def test_scenario_grid_is_one_broadcast_and_canonical():
+    params = calculators.canonicalize({
+        'principal': 50000.0, 'annual_rate': 10.0, 'term_months': 60,
+        'scenarios': {'annual_rates': [12.0, 0.0, 8.0, 8.0], 'terms_months': [60, 12]},
+    })
+    assert params['scenarios'] == {'annual_rates': [0.0, 8.0, 12.0], 'terms_months': [12, 60]}
+
+    grid = calculators.loan_scenarios(params['principal'], params['scenarios'])
+    assert np.array(grid['payment']).shape == (3, 2)
+    for i, rate in enumerate(grid['annual_rates']):
+        for j, term in enumerate(grid['terms_months']):
+            single = calculators.amortisation_schedule(50000.0, rate, term)
+            assert grid['payment'][i][j] == round(float(single['payment'][0]), 2)
+
+    with pytest.raises(ValueError):
+        calculators.validate_limits({'term_months': 10 ** 6, 'scenarios': None})
+
+
+def test_overflowing_inputs_are_rejected_not_serialised():
+    with pytest.raises(ValueError):
+        calculators.calculate_savings({
+            'initial_deposit': 1e300, 'monthly_contribution': 0.0, 'annual_rate': 1000.0, 'term_months': 600,
+            'include_schedule': False, 'scenarios': None,
+        })
+    with pytest.raises(ValueError):
+        calculators.validate_limits({'term_months': 12, 'scenarios': {'annual_rates': [1e7], 'terms_months': [600]}})
@@ -0,0 +1,89 @@
+import datetime
+
+from sqlalchemy import select
+
+from app.db.models import ChatbotAnalytics, ChatbotDailyIntent, ChatbotDailyStats, ChatMessage, Conversation
+from app.db.upsert import upsert_increments
+from app.services.chatbot import chatbot_service
+from app.tasks.analytics import build_rollups
+
+DAY = datetime.datetime(2024, 3, 1, 9, 0)
+
+
+def _analytics(id, conversation_id, intent, sentiment, response_time, created_at=DAY):
+    return {
+        'id': id, 'conversation_id': conversation_id, 'message_id': f"m-{id}",
+        'intent': intent, 'confidence': 0.8, 'entities': None, 'sentiment': sentiment,
+        'response_time': response_time, 'created_at': created_at,
+    }
+
+
+async def _seed(session):
+    session.add_all([
+        Conversation(id="c1", user_id=1, language="en", created_at=DAY),
+        Conversation(id="c2", user_id=2, language="sw", created_at=DAY),
+        ChatMessage(id="u1", conversation_id="c1", role="user", content="hi", timestamp=DAY),
+        ChatMessage(id="a1", conversation_id="c1", role="assistant", content="hello", timestamp=DAY),
+        ChatMessage(id="u2", conversation_id="c2", role="user", content="habari", timestamp=DAY),
+        ChatMessage(id="a2", conversation_id="c2", role="assistant", content="nzuri", timestamp=DAY),
+    ])
+    rows = [
+        (_analytics("1", "c1", "budgeting", "positive", 1.0), {'language': 'en'}),
+        (_analytics("2", "c2", "savings", "neutral", 3.0), {'language': 'sw'}),
+        (_analytics("3", "c2", "savings", "neutral", 2.0, DAY + datetime.timedelta(days=40)), {'language': 'sw'}),
+    ]
+    session.add_all([ChatbotAnalytics(**row) for row, _ in rows])
+    stats, intents = build_rollups(rows)
+    await upsert_increments(session, ChatbotDailyStats, [
+        {'day': DAY.date(), 'language': 'en', 'conversations': 1, 'messages': 2},
+        {'day': DAY.date(), 'language': 'sw', 'conversations': 1, 'messages': 2},
+    ], ['day', 'language'])
+    await upsert_increments(session, ChatbotDailyStats, stats, ['day', 'language'])
+    await upsert_increments(session, ChatbotDailyIntent, intents, ['day', 'intent'])
+    await session.commit()
+
+
+def test_rollup_and_user_analytics_on_sqlite(run_with_db):
+    async def body(sessions):
+        async with sessions() as session:
+            await _seed(session)
+            everything = await chatbot_service.get_analytics(session)
+            march = await chatbot_service.get_analytics(session, end_date=datetime.datetime(2024, 3, 31))
+            user = await chatbot_service.get_analytics(session, user_id=2)
+        return everything, march, user
+
+    everything, march, user = run_with_db(body)
+
+    assert everything['total_conversations'] == 2 and everything['total_messages'] == 4
+    assert everything['average_response_time'] == 2.0
+    assert everything['language_distribution'] == {'en': 1, 'sw': 1}
+    assert everything['top_intents'] == [{'intent': 'savings', 'count': 2}, {'intent': 'budgeting', 'count': 1}]
+    assert everything['sentiment_distribution'] == {'positive': 1, 'negative': 0, 'neutral': 2}
+
+    # The April row falls outside the window
+    assert march['sentiment_distribution']['neutral'] == 1
+    assert march['average_response_time'] == 2.0
+
+    assert user['total_conversations'] == 1 and user['total_messages'] == 2
+    assert user['average_response_time'] == 2.5
+    assert user['language_distribution'] == {'sw': 1}
+    assert user['top_intents'] == [{'intent': 'savings', 'count': 2}]
+
+
+def test_upsert_increments_falls_back_to_update_then_insert(run_with_db):
+    row = {'day': DAY.date(), 'language': 'en', 'conversations': 1, 'messages': 2}
+
+    async def body(sessions):
+        async with sessions() as session:
+            # Any dialect without ON CONFLICT takes the generic path
+            session.bind.dialect.name = 'generic'
+            await upsert_increments(session, ChatbotDailyStats, [row], ['day', 'language'])
+            await upsert_increments(session, ChatbotDailyStats, [row, {**row, 'language': 'sw'}], ['day', 'language'])
+            await session.commit()
+            result = await session.execute(
+                select(ChatbotDailyStats.language, ChatbotDailyStats.conversations, ChatbotDailyStats.messages)
+                .order_by(ChatbotDailyStats.language)
+            )
+            return [tuple(r) for r in result.all()]
+
+    assert run_with_db(body) == [('en', 2, 4), ('sw', 1, 2)]
@@ -0,0 +1,226 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db.models import ChatMessage, ChatbotDailyStats, Conversation
+from app.schemas.chatbot import ChatRequest, Language
+from app.services import chatbot
+from app.services.chatbot import chatbot_service
+from app.services.llm import llm_client_manager
+from app.services.response_cache import response_cache
+
+
+class FakeStream:
+    def __init__(self, tokens, stall_after=None):
+        self.tokens = tokens
+        self.stall_after = stall_after
+        self.closed = False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for index, token in enumerate(self.tokens):
+            if index == self.stall_after:
+                await asyncio.Event().wait()
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeLLMClient:
+    """Stands in for ``openai.AsyncOpenAI``; replies with fixed tokens."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.stall_after = None
+        self.streams = []
+        self.calls = []
+        self.analytics = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, stream=False, **params):
+        self.calls.append({**params, 'stream': stream})
+        if stream:
+            self.streams.append(FakeStream(self.tokens, self.stall_after))
+            return self.streams[-1]
+        message = SimpleNamespace(content="".join(self.tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    client = FakeLLMClient(["Save ", "a ", "little ", "every ", "week."])
+    llm_client_manager._lazy_client.set(client)
+    # Exact-match caching only; analytics rows are captured instead of written
+    monkeypatch.setattr(response_cache, "similarity_threshold", 1.0)
+    monkeypatch.setattr(response_cache, "enabled", True)
+    monkeypatch.setattr(chatbot.analytics_writer, "enqueue", lambda row, rollup=None: client.analytics.append(row) or True)
+    yield client
+    llm_client_manager._lazy_client.reset()
+
+
+class CommitCounter:
+    def __init__(self, session):
+        self.count = 0
+        original = session.commit
+
+        async def commit():
+            self.count += 1
+            await original()
+        session.commit = commit
+
+
+async def _row_counts(session):
+    conversations = (await session.execute(select(func.count()).select_from(Conversation))).scalar()
+    messages = (await session.execute(select(func.count()).select_from(ChatMessage))).scalar()
+    return conversations, messages
+
+
+def test_stream_yields_token_events_then_one_commit(llm, run_with_db):
+    question = f"How do I start saving? {uuid.uuid4()}"
+
+    async def body(sessions):
+        async with sessions() as session:
+            commits = CommitCounter(session)
+            events = [event async for event in chatbot_service.process_message_stream(
+                session, ChatRequest(message=question, language=Language.ENGLISH)
+            )]
+            return events, commits.count, await _row_counts(session)
+
+    events, commits, (conversations, messages) = run_with_db(body)
+
+    assert [event['token'] for event in events[:-1]] == llm.tokens
+    assert [event['index'] for event in events[:-1]] == list(range(len(llm.tokens)))
+    assert events[-1]['status'] == 'complete'
+    assert events[-1]['response']['message'] == "".join(llm.tokens)
+    assert llm.calls[0]['stream'] is True
+    # Conversation, user message and reply are written together
+    assert commits == 1
+    assert (conversations, messages) == (1, 2)
+
+
+def test_stalled_stream_is_cut_off_at_the_response_timeout(llm, run_with_db, monkeypatch):
+    monkeypatch.setattr(chatbot.settings, "CHATBOT_RESPONSE_TIMEOUT", 0.2)
+    llm.stall_after = 2
+
+    async def body(sessions):
+        async with sessions() as session:
+            return [event async for event in chatbot_service.process_message_stream(
+                session, ChatRequest(message=f"Stall {uuid.uuid4()}", language=Language.ENGLISH)
+            )]
+
+    events = run_with_db(body)
+
+    # The tokens that arrived are kept and the stream is closed
+    assert [event['token'] for event in events[:-1]] == llm.tokens[:2]
+    assert events[-1]['response']['message'] == "".join(llm.tokens[:2])
+    assert llm.streams[0].closed
+    assert llm_client_manager.metrics()['in_flight'] == 0
+
+
+def test_repeated_first_turn_is_answered_from_the_cache(llm, run_with_db):
+    question = f"What is a budget? {uuid.uuid4()}"
+
+    async def body(sessions):
+        responses, commits = [], []
+        async with sessions() as session:
+            for _ in range(2):
+                counter = CommitCounter(session)
+                responses.append(await chatbot_service.process_message(
+                    session, ChatRequest(message=question, language=Language.ENGLISH)
+                ))
+                commits.append(counter.count)
+            stats = (await session.execute(
+                select(ChatbotDailyStats.conversations, ChatbotDailyStats.messages)
+            )).all()
+            return responses, commits, await _row_counts(session), stats
+
+    (first, second), commits, (conversations, messages), stats = run_with_db(body)
+
+    assert len(llm.calls) == 1
+    assert first.metadata['cached'] is False
+    assert second.metadata['cached'] is True and second.metadata['cache_match'] == 'exact'
+    assert second.message == first.message
+    assert commits == [1, 1]
+    assert (conversations, messages) == (2, 4)
+    # Daily counters are committed with the turns; analytics carry the measured latency
+    assert [tuple(row) for row in stats] == [(2, 4)]
+    assert all(row['response_time'] > 0 for row in llm.analytics)
+
+
+def test_unknown_or_foreign_conversation_is_rejected_before_the_llm_call(llm, run_with_db):
+    async def body(sessions):
+        async with sessions() as session:
+            session.add(Conversation(id="owned", user_id=1, language="en"))
+            await session.commit()
+            errors = []
+            for conversation_id, user_id in [("missing", 1), ("owned", 2), ("owned", None)]:
+                try:
+                    await chatbot_service.process_message(session, ChatRequest(
+                        message="hello", conversation_id=conversation_id, language=Language.ENGLISH
+                    ), user_id)
+                except chatbot.ConversationNotFound:
+                    errors.append(conversation_id)
+            return errors, await _row_counts(session)
+
+    errors, counts = run_with_db(body)
+
+    assert errors == ["missing", "owned", "owned"]
+    assert llm.calls == []
+    assert counts == (1, 0)
+
+
+def test_no_free_llm_slot_returns_the_busy_message(llm, run_with_db, monkeypatch):
+    monkeypatch.setattr(llm_client_manager, "queue_timeout", 0.05)
+    monkeypatch.setattr(llm_client_manager, "_global_slots", asyncio.Semaphore(0))
+
+    async def body(sessions):
+        async with sessions() as session:
+            return await chatbot_service.process_message(
+                session, ChatRequest(message=f"Busy {uuid.uuid4()}", language=Language.ENGLISH)
+            )
+
+    response = run_with_db(body)
+
+    assert llm.calls == []
+    assert "longer than expected" in response.message
+    assert response.metadata['cached'] is False
+
+
+def test_stream_endpoint_frames_events_as_sse(llm):
+    import json
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.db.models import Base
+    from app.db.session import get_db
+    from app.main import app
+
+    async def test_db():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            yield session
+        await engine.dispose()
+
+    app.dependency_overrides[get_db] = test_db
+    try:
+        response = TestClient(app).post(
+            "/chatbot/chat/stream", json={"message": f"Tips for saving? {uuid.uuid4()}", "language": "en"}
+        )
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert all(frame.startswith("data: ") for frame in frames)
+    events = [json.loads(frame[len("data: "):]) for frame in frames]
+    assert "".join(event['token'] for event in events if 'token' in event) == "".join(llm.tokens)
+    assert events[-1]['status'] == 'complete'
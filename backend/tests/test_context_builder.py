@@ -0,0 +1,52 @@
+from app.services.context_builder import ContextBuilder, TokenCounter
+
+
+class WordCounter(TokenCounter):
+    """One token per word, so budgets are easy to reason about."""
+
+    def __init__(self):
+        super().__init__("test")
+
+    def count(self, text):
+        return len(text.split()) if text else 0
+
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max_tokens])
+
+
+def test_context_builder_fills_budget_by_priority():
+    builder = ContextBuilder(WordCounter(), budget=160, knowledge_max_tokens=90)
+    history = [
+        {'role': 'user', 'content': 'old ' * 40},
+        {'role': 'assistant', 'content': 'recent ' * 20},
+    ]
+
+    built = builder.build("system prompt", "my question", ['kb ' * 40, 'kb2 ' * 50], history)
+    tokens = built['tokens']
+
+    assert [m['role'] for m in built['messages']] == ['system', 'user', 'assistant', 'system', 'user']
+    assert tokens['knowledge_items_used'] == 2 and tokens['knowledge_items_truncated'] == 1
+    assert tokens['knowledge'] <= 90
+    assert tokens['history_messages_used'] == 2 and tokens['history_messages_dropped'] == 0
+    assert built['messages'][1]['content'].split() != history[0]['content'].split()
+    assert tokens['total'] <= tokens['budget']
+
+
+def test_token_counter_loads_encoding_off_the_event_loop():
+    import asyncio
+    import threading
+
+    loaded_in = []
+
+    class RecordingCounter(TokenCounter):
+        def _load_encoding(self):
+            loaded_in.append(threading.current_thread())
+            return None
+
+    counter = RecordingCounter("test", name="tokenizer:recording")
+    asyncio.run(counter.load())
+    asyncio.run(counter.load())
+
+    assert len(loaded_in) == 1 and loaded_in[0] is not threading.main_thread()
+    # Estimated at four characters per token without an encoding
+    assert counter.count("abcdefgh") == 2
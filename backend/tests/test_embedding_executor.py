@@ -0,0 +1,26 @@
+import asyncio
+
+import numpy as np
+
+from app.services.embedding_executor import EmbeddingBatcher
+
+
+def test_embedding_batcher_coalesces_concurrent_requests():
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts])
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        futures = [asyncio.wrap_future(batcher.submit([text])) for text in ["a", "bb", "ccc"]]
+        return await asyncio.gather(*futures)
+
+    results = asyncio.run(run())
+    batcher.close()
+
+    assert calls == [["a", "bb", "ccc"]]
+    assert [float(result[0][0]) for result in results] == [1.0, 2.0, 3.0]
+    assert batcher.stats()["batches"] == 1
@@ -0,0 +1,103 @@
+import datetime
+import io
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.cache import get_finance_cache_version
+from app.db.models import Expense, ExpenseMonthlyRollup
+from app.tasks import expense_import
+from app.tasks.expense_import import detect_format, iter_records, new_job, run_import, validate_row
+
+
+def test_iter_records_and_validate_row():
+    upload = io.BytesIO('﻿Amount,Category,Description,Date\n12.6,food,"a, b",05/01/2024\nx,food,,2024-01-05\n'.encode())
+    records = list(iter_records(upload, 'csv'))
+    assert [number for number, _ in records] == [2, 3]
+
+    now = datetime.datetime(2024, 2, 1)
+    row = validate_row(records[0][1], 7, now)
+    assert row == {
+        'user_id': 7, 'amount': 13, 'category': 'food', 'description': 'a, b',
+        'date': datetime.datetime(2024, 1, 5), 'created_at': now,
+    }
+    with pytest.raises(ValueError):
+        validate_row(records[1][1], 7, now)
+
+    lines = list(iter_records(io.BytesIO(b'{"amount": 1, "category": "c", "date": "2024-01-01"}\n\n{bad\n'), 'ndjson'))
+    assert lines[0][1]['amount'] == 1
+    assert isinstance(lines[1][1], ValueError) and lines[1][0] == 3
+
+    assert detect_format("text/csv; charset=utf-8") == 'csv'
+    assert detect_format("application/x-ndjson") == 'ndjson'
+    assert detect_format("text/plain") is None
+
+
+async def _table(session):
+    expenses = (await session.execute(select(func.count(), func.sum(Expense.amount)).select_from(Expense))).one()
+    rollup = (await session.execute(
+        select(ExpenseMonthlyRollup.month, ExpenseMonthlyRollup.category,
+               ExpenseMonthlyRollup.total, ExpenseMonthlyRollup.count)
+        .order_by(ExpenseMonthlyRollup.month)
+    )).all()
+    return tuple(expenses), [tuple(row) for row in rollup]
+
+
+def test_run_import_inserts_batches_and_refreshes_the_rollup(run_with_db, monkeypatch):
+    monkeypatch.setattr(expense_import.settings, "EXPENSE_IMPORT_BATCH_SIZE", 2)
+    upload = io.BytesIO(
+        b"amount,category,description,date\n"
+        b"10,food,,2024-01-05\n"
+        b"x,food,,2024-01-06\n"
+        b"20,food,,2024-01-20\n"
+        b"7,rent,,2024-02-01\n"
+    )
+
+    async def body(sessions):
+        monkeypatch.setattr(expense_import, "AsyncSessionLocal", sessions)
+        version = await get_finance_cache_version(41)
+        job = await run_import(new_job(41, 'csv', 0), upload)
+        async with sessions() as session:
+            return job, await _table(session), version != await get_finance_cache_version(41)
+
+    job, (expenses, rollup), invalidated = run_with_db(body)
+
+    assert job['status'] == 'completed'
+    assert (job['rows'], job['inserted'], job['failed']) == (4, 3, 1)
+    assert job['errors'][0]['row'] == 3
+    assert expenses == (3, 37)
+    assert rollup == [('2024-01', 'food', 30, 2), ('2024-02', 'rent', 7, 1)]
+    assert invalidated
+
+
+def test_failed_batch_keeps_earlier_batches_and_their_rollup(run_with_db, monkeypatch):
+    monkeypatch.setattr(expense_import.settings, "EXPENSE_IMPORT_BATCH_SIZE", 1)
+    original_insert = expense_import.insert_batch
+    calls = []
+
+    async def flaky_insert(session, rows):
+        calls.append(rows)
+        await original_insert(session, rows)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(expense_import, "insert_batch", flaky_insert)
+    upload = io.BytesIO(
+        b'{"amount": 10, "category": "food", "date": "2024-01-05"}\n'
+        b'{"amount": 20, "category": "food", "date": "2024-01-06"}\n'
+        b'{"amount": 30, "category": "food", "date": "2024-01-07"}\n'
+    )
+
+    async def body(sessions):
+        monkeypatch.setattr(expense_import, "AsyncSessionLocal", sessions)
+        job = await run_import(new_job(42, 'ndjson', 0), upload)
+        async with sessions() as session:
+            return job, await _table(session)
+
+    job, (expenses, rollup) = run_with_db(body)
+
+    assert job['status'] == 'failed' and job['error'] == "connection lost"
+    assert job['inserted'] == 1
+    # The second batch was rolled back together with its rollup increment
+    assert expenses == (1, 10)
+    assert rollup == [('2024-01', 'food', 10, 1)]
@@ -0,0 +1,46 @@
+from sqlalchemy import select
+
+from app.db.models import ExpenseMonthlyRollup
+from app.services import expense_rollup, finance
+
+
+async def _rollup(session):
+    result = await session.execute(
+        select(ExpenseMonthlyRollup.month, ExpenseMonthlyRollup.category,
+               ExpenseMonthlyRollup.total, ExpenseMonthlyRollup.count)
+        .order_by(ExpenseMonthlyRollup.month, ExpenseMonthlyRollup.category)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def _run(sessions):
+    async with sessions() as session:
+        first = await finance.create_expense(session, 1, {
+            'amount': 100.4, 'category': "food", 'description': None, 'date': "2024-01-05"
+        })
+        await finance.create_expense(session, 1, {
+            'amount': 50, 'category': "food", 'description': None, 'date': "2024-01-20"
+        })
+        second = await finance.create_expense(session, 1, {
+            'amount': 70, 'category': "rent", 'description': None, 'date': "2024-02-01"
+        })
+        # Moves 100 from January food to February transport
+        await finance.update_expense(session, 1, first.id, {
+            'amount': 80, 'category': "transport", 'description': None, 'date': "2024-02-03"
+        })
+        await finance.delete_expense(session, 1, second.id)
+        maintained = await _rollup(session)
+
+        await expense_rollup.rebuild(session, [1])
+        await session.commit()
+        rebuilt = await _rollup(session)
+
+    return maintained, rebuilt
+
+
+def test_rollup_follows_writes_and_matches_rebuild(run_with_db):
+    maintained, rebuilt = run_with_db(_run)
+
+    # The emptied February rent group is removed rather than left at zero
+    assert maintained == [('2024-01', 'food', 50, 1), ('2024-02', 'transport', 80, 1)]
+    assert rebuilt == maintained
@@ -0,0 +1,61 @@
+import datetime
+
+from app.db.models import Budget, Expense, IncomeSource, SavingsGoal
+from app.services import expense_rollup, finance, finance_summary
+
+TODAY = datetime.date(2024, 3, 15)
+
+
+async def _run(sessions):
+    async with sessions() as session:
+        session.add_all([
+            Expense(user_id=1, amount=300, category="food", date=datetime.datetime(2024, 2, 10)),
+            Expense(user_id=1, amount=200, category="food", date=datetime.datetime(2024, 3, 2)),
+            Expense(user_id=1, amount=1000, category="rent", date=datetime.datetime(2024, 3, 1)),
+            Expense(user_id=1, amount=50, category="food", date=datetime.datetime(2023, 12, 31)),
+            # Future-dated: after the current week and month, but within the year
+            Expense(user_id=1, amount=900, category="food", date=datetime.datetime(2024, 6, 1)),
+            Expense(user_id=1, amount=70, category="rent", date=datetime.datetime(2024, 3, 18)),
+            Expense(user_id=1, amount=40, category="food", date=datetime.datetime(2025, 1, 5)),
+            Expense(user_id=2, amount=999, category="food", date=datetime.datetime(2024, 3, 2)),
+            Budget(user_id=1, amount=400, category="food", period="monthly"),
+            Budget(user_id=1, amount=5000, category="food", period="yearly"),
+            Budget(user_id=1, amount=100, category="rent", period="weekly"),
+            IncomeSource(user_id=1, name="salary", amount=2000, frequency="monthly"),
+            IncomeSource(user_id=1, name="gig", amount=120, frequency="Weekly"),
+            SavingsGoal(user_id=1, target_amount=6000, description="car", target_date=datetime.datetime(2024, 9, 1)),
+        ])
+        await session.commit()
+        await expense_rollup.rebuild(session)
+        await session.commit()
+
+        first = await finance_summary.get_summary(session, 1, months=3, today=TODAY)
+        await finance.create_expense(session, 1, {
+            'amount': 100, 'category': "food", 'description': None, 'date': datetime.datetime(2024, 3, 10)
+        })
+        second = await finance_summary.get_summary(session, 1, months=3, parts=['budgets'], today=TODAY)
+
+    return first, second
+
+
+def test_summary_aggregates_and_invalidates_on_write(run_with_db):
+    first, second = run_with_db(_run)
+
+    assert [(r['month'], r['category'], r['total']) for r in first['spending']] == [
+        ('2024-02', 'food', 300.0), ('2024-03', 'food', 200.0), ('2024-03', 'rent', 1070.0)
+    ]
+    # Monthly/yearly from the rollup; the weekly budget's week (2024-03-11 to 03-18) has no rent yet.
+    # June counts only toward the yearly budget, 2025 toward none
+    assert [(b['period'], b['spent']) for b in first['budgets']] == [
+        ('monthly', 200.0), ('yearly', 1400.0), ('weekly', 0.0)
+    ]
+
+    flow = first['cash_flow']
+    assert flow['monthly_income'] == 2000 + 120 * 52 / 12
+    assert [m['month'] for m in flow['months']] == ['2024-01', '2024-02', '2024-03']
+    goal = first['savings_goals'][0]
+    assert goal['months_remaining'] == 6 and goal['required_monthly'] == 1000
+    assert goal['on_track'] is True
+
+    # The new expense bumped the user's cache version
+    assert [b['spent'] for b in second['budgets']] == [300.0, 1500.0, 0.0]
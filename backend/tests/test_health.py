@@ -6,3 +6,19 @@ def test_health_check():
     client = TestClient(app)
     response = client.get("/health")
     assert response.status_code == 404  # No /health endpoint yet, placeholder
+
+
+def test_warmup_requires_admin_key():
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    client = TestClient(app)
+    original = settings.WARMUP_ENDPOINT_ENABLED, settings.ADMIN_API_KEY
+    try:
+        settings.WARMUP_ENDPOINT_ENABLED, settings.ADMIN_API_KEY = True, "secret"
+        assert client.post("/health/health/warmup?services=none").status_code == 403
+        response = client.post("/health/health/warmup?services=none", headers={"X-Admin-Key": "secret"})
+        assert response.status_code == 200
+        assert response.json()["services"] == {"none": {"status": "unknown"}}
+    finally:
+        settings.WARMUP_ENDPOINT_ENABLED, settings.ADMIN_API_KEY = original
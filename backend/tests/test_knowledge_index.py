@@ -0,0 +1,39 @@
+from app.services.knowledge_chunks import chunk_knowledge
+from app.services.knowledge_index import KnowledgeIndex, tokenize
+
+
+KNOWLEDGE = {
+    "kb-budget": {"title": "Monthly Budget Template", "content": "Budget for TSh 800,000 salary: rent, food, transport."},
+    "kb-savings": {"title": "Emergency Fund", "content": "Save 3-6 months of expenses in a savings account."},
+    "kb-tax": {"title": "PAYE Tax Rates", "content": "PAYE is deducted from salary by the employer."},
+}
+
+
+def test_tokenize_drops_stopwords_and_normalises_amounts():
+    assert tokenize("How do I make a budget on 800,000?") == ["make", "budget", "800000"]
+    assert tokenize("Je, ni bajeti gani nzuri?", "sw") == ["bajeti", "gani", "nzuri"]
+
+
+def test_search_ranks_best_match_first():
+    index = KnowledgeIndex(KNOWLEDGE)
+
+    hits = index.search("what are the PAYE tax rates on my salary")
+
+    assert hits[0][0] == "kb-tax"
+    assert "kb-savings" not in [item_id for item_id, _ in hits]
+
+
+def test_search_without_matches_returns_nothing():
+    assert KnowledgeIndex(KNOWLEDGE).search("hello there") == []
+
+
+def test_chunk_knowledge_splits_articles_into_overlapping_passages():
+    content = " ".join(f"Sentence number {i} is here." for i in range(10))
+    passages = chunk_knowledge({"kb-1": {"title": "Budget", "content": content}}, max_words=12, overlap_words=5)
+
+    assert list(passages) == [f"kb-1#{i}" for i in range(len(passages))]
+    first, second = passages["kb-1#0"]["content"], passages["kb-1#1"]["content"]
+    assert len(first.split()) <= 12
+    # The second passage starts with the last sentence of the first
+    assert second.startswith(first.split(". ")[-1].rstrip("."))
+    assert all(p["article_id"] == "kb-1" and p["title"] == "Budget" for p in passages.values())
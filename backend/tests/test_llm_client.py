@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm import LLMClientManager
+
+
+def _manager(max_concurrency=1, per_user=0, queue_timeout=0.05):
+    manager = LLMClientManager()
+    manager.apply_settings(SimpleNamespace(
+        OPENAI_MAX_CONCURRENCY=max_concurrency,
+        OPENAI_MAX_CONCURRENCY_PER_USER=per_user,
+        CHATBOT_RESPONSE_TIMEOUT=queue_timeout,
+    ))
+    return manager
+
+
+def test_global_slots_time_out_when_exhausted():
+    async def run():
+        manager = _manager(max_concurrency=1)
+        async with manager.acquire():
+            with pytest.raises(asyncio.TimeoutError):
+                async with manager.acquire():
+                    pass
+        # The slot is free again once the holder is done
+        async with manager.acquire():
+            pass
+        return manager.metrics()
+
+    metrics = asyncio.run(run())
+
+    assert metrics['requests'] == 2 and metrics['queue_timeouts'] == 1
+    assert metrics['in_flight'] == 0 and metrics['waiting'] == 0
+
+
+def test_per_user_slots_only_queue_the_same_user():
+    async def run():
+        manager = _manager(max_concurrency=5, per_user=1)
+        async with manager.acquire(1):
+            with pytest.raises(asyncio.TimeoutError):
+                async with manager.acquire(1):
+                    pass
+            async with manager.acquire(2):
+                assert manager.metrics()['active_users'] == 2
+        return manager.metrics()
+
+    metrics = asyncio.run(run())
+
+    assert metrics['queue_timeouts'] == 1 and metrics['requests'] == 2
+    assert metrics['active_users'] == 0
+
+
+def test_reload_rebuilds_the_global_semaphore():
+    async def run():
+        manager = _manager(max_concurrency=1)
+        async with manager.acquire():
+            manager.apply_settings(SimpleNamespace(
+                OPENAI_MAX_CONCURRENCY=2, OPENAI_MAX_CONCURRENCY_PER_USER=0, CHATBOT_RESPONSE_TIMEOUT=0.05
+            ))
+            async with manager.acquire(), manager.acquire():
+                assert manager.metrics()['in_flight'] == 3
+        # The first holder released the old semaphore, not the new one
+        for _ in range(2):
+            await asyncio.wait_for(manager._global_slots.acquire(), 0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(manager._global_slots.acquire(), 0.05)
+        return manager.metrics()
+
+    metrics = asyncio.run(run())
+
+    assert metrics['max_concurrency'] == 2
@@ -0,0 +1,52 @@
+import asyncio
+
+from app.services.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def test_password_hasher_round_trip_and_overload():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+
+    async def run():
+        hashed = await hasher.hash("correct horse")
+        assert await hasher.verify("correct horse", hashed)
+        assert not await hasher.verify("wrong", hashed)
+        assert not await hasher.verify("correct horse", "not-a-hash")
+        assert not hasher.needs_rehash(hashed)
+
+        # Only one call may be pending; the second is shed
+        results = await asyncio.gather(
+            hasher.hash("a"), hasher.hash("b"), return_exceptions=True
+        )
+        assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+
+    asyncio.run(run())
+    hasher.close()
+
+    stats = hasher.stats()
+    assert stats['hashes'] == 2
+    assert stats['verifications'] == 3
+    assert stats['rejected'] == 1
+    assert PasswordHasher(rounds=5).needs_rehash("$2b$04$abc")
+
+
+def test_login_rehash_upgrades_old_cost(run_with_db, monkeypatch):
+    from app.db.models import User
+    from app.services import auth
+
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(rounds=5, workers=1))
+
+    async def body(sessions):
+        old_hash = await PasswordHasher(rounds=4, workers=1).hash("correct horse")
+        async with sessions() as session:
+            user = User(email="a@example.com", hashed_password=old_hash)
+            session.add(user)
+            await session.commit()
+
+            assert not await auth.rehash_password_if_needed(session, user, "wrong")
+            assert user.hashed_password == old_hash
+
+            assert await auth.rehash_password_if_needed(session, user, "correct horse")
+            assert user.hashed_password.startswith("$2b$05$")
+            assert not await auth.rehash_password_if_needed(session, user, "correct horse")
+
+    run_with_db(body)
@@ -0,0 +1,13 @@
+from app.schemas.chatbot import Language
+from app.services.prompts import PromptRegistry
+
+
+def test_prompt_registry_keeps_old_versions_and_falls_back_to_current():
+    registry = PromptRegistry(
+        {(Language.ENGLISH, "v1"): "old", (Language.ENGLISH, "v2"): "new"},
+        {Language.ENGLISH: "v2"},
+    )
+
+    assert registry.current_id(Language.ENGLISH) == "system:en:v2"
+    assert registry.resolve("system:en:v1", Language.ENGLISH) == ("system:en:v1", "old")
+    assert registry.resolve(None, Language.ENGLISH) == ("system:en:v2", "new")
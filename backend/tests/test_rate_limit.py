@@ -0,0 +1,40 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit as rl
+
+
+def test_local_sliding_window_and_eviction():
+    assert rl.parse_quota("100/minute") == (100, 60)
+    assert rl.parse_quota("10/30s") == (10, 30)
+
+    limiter = rl.LocalRateLimiter(max_keys=2)
+    assert [limiter.hit("a", 2, 60, now=0)[0] for _ in range(3)] == [True, True, False]
+    # Halfway through the next window half of the previous count still applies
+    assert limiter.hit("a", 2, 60, now=90) == (True, 0, 30)
+    assert not limiter.hit("a", 2, 60, now=90)[0]
+
+    limiter.hit("b", 2, 60, now=91)
+    limiter.hit("c", 2, 60, now=92)
+    assert len(limiter) == 2
+    # Idle keys are dropped after two windows
+    limiter.hit("d", 2, 60, now=500)
+    assert len(limiter) == 1
+
+
+def test_rate_limit_dependency_sets_headers(monkeypatch):
+    monkeypatch.setattr(rl.settings, "RATE_LIMIT_BACKEND", "local")
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(rl.RateLimit("2/minute"))])
+    async def limited():
+        return {"ok": True}
+
+    client = TestClient(app)
+    first = client.get("/limited")
+    assert first.headers["X-RateLimit-Limit"] == "2"
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    client.get("/limited")
+    blocked = client.get("/limited")
+    assert blocked.status_code == 429
+    assert int(blocked.headers["Retry-After"]) >= 1
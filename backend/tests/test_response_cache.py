@@ -0,0 +1,43 @@
+import asyncio
+
+import numpy as np
+
+from app.services import response_cache as response_cache_module
+from app.services.response_cache import ResponseCache
+
+
+class SlowEmbeddings:
+    """Embeds only once ``ready`` is set, like a model still loading."""
+
+    available = True
+
+    def __init__(self):
+        self.ready = asyncio.Event()
+
+    async def embed(self, text):
+        await self.ready.wait()
+        return np.ones(4, dtype=np.float32)
+
+
+def test_set_does_not_wait_for_the_embedding_model(monkeypatch):
+    embeddings = None
+
+    async def run():
+        nonlocal embeddings
+        embeddings = SlowEmbeddings()
+        monkeypatch.setattr(response_cache_module, "semantic_search_service", embeddings)
+        cache = ResponseCache()
+        cache.enabled, cache.similarity_threshold = True, 0.9
+
+        # Returns with the exact entry stored while the model is still "loading"
+        await asyncio.wait_for(cache.set("chat_response:b:1", "how do I save", "b", {'response': "x"}), 1)
+        assert cache.stats()['stores'] == 1
+        assert cache.stats()['similarity_entries'] == 0
+
+        embeddings.ready.set()
+        await asyncio.gather(*cache._pending)
+        assert cache.stats()['similarity_entries'] == 1
+        match = await cache.get("chat_response:b:2", "how can I save", "b")
+        assert match['match'] == 'semantic'
+
+    asyncio.run(run())
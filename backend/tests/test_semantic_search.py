@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from app.services import semantic_search
+from app.services.semantic_search import semantic_search_service
+
+VOCABULARY = ["loan", "interest", "savings", "tax", "mpesa"]
+
+
+class FakeModel:
+    """Bag-of-words vectors over a tiny vocabulary; records the encoding threads."""
+
+    def __init__(self):
+        self.threads = []
+
+    def encode(self, texts, **kwargs):
+        self.threads.append(threading.current_thread())
+        return np.array([
+            [float(word in text.lower()) + 0.01 for word in VOCABULARY] for text in texts
+        ], dtype=np.float32)
+
+
+def test_find_similar_content_is_async_and_chunks_only_hits(monkeypatch, tmp_path):
+    monkeypatch.setattr(semantic_search.settings, "SEMANTIC_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(semantic_search_service, "indexes", {})
+    monkeypatch.setattr(semantic_search_service, "similarity_threshold", 0.5)
+    chunked = []
+    original_chunk = semantic_search.chunk_knowledge
+    monkeypatch.setattr(semantic_search, "chunk_knowledge", lambda items: chunked.append(set(items)) or original_chunk(items))
+    model = FakeModel()
+    semantic_search_service.model = model
+
+    items = [
+        {'id': 'a', 'title': "Loans", 'content': "Loan interest explained.", 'updated_at': "1"},
+        {'id': 'b', 'title': "Savings", 'content': "Savings with mpesa.", 'updated_at': "1"},
+    ]
+    try:
+        hits = asyncio.run(semantic_search_service.find_similar_content(
+            "what interest on a loan", items, top_k=1, namespace="test"
+        ))
+    finally:
+        semantic_search_service._model.reset()
+        semantic_search_service.batcher.close()
+
+    assert [hit['article_id'] for hit in hits] == ['a']
+    assert threading.main_thread() not in model.threads
+    # Index sync chunks the new articles once; the response only chunks the hit
+    assert chunked[-1] == {'a'}
@@ -0,0 +1,27 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import get_settings, reload_settings
+from app.services.response_cache import response_cache
+
+
+def test_reload_settings_updates_cached_instance(monkeypatch):
+    settings = get_settings()
+    assert get_settings() is settings
+    original_ttl = settings.CHATBOT_CACHE_TTL
+
+    monkeypatch.setenv("CHATBOT_CACHE_TTL", str(original_ttl + 1))
+    assert "CHATBOT_CACHE_TTL" in reload_settings()
+    assert get_settings() is settings
+    assert settings.CHATBOT_CACHE_TTL == original_ttl + 1
+    assert response_cache.ttl == original_ttl + 1
+
+    # Invalid configuration is rejected without changing anything
+    monkeypatch.setenv("CHATBOT_CACHE_TTL", "not a number")
+    with pytest.raises(ValidationError):
+        reload_settings()
+    assert settings.CHATBOT_CACHE_TTL == original_ttl + 1
+
+    monkeypatch.delenv("CHATBOT_CACHE_TTL")
+    reload_settings()
+    assert settings.CHATBOT_CACHE_TTL == original_ttl
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.core.startup import Lazy, startup_report, warm_up
+
+
+def test_lazy_initializes_once_and_warm_up_reports():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("not yet")
+        return object()
+
+    lazy = Lazy("test_service", factory)
+    assert not startup_report()["singletons"]["test_service"]["initialized"]
+
+    results = asyncio.run(warm_up(["test_service", "missing"]))
+    assert results["test_service"]["status"] == "failed"
+    assert results["missing"]["status"] == "unknown"
+
+    # A failed factory is retried, then the value is reused
+    results = asyncio.run(warm_up(["test_service"]))
+    assert results["test_service"]["status"] == "initialized"
+    assert lazy.get() is lazy.get()
+    assert len(calls) == 2
+    assert asyncio.run(warm_up(["test_service"]))["test_service"]["status"] == "ready"
+
+    lazy.reset()
+    assert not lazy.initialized
@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.services.vector_index import EmbeddingIndex
+
+
+def _encode(texts):
+    # Deterministic toy embeddings: one-hot on the first letter
+    vectors = np.zeros((len(texts), 26), dtype=np.float32)
+    for i, text in enumerate(texts):
+        vectors[i, ord(text[0]) - ord("a")] = 1.0
+    return vectors
+
+
+def test_search_returns_ranked_top_k(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), "kb")
+    index.sync({"1": "1:v1", "2": "2:v1", "3": "3:v1"}, _encode, {"1": "apple", "2": "banana", "3": "cherry"})
+
+    query = np.zeros(26, dtype=np.float32)
+    query[1], query[2] = 1.0, 0.5
+    hits = index.search(query, top_k=2)
+
+    assert [item_id for item_id, _ in hits] == ["2", "3"]
+
+
+def test_sync_only_encodes_changed_rows_and_persists(tmp_path):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return _encode(texts)
+
+    index = EmbeddingIndex(str(tmp_path), "kb")
+    index.sync({"1": "1:v1", "2": "2:v1"}, encode, {"1": "apple", "2": "banana"})
+    encoded = index.sync({"1": "1:v1", "2": "2:v2", "3": "3:v1"}, encode, {"2": "cherry", "3": "date"})
+
+    assert encoded == 2
+    assert calls[-1] == ["cherry", "date"]
+
+    reopened = EmbeddingIndex(str(tmp_path), "kb")
+    assert reopened.ids == ["1", "2", "3"]
+    assert reopened.stale_ids({"1": "1:v1", "2": "2:v2", "3": "3:v1"}) == []
@@ -58,5 +58,30 @@ export function useApi() {
     return request
   }
 
-  return { get, post }
+  // List endpoints return one page at a time with the next page's cursor in
+  // the X-Next-Cursor header (absent on the last page); callers pass it back
+  // to load the following page when they need it
+  function getPage(url: string, opts: { query?: Record<string, any>, cursor?: string | null } = {}) {
+    const requestKey = `GET_PAGE:${url}:${opts.cursor || ''}`
+    if (pendingRequests.has(requestKey)) {
+      return pendingRequests.get(requestKey)!
+    }
+
+    const request = $fetch.raw(url, {
+      baseURL: config.public.apiBase,
+      headers: auth.token ? { Authorization: `Bearer ${auth.token}` } : {},
+      timeout: 10000,
+      query: { ...opts.query, ...(opts.cursor ? { cursor: opts.cursor } : {}) },
+    }).then((response: any) => ({
+      items: (response._data || []) as any[],
+      nextCursor: response.headers.get('x-next-cursor') as string | null,
+    })).finally(() => {
+      pendingRequests.delete(requestKey)
+    })
+
+    pendingRequests.set(requestKey, request)
+    return request
+  }
+
+  return { get, getPage, post }
 } 
\ No newline at end of file
@@ -1,25 +1,45 @@
 import { defineStore } from 'pinia'
 import { useApi } from '~/composables/useApi'
 
+// Rows per request; further pages are loaded on demand
+const PAGE_SIZE = 50
+
+type ListKey = 'incomeSources' | 'expenses' | 'budgets' | 'savingsGoals'
+
 export const useFinanceStore = defineStore('finance', {
   state: () => ({
     incomeSources: [] as any[],
     expenses: [] as any[],
     budgets: [] as any[],
     savingsGoals: [] as any[],
+    // Cursor of the next page per list; null once the last page is loaded
+    cursors: {
+      incomeSources: null,
+      expenses: null,
+      budgets: null,
+      savingsGoals: null,
+    } as Record<ListKey, string | null>,
     loading: false,
     error: null as null | string,
   }),
   actions: {
-    async fetchIncomeSources() {
+    // First page of a list, or the next one appended when `more` is set
+    async loadPage(key: ListKey, url: string, more = false) {
+      if (more && !this.cursors[key]) return
+      const api = useApi()
+      const page = await api.getPage(url, {
+        query: { limit: PAGE_SIZE },
+        cursor: more ? this.cursors[key] : null,
+      })
+      this[key] = more ? [...this[key], ...page.items] : page.items
+      this.cursors[key] = page.nextCursor
+    },
+    async fetchIncomeSources(more = false) {
       this.loading = true
       this.error = null
       try {
-        const api = useApi()
         console.log('Finance store: Fetching income sources...')
-        const response = await api.get('/finance/income-sources')
-        console.log('Finance store: Income sources response:', response)
-        this.incomeSources = response
+        await this.loadPage('incomeSources', '/finance/income-sources', more)
         console.log('Finance store: Updated income sources:', this.incomeSources)
       } catch (e: any) {
         console.error('Finance store: Error fetching income sources:', e)
@@ -53,39 +73,33 @@ export const useFinanceStore = defineStore('finance', {
         this.loading = false
       }
     },
-    async fetchExpenses() {
+    async fetchExpenses(more = false) {
       this.loading = true
       this.error = null
       try {
-        const api = useApi()
-        const response = await api.get('/finance/expenses')
-        this.expenses = response
+        await this.loadPage('expenses', '/finance/expenses', more)
       } catch (e: any) {
         this.error = e.response?.data?.detail || 'Failed to fetch expenses'
       } finally {
         this.loading = false
       }
     },
-    async fetchBudgets() {
+    async fetchBudgets(more = false) {
       this.loading = true
       this.error = null
       try {
-        const api = useApi()
-        const response = await api.get('/finance/budgets')
-        this.budgets = response
+        await this.loadPage('budgets', '/finance/budgets', more)
       } catch (e: any) {
         this.error = e.response?.data?.detail || 'Failed to fetch budgets'
       } finally {
         this.loading = false
       }
     },
-    async fetchSavingsGoals() {
+    async fetchSavingsGoals(more = false) {
       this.loading = true
       this.error = null
       try {
-        const api = useApi()
-        const response = await api.get('/finance/savings-goals')
-        this.savingsGoals = response
+        await this.loadPage('savingsGoals', '/finance/savings-goals', more)
       } catch (e: any) {
         this.error = e.response?.data?.detail || 'Failed to fetch savings goals'
       } finally {